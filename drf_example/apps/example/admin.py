@@ -1,5 +1,7 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+
 from drf_example.apps.example.models import Author, Post, Tag
+from drf_example.apps.example.tasks import change_posts_status
 
 
 @admin.register(Author)
@@ -27,9 +29,11 @@ class PostAdmin(admin.ModelAdmin):
                    'tags']
     search_fields = ['title', 'content', 'author__user__username']
     prepopulated_fields = {'slug': ('title',)}
-    readonly_fields = ['created_at', 'updated_at', 'views_count']
+    readonly_fields = ['created_at', 'updated_at', 'views_count',
+                       'words_count', 'reading_time']
     filter_horizontal = ['tags']
     date_hierarchy = 'published_at'
+    actions = ['publish_posts', 'archive_posts', 'draft_posts']
 
     fieldsets = (
         ('Основная информация', {
@@ -43,7 +47,30 @@ class PostAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
         ('Статистика', {
-            'fields': ('views_count',),
+            'fields': ('views_count', 'words_count', 'reading_time'),
             'classes': ('collapse',)
         }),
     )
+
+    @admin.action(description='Опубликовать выбранные посты (в фоне)')
+    def publish_posts(self, request, queryset):
+        self.enqueue_status_change(request, queryset, 'published')
+
+    @admin.action(description='Архивировать выбранные посты (в фоне)')
+    def archive_posts(self, request, queryset):
+        self.enqueue_status_change(request, queryset, 'archived')
+
+    @admin.action(description='Перевести выбранные посты в черновики (в фоне)')
+    def draft_posts(self, request, queryset):
+        self.enqueue_status_change(request, queryset, 'draft')
+
+    def enqueue_status_change(self, request, queryset, status):
+        """Ставит смену статуса в очередь вместо save() каждого поста"""
+        post_ids = list(queryset.values_list('pk', flat=True))
+        result = change_posts_status.delay(post_ids, status)
+        self.message_user(
+            request,
+            f'Смена статуса {len(post_ids)} постов поставлена в очередь '
+            f'(задача {result.id})',
+            messages.SUCCESS,
+        )
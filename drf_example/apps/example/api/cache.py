@@ -0,0 +1,444 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max
+from django.http import HttpResponse, HttpResponseNotModified
+from django.template.response import SimpleTemplateResponse
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+
+# Префиксы ключей кеша
+GENERATION_KEY = 'example:generation:{scope}'
+# Время последнего увеличения поколения scope (unix time)
+MODIFIED_KEY = 'example:modified:{scope}'
+RESPONSE_KEY = 'example:response:{basename}:{digest}'
+# Заголовки, которые хранятся вместе с закешированным ответом
+CACHED_HEADERS = ('ETag', 'Last-Modified')
+
+
+def get_generations(scopes):
+    """Текущие поколения данных для списка scope (одним запросом в кеш)"""
+    keys = [GENERATION_KEY.format(scope=scope) for scope in scopes]
+    values = cache.get_many(keys)
+    return [str(values.get(key, 0)) for key in keys]
+
+
+async def aget_generations(scopes):
+    """Асинхронный вариант get_generations"""
+    keys = [GENERATION_KEY.format(scope=scope) for scope in scopes]
+    values = await cache.aget_many(keys)
+    return [str(values.get(key, 0)) for key in keys]
+
+
+def get_generations_modified(scopes):
+    """
+    Поколения scope и время последнего изменения любого из них.
+    Время None, если оно известно не для всех scope
+    """
+    keys = get_generations_keys(scopes)
+    return parse_generations_modified(keys, cache.get_many(sum(keys, [])))
+
+
+async def aget_generations_modified(scopes):
+    """Асинхронный вариант get_generations_modified"""
+    keys = get_generations_keys(scopes)
+    values = await cache.aget_many(sum(keys, []))
+    return parse_generations_modified(keys, values)
+
+
+def get_generations_keys(scopes):
+    return ([GENERATION_KEY.format(scope=scope) for scope in scopes],
+            [MODIFIED_KEY.format(scope=scope) for scope in scopes])
+
+
+def parse_generations_modified(keys, values):
+    generation_keys, modified_keys = keys
+    generations = [str(values.get(key, 0)) for key in generation_keys]
+    if not all(key in values for key in modified_keys):
+        return generations, None
+    modified = max((values[key] for key in modified_keys), default=None)
+    if modified is not None:
+        modified = datetime.fromtimestamp(modified, timezone.utc)
+    return generations, modified
+
+
+def bump_generation(scope):
+    """
+    Увеличивает поколение scope: все закешированные ответы,
+    зависящие от него, перестают находиться по ключу
+    """
+    # Время пишется до поколения: читатель не увидит новое поколение
+    # со старым временем изменения
+    cache.set(MODIFIED_KEY.format(scope=scope), time.time(), timeout=None)
+    key = GENERATION_KEY.format(scope=scope)
+    # add не перезапишет существующее значение, incr атомарен
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Ключ успели вытеснить между add и incr
+        cache.set(key, 1, timeout=None)
+
+
+def invalidate(*scopes):
+    """
+    Инвалидирует scope после коммита транзакции. Ключ ответа строится
+    по поколению на момент начала запроса, поэтому чтение, начатое до
+    коммита, не попадет под новое поколение.
+    """
+    def bump():
+        for scope in scopes:
+            bump_generation(scope)
+
+    transaction.on_commit(bump)
+
+
+class CachedResponseMixin:
+    """
+    Кеширование отрендеренных ответов list/retrieve.
+
+    Ключ включает путь, query-параметры, Accept, формат, версию API,
+    класс пользователя и поколения cache_scopes. Поколения увеличиваются
+    сигналами при изменении моделей (см. signals.py). Вместе с ответом
+    хранятся его ETag и Last-Modified (ConditionalGetMixin).
+
+    alist/aretrieve - то же для асинхронного пути (AsyncReadMixin).
+    """
+    # Scope данных, от которых зависит ответ
+    cache_scopes = ()
+    # Дополнительные scope только для detail (retrieve и detail-действия)
+    detail_cache_scopes = ()
+    cache_timeout = 60
+    # Query-параметры, при которых ответ не кешируется
+    cache_bypass_params = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(super().list, request, *args,
+                                        **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(super().retrieve, request, *args,
+                                        **kwargs)
+
+    async def alist(self, request, *args, **kwargs):
+        return await self.aget_cached_response(super().alist, request,
+                                               *args, **kwargs)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await self.aget_cached_response(super().aretrieve, request,
+                                               *args, **kwargs)
+
+    def get_cache_scopes(self):
+        if getattr(self, 'detail', False):
+            return (*self.cache_scopes, *self.detail_cache_scopes)
+        return self.cache_scopes
+
+    def is_cacheable(self, request):
+        if request.method != 'GET':
+            return False
+        # HTML browsable API содержит имя пользователя и CSRF токен
+        if getattr(request.accepted_renderer, 'format', None) == 'api':
+            return False
+        return not any(param in request.query_params
+                       for param in self.cache_bypass_params)
+
+    def get_auth_class(self, request):
+        """Класс пользователя, от которого может зависеть ответ"""
+        user = request.user
+        if not user or not user.is_authenticated:
+            return 'anon'
+        return 'staff' if user.is_staff else 'user'
+
+    def get_representation_key(self, request):
+        """Части запроса, от которых зависит представление ответа"""
+        query = urlencode(sorted(request.query_params.lists()), doseq=True)
+        return [
+            request.path,
+            query,
+            request.META.get('HTTP_ACCEPT', ''),
+            request.accepted_renderer.format,
+            str(request.version),
+            self.get_auth_class(request),
+        ]
+
+    def get_response_cache_key(self, request, generations=None):
+        if generations is None:
+            generations = get_generations(self.get_cache_scopes())
+        parts = [*self.get_representation_key(request), *generations]
+        digest = hashlib.sha1('|'.join(parts).encode()).hexdigest()
+        return RESPONSE_KEY.format(basename=self.basename, digest=digest)
+
+    def get_cached(self, request):
+        """
+        (ключ, закешированный ответ или None). Читается один раз за запрос:
+        ConditionalGetMixin берет из ответа валидаторы до вызова handler
+        """
+        if not hasattr(self, '_cached'):
+            key = self.get_response_cache_key(request)
+            self._cached = key, self.make_cached_response(cache.get(key))
+        return self._cached
+
+    async def aget_cached(self, request):
+        """Асинхронный вариант get_cached"""
+        if not hasattr(self, '_cached'):
+            generations = await aget_generations(self.get_cache_scopes())
+            key = self.get_response_cache_key(request, generations)
+            self._cached = key, self.make_cached_response(
+                await cache.aget(key)
+            )
+        return self._cached
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        if not self.is_cacheable(request):
+            return handler(request, *args, **kwargs)
+
+        key, response = self.get_cached(request)
+        if response is not None:
+            return response
+
+        response = handler(request, *args, **kwargs)
+        self.store_response(key, response)
+        return response
+
+    async def aget_cached_response(self, handler, request, *args, **kwargs):
+        """Асинхронный вариант get_cached_response, handler - корутина"""
+        if not self.is_cacheable(request):
+            return await handler(request, *args, **kwargs)
+
+        key, response = await self.aget_cached(request)
+        if response is not None:
+            return response
+
+        response = await handler(request, *args, **kwargs)
+        self.store_response(key, response)
+        return response
+
+    def make_cached_response(self, cached):
+        if cached is None:
+            return None
+        content, content_type, headers = cached
+        response = HttpResponse(content, content_type=content_type)
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+    def store_response(self, key, response):
+        """Сохраняет успешный ответ в кеш после рендеринга"""
+        if (response.status_code == 200 and
+                isinstance(response, SimpleTemplateResponse)):
+            def store(rendered):
+                headers = {name: rendered[name] for name in CACHED_HEADERS
+                           if rendered.has_header(name)}
+                cache.set(key, (rendered.content, rendered['Content-Type'],
+                                headers), self.cache_timeout)
+
+            response.add_post_render_callback(store)
+
+
+class ConditionalGetMixin:
+    """
+    Условные GET (ETag / Last-Modified) для list/retrieve.
+
+    Валидаторы считаются одним легким запросом: MAX(last_modified_field)
+    и COUNT(*) по отфильтрованному queryset (для списка) или
+    last_modified_field объекта (для detail). В ETag также входят
+    поколения cache_scopes, чтобы учесть изменения связанных моделей.
+    Удаления и изменения m2m не меняют updated_at, поэтому Last-Modified
+    не раньше времени последнего изменения поколений cache_scopes;
+    если это время неизвестно, отдается только ETag.
+    При совпадении If-None-Match / If-Modified-Since возвращается 304
+    до сериализации.
+
+    Рассчитан на использование вместе с CachedResponseMixin: если ответ
+    есть в кеше, валидаторы берутся из него и запросов в БД нет.
+    Объект detail, загруженный для валидаторов, переиспользует get_object.
+    alist/aretrieve - то же для асинхронного пути (AsyncReadMixin).
+    """
+    # Поле даты изменения; None - Last-Modified только по поколениям
+    last_modified_field = 'updated_at'
+
+    def list(self, request, *args, **kwargs):
+        return self.get_conditional_response(super().list, request, *args,
+                                             **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_conditional_response(super().retrieve, request,
+                                             *args, **kwargs)
+
+    async def alist(self, request, *args, **kwargs):
+        return await self.aget_conditional_response(super().alist, request,
+                                                    *args, **kwargs)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await self.aget_conditional_response(super().aretrieve,
+                                                    request, *args, **kwargs)
+
+    def get_object(self):
+        if getattr(self, '_validators_object', None) is not None:
+            return self._validators_object
+        return super().get_object()
+
+    async def aget_object(self):
+        if getattr(self, '_validators_object', None) is not None:
+            return self._validators_object
+        return await super().aget_object()
+
+    def get_validators(self, request):
+        """Возвращает (etag, last_modified)"""
+        if self.detail:
+            # Тот же объект отдаст retrieve, поэтому грузится со связями
+            self._validators_object = instance = self.get_object()
+            count = 1
+            last_modified = self.get_last_modified(instance)
+        else:
+            # Для агрегатов не нужны prefetch и annotate сериализатора
+            eager_loading = getattr(self, 'eager_loading', True)
+            self.eager_loading = False
+            try:
+                result = self.get_validators_queryset().aggregate(
+                    **self.get_validators_aggregates()
+                )
+            finally:
+                self.eager_loading = eager_loading
+            count = result['count']
+            last_modified = result.get('last_modified')
+
+        generations, modified = get_generations_modified(
+            self.get_cache_scopes()
+        )
+        return self.make_validators(request, generations, modified, count,
+                                    last_modified)
+
+    async def aget_validators(self, request):
+        """Асинхронный вариант get_validators"""
+        if self.detail:
+            self._validators_object = instance = await self.aget_object()
+            count = 1
+            last_modified = self.get_last_modified(instance)
+        else:
+            eager_loading = getattr(self, 'eager_loading', True)
+            self.eager_loading = False
+            try:
+                result = await self.get_validators_queryset().aaggregate(
+                    **self.get_validators_aggregates()
+                )
+            finally:
+                self.eager_loading = eager_loading
+            count = result['count']
+            last_modified = result.get('last_modified')
+
+        generations, modified = await aget_generations_modified(
+            self.get_cache_scopes()
+        )
+        return self.make_validators(request, generations, modified, count,
+                                    last_modified)
+
+    def get_last_modified(self, instance):
+        if not self.last_modified_field:
+            return None
+        return getattr(instance, self.last_modified_field)
+
+    def get_validators_queryset(self):
+        return self.filter_queryset(self.get_queryset()).order_by()
+
+    def get_validators_aggregates(self):
+        aggregates = {'count': Count('pk')}
+        if self.last_modified_field:
+            aggregates['last_modified'] = Max(self.last_modified_field)
+        return aggregates
+
+    def make_validators(self, request, generations, modified, count,
+                        last_modified):
+        """
+        (etag, last_modified) по посчитанным значениям,
+        modified - время последнего изменения поколений
+        """
+        parts = [
+            *self.get_representation_key(request),
+            *generations,
+            str(count),
+            last_modified.isoformat() if last_modified else '',
+        ]
+        digest = hashlib.sha1('|'.join(parts).encode()).hexdigest()
+        if modified is not None and last_modified is not None:
+            modified = max(modified, last_modified)
+        # Слабый ETag: одинаковое представление, а не побайтовое совпадение
+        return f'W/"{digest}"', modified
+
+    def is_not_modified(self, request, etag, last_modified):
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            # If-None-Match приоритетнее If-Modified-Since
+            etags = parse_etags(if_none_match)
+            return '*' in etags or any(
+                tag.removeprefix('W/') == etag.removeprefix('W/')
+                for tag in etags
+            )
+
+        if_modified_since = parse_http_date_safe(
+            request.META.get('HTTP_IF_MODIFIED_SINCE', '')
+        )
+        return (last_modified is not None and if_modified_since is not None
+                and int(last_modified.timestamp()) <= if_modified_since)
+
+    def get_cached_validators(self, response):
+        """(etag, last_modified) закешированного ответа или None"""
+        if response is None or not response.has_header('ETag'):
+            return None
+        last_modified = parse_http_date_safe(response.get('Last-Modified', ''))
+        if last_modified is not None:
+            last_modified = datetime.fromtimestamp(last_modified,
+                                                   timezone.utc)
+        return response['ETag'], last_modified
+
+    def get_conditional_response(self, handler, request, *args, **kwargs):
+        if request.method != 'GET':
+            return handler(request, *args, **kwargs)
+
+        validators = None
+        if isinstance(self, CachedResponseMixin) and \
+                self.is_cacheable(request):
+            validators = self.get_cached_validators(
+                self.get_cached(request)[1]
+            )
+        etag, last_modified = validators or self.get_validators(request)
+        if self.is_not_modified(request, etag, last_modified):
+            response = HttpResponseNotModified()
+        else:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+
+        return self.set_validators(response, etag, last_modified)
+
+    async def aget_conditional_response(self, handler, request, *args,
+                                        **kwargs):
+        """Асинхронный вариант get_conditional_response"""
+        if request.method != 'GET':
+            return await handler(request, *args, **kwargs)
+
+        validators = None
+        if isinstance(self, CachedResponseMixin) and \
+                self.is_cacheable(request):
+            validators = self.get_cached_validators(
+                (await self.aget_cached(request))[1]
+            )
+        etag, last_modified = (validators or
+                               await self.aget_validators(request))
+        if self.is_not_modified(request, etag, last_modified):
+            response = HttpResponseNotModified()
+        else:
+            response = await handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+
+        return self.set_validators(response, etag, last_modified)
+
+    def set_validators(self, response, etag, last_modified):
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        return response
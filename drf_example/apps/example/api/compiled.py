@@ -0,0 +1,313 @@
+"""
+Скомпилированная сериализация только на чтение.
+
+Для набора полей сериализатора один раз строится список
+(имя, источник, конвертер), после чего строки собираются в dict без
+get_attribute/SkipField/ReturnDict на каждое поле каждого объекта.
+Queryset читается кортежами через values_list, список объектов
+(страница пагинации) - напрямую по атрибутам.
+
+Компилируются только поля, результат которых заведомо совпадает
+с to_representation сериализатора. Если хоть одно поле не поддерживается
+(вложенные сериализаторы, SerializerMethodField, source='*' и т.п.),
+compile_serializer возвращает None и используется обычный путь DRF.
+"""
+import functools
+from collections import namedtuple
+from itertools import islice
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import QuerySet
+from rest_framework import serializers
+from rest_framework.fields import empty
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+from rest_framework.settings import api_settings
+from rest_framework.utils.serializer_helpers import ReturnList
+
+from drf_example.apps.example.api.eager_loading import (
+    get_query_hints, get_relation,
+)
+
+# Сколько наборов полей (?fields=) держать скомпилированными
+COMPILED_CACHE_SIZE = 256
+
+# Виды источников значения
+COLUMN = 'column'
+ANNOTATION = 'annotation'
+EXPRESSION = 'expression'
+MANY = 'many'
+FILE = 'file'
+
+# Поля, у которых to_representation сводится к приведению типа.
+# Сравнение по точному типу: у подклассов свое поведение.
+SIMPLE_CONVERTERS = {
+    serializers.IntegerField: int,
+    serializers.CharField: str,
+    serializers.SlugField: str,
+    serializers.EmailField: str,
+    serializers.URLField: str,
+    serializers.ReadOnlyField: None,
+}
+
+# attr - атрибут объекта, column - колонка или выражение для values_list
+CompiledField = namedtuple('CompiledField',
+                           ['name', 'kind', 'attr', 'column', 'convert'])
+
+
+def compile_serializer(serializer):
+    """
+    Возвращает CompiledSerializer для класса и набора полей serializer
+    или None, если сериализатор нельзя скомпилировать
+    """
+    return _compile(type(serializer), tuple(serializer.fields))
+
+
+@functools.lru_cache(maxsize=COMPILED_CACHE_SIZE)
+def _compile(serializer_class, field_names):
+    # Поля берем у сериализатора без контекста: в кеше не должно
+    # оставаться ссылок на запрос
+    fields = serializer_class().fields
+    meta = getattr(serializer_class, 'Meta', None)
+    model = getattr(meta, 'model', None)
+    if model is None:
+        return None
+
+    hints = get_query_hints(serializer_class)
+    compiled = []
+    for name in field_names:
+        field = fields[name]
+        if field.write_only:
+            continue
+        compiled_field = _compile_field(model, name, field, hints.get(name))
+        if compiled_field is None:
+            return None
+        compiled.append(compiled_field)
+    return CompiledSerializer(model, compiled)
+
+
+def _compile_field(model, name, field, hint):
+    """CompiledField для поля сериализатора или None"""
+    if hint is not None:
+        # Значение property вычисляется в БД выражением из подсказки
+        if 'expression' in hint:
+            return CompiledField(name, EXPRESSION, field.source,
+                                 hint['expression'], _get_converter(field))
+        if not _is_skippable(field):
+            return None
+        return CompiledField(name, ANNOTATION, field.source, field.source,
+                             _get_converter(field))
+
+    if field.source == '*' or '.' in field.source:
+        return None
+
+    relation = get_relation(model, field.source)
+    if relation is not None:
+        if isinstance(field, ManyRelatedField):
+            if not _is_pk_relation(field.child_relation):
+                return None
+            if not (relation.many_to_many or relation.one_to_many):
+                return None
+            return CompiledField(name, MANY, field.source, field.source,
+                                 None)
+        if not (relation.many_to_one or relation.one_to_one):
+            return None
+        if not relation.concrete or not _is_pk_relation(field):
+            return None
+        # Для PK связи достаточно колонки <name>_id
+        return CompiledField(name, COLUMN, relation.attname,
+                             relation.attname, None)
+
+    try:
+        model_field = model._meta.get_field(field.source)
+    except FieldDoesNotExist:
+        # Аннотация queryset (например search_headline)
+        if not _is_skippable(field):
+            return None
+        return CompiledField(name, ANNOTATION, field.source, field.source,
+                             _get_converter(field))
+
+    if not model_field.concrete:
+        return None
+    if isinstance(field, serializers.FileField):
+        converter = functools.partial(_make_file_converter, field, model_field)
+        return CompiledField(name, FILE, model_field.attname,
+                             model_field.attname, converter)
+    return CompiledField(name, COLUMN, model_field.attname,
+                         model_field.attname, _get_converter(field))
+
+
+def _is_skippable(field):
+    """
+    Пропускает ли DRF поле, когда у объекта нет атрибута (SkipField)
+    """
+    return (field.default is empty and not field.allow_null and
+            not field.required)
+
+
+def _is_pk_relation(field):
+    return (isinstance(field, PrimaryKeyRelatedField) and
+            field.pk_field is None)
+
+
+def _get_converter(field):
+    """Функция value -> представление (None - значение как есть)"""
+    if type(field) in SIMPLE_CONVERTERS:
+        return SIMPLE_CONVERTERS[type(field)]
+    return field.to_representation
+
+
+def _make_file_converter(field, model_field, request):
+    """Конвертер имени файла в URL, как у FileField/ImageField DRF"""
+    use_url = getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL)
+    storage = model_field.storage
+
+    def convert(value):
+        # Из values_list приходит имя файла, у объекта - FieldFile
+        name = getattr(value, 'name', value)
+        if not name:
+            return None
+        if not use_url:
+            return name
+        url = storage.url(name)
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+    return convert
+
+
+class CompiledSerializer:
+    """
+    Сериализатор набора полей, собранный compile_serializer
+    """
+
+    def __init__(self, model, fields):
+        self.model = model
+        self.fields = fields
+
+    def bind(self, context):
+        """Поля с конвертерами, зависящими от запроса"""
+        request = context.get('request')
+        return [
+            field._replace(convert=field.convert(request))
+            if field.kind == FILE else field
+            for field in self.fields
+        ]
+
+    def serialize(self, objects, serializer):
+        """
+        Данные как у serializer.data для many=True:
+        objects - queryset или список объектов модели
+        """
+        if isinstance(objects, QuerySet):
+            rows = [
+                row for chunk in self.iter_queryset(objects, serializer.context)
+                for row in chunk
+            ]
+        else:
+            rows = self.from_instances(objects, serializer.context)
+        return ReturnList(rows, serializer=serializer)
+
+    def from_instances(self, instances, context):
+        """Сериализует уже загруженные объекты"""
+        fields = self.bind(context)
+        ret = []
+        for instance in instances:
+            item = {}
+            for name, kind, attr, column, convert in fields:
+                if kind == MANY:
+                    # Связи берутся из prefetch, как у ManyRelatedField
+                    item[name] = [obj.pk for obj in getattr(instance, attr).all()]
+                    continue
+                try:
+                    value = getattr(instance, attr)
+                except AttributeError:
+                    continue
+                item[name] = (
+                    value if value is None or convert is None
+                    else convert(value)
+                )
+            ret.append(item)
+        return ret
+
+    def iter_queryset(self, queryset, context, chunk_size=None):
+        """
+        Читает queryset кортежами через values_list и отдает
+        сериализованные строки списками (по chunk_size, если задан)
+        """
+        fields = self.bind(context)
+        annotations = queryset.query.annotations
+        expressions = {}
+        columns = []
+        plan = []
+        many = []
+        for name, kind, attr, column, convert in fields:
+            if kind == MANY:
+                many.append(column)
+                # Вместо индекса колонки - имя связи
+                plan.append((name, None, column))
+                continue
+            if kind == ANNOTATION and column not in annotations:
+                # Аннотации нет в этом запросе - поле пропускается
+                continue
+            if kind == EXPRESSION:
+                alias = f'_compiled_{name}'
+                expressions[alias] = column
+                column = alias
+            columns.append(column)
+            plan.append((name, len(columns), convert))
+
+        queryset = queryset.prefetch_related(None)
+        if expressions:
+            queryset = queryset.annotate(**expressions)
+        queryset = queryset.values_list('pk', *columns)
+
+        if chunk_size is None:
+            yield self.build(list(queryset), plan, many)
+            return
+        rows = queryset.iterator(chunk_size=chunk_size)
+        while chunk := list(islice(rows, chunk_size)):
+            yield self.build(chunk, plan, many)
+
+    def build(self, rows, plan, many):
+        """Собирает dict из кортежей values_list"""
+        if not rows:
+            return []
+        related = {
+            source: self.get_related_pks(source, [row[0] for row in rows])
+            for source in many
+        }
+        ret = []
+        for row in rows:
+            item = {}
+            for name, index, convert in plan:
+                if index is None:
+                    item[name] = list(related[convert].get(row[0], ()))
+                    continue
+                value = row[index]
+                item[name] = (
+                    value if value is None or convert is None
+                    else convert(value)
+                )
+            ret.append(item)
+        return ret
+
+    def get_related_pks(self, source, pks):
+        """
+        {pk объекта: [pk связанных]} одним запросом, в порядке
+        сортировки связанной модели, как при prefetch_related
+        """
+        relation = self.model._meta.get_field(source)
+        related_model = relation.related_model
+        if relation.auto_created:
+            # Обратная связь: фильтр по полю связи на стороне related_model
+            lookup = relation.field.name
+        else:
+            lookup = relation.related_query_name()
+        result = {}
+        queryset = related_model._default_manager.filter(
+            **{f'{lookup}__in': pks}
+        ).values_list(lookup, 'pk')
+        for pk, related_pk in queryset:
+            result.setdefault(pk, []).append(related_pk)
+        return result
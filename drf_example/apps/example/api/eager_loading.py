@@ -0,0 +1,168 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, RelatedField
+
+
+def get_query_hints(serializer):
+    """
+    Подсказки для полей, которые нельзя разобрать автоматически
+    (property модели и т.п.).
+
+    Задаются в Meta сериализатора:
+        query_hints = {
+            'full_name': {'select_related': ['user']},
+            'tags_count': {'annotate': {'tags_count': Count('tags')}},
+            'is_published': {
+                'only': ['status'],
+                'expression': ExpressionWrapper(Q(status='published'),
+                                                output_field=BooleanField()),
+            },
+        }
+
+    Ключ only перечисляет колонки, которые нужны полю при проекции,
+    expression - выражение, которым поле считается в БД для
+    скомпилированной сериализации (api/compiled.py).
+    """
+    meta = getattr(serializer, 'Meta', None)
+    return getattr(meta, 'query_hints', {})
+
+
+def get_relation(model, name):
+    """Возвращает поле-связь модели или None, если это не связь"""
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+    return field if field.is_relation else None
+
+
+def optimize_queryset(queryset, serializer, project=False):
+    """
+    Разбирает объявленные поля сериализатора (включая вложенные)
+    и добавляет к queryset нужные select_related, prefetch_related
+    и annotate, чтобы количество запросов не зависело от размера страницы.
+
+    project=True дополнительно ограничивает SELECT колонками, которые
+    нужны оставшимся полям сериализатора (например после ?fields=).
+    """
+    model = queryset.model
+    select_related = set()
+    prefetch_related = []
+    annotations = {}
+    only = {model._meta.pk.name}
+    hints = get_query_hints(serializer)
+
+    for field_name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+
+        hint = hints.get(field_name)
+        if hint:
+            select_related.update(hint.get('select_related', []))
+            prefetch_related.extend(hint.get('prefetch_related', []))
+            annotations.update(hint.get('annotate', {}))
+            only.update(hint.get('only', []))
+            continue
+
+        if field.source == '*':
+            # Полю нужен весь объект - проекцию не применяем
+            project = False
+            continue
+
+        source_attrs = field.source.split('.')
+        relation = get_relation(model, source_attrs[0])
+        if relation is None:
+            if _is_concrete_field(model, source_attrs[0]):
+                only.add(source_attrs[0])
+            else:
+                # property без подсказки - неизвестно, какие колонки нужны
+                project = False
+            continue
+
+        if relation.concrete and not relation.many_to_many:
+            only.add(source_attrs[0])
+
+        if isinstance(field, serializers.ListSerializer):
+            # Вложенный список: prefetch с оптимизированным queryset потомка
+            related_qs = relation.related_model._default_manager.all()
+            prefetch_related.append(Prefetch(
+                source_attrs[0],
+                queryset=optimize_queryset(related_qs, field.child),
+            ))
+        elif isinstance(field, ManyRelatedField) or (
+            relation.many_to_many or relation.one_to_many
+        ):
+            prefetch_related.append(source_attrs[0])
+        elif isinstance(field, serializers.BaseSerializer):
+            # Вложенный объект по FK/OneToOne
+            select_related.add(source_attrs[0])
+            nested = optimize_queryset(
+                relation.related_model._default_manager.all(), field
+            )
+            select_related.update(
+                f'{source_attrs[0]}__{path}'
+                for path in _get_select_related(nested)
+            )
+        elif isinstance(field, RelatedField) and field.use_pk_only_optimization():
+            # Для первичного ключа достаточно <name>_id, JOIN не нужен
+            continue
+        else:
+            # Поле вида author.user.username - джойним всю цепочку связей
+            path = _get_relation_path(model, source_attrs)
+            if path:
+                select_related.add(path)
+
+    if select_related:
+        queryset = queryset.select_related(*sorted(select_related))
+    if prefetch_related:
+        queryset = queryset.prefetch_related(*prefetch_related)
+    if annotations:
+        queryset = queryset.annotate(**annotations)
+    if project:
+        # Для select_related нужна колонка FK первого уровня
+        only.update(path.split('__')[0] for path in select_related)
+        queryset = queryset.only(*sorted(only))
+    return queryset
+
+
+def _is_concrete_field(model, name):
+    """Является ли name обычной колонкой модели"""
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return False
+    return field.concrete and not field.is_relation
+
+
+def _get_select_related(queryset):
+    """Список путей select_related, уже примененных к queryset"""
+    select_related = queryset.query.select_related
+    if not isinstance(select_related, dict):
+        return []
+
+    paths = []
+
+    def walk(tree, prefix):
+        for name, subtree in tree.items():
+            path = f'{prefix}__{name}' if prefix else name
+            paths.append(path)
+            walk(subtree, path)
+
+    walk(select_related, '')
+    return paths
+
+
+def _get_relation_path(model, source_attrs):
+    """
+    Возвращает путь для select_related по цепочке FK/OneToOne
+    из source (например author.user.username -> author__user)
+    """
+    path = []
+    for attr in source_attrs:
+        relation = get_relation(model, attr)
+        if relation is None or not (relation.many_to_one or relation.one_to_one):
+            break
+        path.append(attr)
+        model = relation.related_model
+    return '__'.join(path)
@@ -0,0 +1,41 @@
+from django.contrib.postgres.search import (
+    SearchHeadline, SearchQuery, SearchRank,
+)
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast
+from rest_framework.filters import SearchFilter
+
+from drf_example.apps.example.models.post import SEARCH_CONFIG
+
+
+class PostgresSearchFilter(SearchFilter):
+    """
+    Полнотекстовый поиск PostgreSQL вместо icontains по полям.
+
+    Ищет по search_vector (GIN индекс), сортирует по релевантности
+    (если не передан ?ordering) и добавляет подсвеченный фрагмент
+    в аннотацию search_headline. Параметр запроса тот же - ?search=.
+    """
+    vector_field = 'search_vector'
+    headline_field = 'content'
+    search_config = SEARCH_CONFIG
+
+    def filter_queryset(self, request, queryset, view):
+        search_terms = self.get_search_terms(request)
+        if not search_terms:
+            return queryset
+
+        query = SearchQuery(' '.join(search_terms), search_type='websearch',
+                            config=self.search_config)
+        queryset = queryset.filter(**{self.vector_field: query}).annotate(
+            # Приводим ранг к double precision, чтобы значение точно
+            # восстанавливалось из курсора keyset пагинации
+            search_rank=Cast(SearchRank(F(self.vector_field), query),
+                             FloatField()),
+            search_headline=SearchHeadline(
+                self.headline_field, query, config=self.search_config,
+                start_sel='<mark>', stop_sel='</mark>', max_words=35,
+            ),
+        )
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        return queryset.order_by('-search_rank', *ordering)
@@ -0,0 +1,360 @@
+import base64
+import binascii
+import json
+
+from django.db.models import F, Q
+from django.core.paginator import InvalidPage
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (cursor) пагинация без COUNT(*) и OFFSET.
+
+    Курсор - непрозрачная base64-строка со значениями полей сортировки
+    последней (или первой) строки страницы. Следующая страница выбирается
+    условием "(f1, f2, ..., id) после (v1, v2, ..., vid)" с диапазоном
+    по первому полю (f1 <= v1), с которого начинается скан индекса,
+    поэтому страница N стоит столько же, сколько первая.
+
+    Сортировка берется из queryset (OrderingFilter) или Meta.ordering модели,
+    в конец всегда добавляется id для однозначности.
+    NULL считается меньше любого значения: при DESC черновики без
+    published_at идут в конце, при ASC - в начале. Строки с NULL выбираются
+    отдельным запросом (OR с IS NULL не дает использовать диапазон индекса),
+    он выполняется, только если до конца страницы не хватило строк.
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    invalid_cursor_message = 'Некорректный курсор'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        querysets = self.get_page_querysets(queryset, request)
+        if querysets is None:
+            return None
+        results = []
+        for queryset in querysets:
+            results += queryset[:self.page_size + 1 - len(results)]
+            if len(results) > self.page_size:
+                break
+        return self.set_page(results)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Асинхронный вариант paginate_queryset для AsyncReadMixin"""
+        querysets = self.get_page_querysets(queryset, request)
+        if querysets is None:
+            return None
+        results = []
+        for queryset in querysets:
+            results += [obj async for obj in
+                        queryset[:self.page_size + 1 - len(results)]]
+            if len(results) > self.page_size:
+                break
+        return self.set_page(results)
+
+    def get_page_querysets(self, queryset, request):
+        """
+        Querysets строк после курсора в порядке выдачи, каждый - один
+        диапазон индекса. Страница - первые page_size + 1 строк
+        (лишняя - признак следующей страницы). None, если пагинация
+        отключена
+        """
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.ordering = self.get_ordering(queryset)
+        self.cursor = cursor = self.decode_cursor(request)
+        self.reverse = cursor['reverse'] if cursor else False
+
+        queryset = self.load_ordering_fields(queryset)
+        ordering = self.ordering
+        if self.reverse:
+            ordering = [(name, not descending) for name, descending in ordering]
+
+        queryset = queryset.order_by(*[
+            self.order_expression(queryset, name, descending)
+            for name, descending in ordering
+        ])
+        if not cursor:
+            return [queryset]
+        return [
+            queryset.filter(condition) for condition in
+            self.build_keyset_filters(queryset, ordering, cursor['values'])
+        ]
+
+    def load_ordering_fields(self, queryset):
+        """
+        Поля сортировки нужны для курсора: если queryset выбирает только
+        часть колонок (only/defer), добавляем их, иначе каждое поле
+        догружалось бы отдельным запросом
+        """
+        fields, defer = queryset.query.deferred_loading
+        names = {name for name, _ in self.ordering
+                 if '__' not in name and
+                 name not in queryset.query.annotations}
+        if defer and fields & names:
+            return queryset.defer(None).defer(*(fields - names))
+        if not defer and fields and not names <= fields:
+            return queryset.only(*fields, *names)
+        return queryset
+
+    def order_expression(self, queryset, name, descending):
+        """
+        NULLS LAST/FIRST только для полей с NULL: для остальных порядок
+        по умолчанию совпадает с индексом (created_at DESC, id DESC)
+        """
+        if not self.is_nullable(queryset, name):
+            return F(name).desc() if descending else F(name).asc()
+        if descending:
+            return F(name).desc(nulls_last=True)
+        return F(name).asc(nulls_first=True)
+
+    def set_page(self, results):
+        """Запоминает страницу по выбранным строкам"""
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if self.reverse:
+            results.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                page_size = int(request.query_params[self.page_size_query_param])
+                if page_size > 0:
+                    return min(page_size, self.max_page_size)
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def get_ordering(self, queryset):
+        """
+        Список (поле, desc) из сортировки queryset с id в конце
+        """
+        order_by = queryset.query.order_by or queryset.model._meta.ordering
+        ordering = []
+        for item in order_by:
+            if not isinstance(item, str):
+                raise NotFound('Сортировка не поддерживается пагинацией')
+            descending = item.startswith('-')
+            name = item.lstrip('-')
+            if name == 'pk':
+                name = 'id'
+            ordering.append((name, descending))
+
+        if not any(name == 'id' for name, _ in ordering):
+            last_descending = ordering[-1][1] if ordering else False
+            ordering.append(('id', last_descending))
+        return ordering
+
+    def build_keyset_filters(self, queryset, ordering, values):
+        """
+        Условия "строка после курсора" для составного ключа в порядке
+        выдачи, см. keyset_conditions
+        """
+        if len(values) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        keys = [
+            (name, descending, self.is_nullable(queryset, name),
+             self.to_python(queryset, name, value))
+            for (name, descending), value in zip(ordering, values)
+        ]
+        return self.keyset_conditions(keys)
+
+    def keyset_conditions(self, keys):
+        """
+        Для ключа (name, desc, nullable, value), ... без NULL:
+        f1 <= v1 AND (f1 < v1 OR (f1 = v1 AND <остальные поля после>)).
+        Лишнее на вид f1 <= v1 - граница диапазона индекса, иначе OR
+        целиком уходит в Filter и скан идет с начала индекса.
+        NULL в f1 - отдельные условия: после значений (DESC NULLS LAST)
+        или при v1 = NULL - f1 IS NULL AND <остальные поля после>
+        с собственной границей по f2.
+        """
+        (name, descending, nullable, value), rest = keys[0], keys[1:]
+        rest = self.keyset_conditions(rest) if rest else []
+        null = Q(**{f'{name}__isnull': True})
+
+        if value is None:
+            conditions = [null & condition for condition in rest]
+            if not descending:
+                conditions.append(Q(**{f'{name}__isnull': False}))
+            return conditions
+
+        bound, strict = ('lte', 'lt') if descending else ('gte', 'gt')
+        after = Q(**{f'{name}__{strict}': value})
+        if rest:
+            equal_rest = Q(pk__in=[])
+            for condition in rest:
+                equal_rest |= condition
+            after = Q(**{f'{name}__{bound}': value}) & (
+                after | Q(**{name: value}) & equal_rest
+            )
+        conditions = [after]
+        if descending and nullable:
+            conditions.append(null)
+        return conditions
+
+    def is_nullable(self, queryset, name):
+        """Может ли поле сортировки быть NULL (через связи и аннотации - да)"""
+        if '__' in name or name in queryset.query.annotations:
+            return True
+        return queryset.model._meta.get_field(name).null
+
+    def to_python(self, queryset, name, value):
+        """Восстанавливает значение из курсора по типу поля модели"""
+        if value is None:
+            return None
+        field = self.resolve_field(queryset, name)
+        try:
+            return field.to_python(value)
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def resolve_field(self, queryset, name):
+        # Сортировка по аннотации (например search_rank)
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+        model = queryset.model
+        *relations, field_name = name.split('__')
+        for relation in relations:
+            model = model._meta.get_field(relation).related_model
+        return model._meta.get_field(field_name)
+
+    def get_value(self, instance, name):
+        """Значение поля сортировки у объекта (в т.ч. через связи)"""
+        value = instance
+        for attr in name.split('__'):
+            value = getattr(value, attr)
+            if value is None:
+                return None
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return value
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            cursor = {'values': list(data['v']), 'reverse': bool(data['r'])}
+            ordering = [list(item) for item in data['o']]
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+        # Курсор, выданный для другой сортировки, невалиден
+        if ordering != [list(item) for item in self.ordering]:
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def encode_cursor(self, instance, reverse):
+        data = {
+            'v': [self.get_value(instance, name) for name, _ in self.ordering],
+            'r': reverse,
+            'o': self.ordering,
+        }
+        encoded = base64.urlsafe_b64encode(
+            json.dumps(data, separators=(',', ':')).encode()
+        ).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param,
+                                   encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True,
+                             'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Курсор страницы',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Количество объектов на странице',
+                'schema': {'type': 'integer'},
+            },
+        ]
+
+
+class AsyncPageNumberPagination(PageNumberPagination):
+    """
+    PageNumberPagination, которая умеет выбирать страницу асинхронно
+    (acount и async for по срезу) для AsyncReadMixin.
+    Синхронный путь и формат ответа не меняются.
+    """
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        # Количество считаем заранее, чтобы Paginator не делал COUNT сам
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            )
+            raise NotFound(msg)
+
+        self.page.object_list = [obj async for obj in self.page.object_list]
+        if paginator.num_pages > 1 and self.template is not None:
+            # The browsable API should display pagination controls.
+            self.display_page_controls = True
+        return list(self.page)
@@ -1,7 +1,28 @@
+import codecs
 import csv
 import io
+
+from django.conf import settings
 from rest_framework import renderers
-from rest_framework.parsers import BaseParser
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+from rest_framework.settings import api_settings
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # orjson - необязательная зависимость (extra "speedups")
+    orjson = None
+
+
+class Echo:
+    """
+    Псевдо-буфер для csv.writer: вместо записи возвращает строку,
+    чтобы ее можно было сразу отдать в StreamingHttpResponse
+    """
+
+    def write(self, value):
+        return value
 
 
 class CSVRenderer(renderers.BaseRenderer):
@@ -37,6 +58,22 @@ class CSVRenderer(renderers.BaseRenderer):
 
         return csv_buffer.getvalue().encode(self.charset)
 
+    def render_stream(self, chunks):
+        """
+        Потоково рендерим CSV: принимаем итератор чанков (списков словарей)
+        и отдаем строку за строкой, не собирая весь файл в памяти.
+        Заголовки берутся из первого объекта, как и в render.
+        """
+        writer = None
+        for chunk in chunks:
+            for item in chunk:
+                if writer is None:
+                    writer = csv.DictWriter(
+                        Echo(), fieldnames=self._get_csv_headers(item)
+                    )
+                    yield writer.writeheader()
+                yield writer.writerow(self._flatten_dict(item))
+
     def _render_list_to_csv(self, data_list, csv_buffer):
         """Рендерим список объектов в CSV"""
         if not data_list:
@@ -116,3 +153,84 @@ class PlainTextParser(BaseParser):
         return {
             'content': stream.read().decode('utf-8')
         }
+
+
+class ORJSONRenderer(renderers.JSONRenderer):
+    """
+    JSON рендерер на orjson, побайтово совместимый с JSONRenderer.
+
+    orjson умеет только компактный вывод в UTF-8, поэтому быстрый путь
+    используется при compact (по умолчанию COMPACT_JSON), UNICODE_JSON=True
+    и без отступов (indent). В остальных случаях, а также без
+    установленного orjson, рендерит стандартный JSONRenderer.
+
+    Даты и типы, которых orjson не знает (Decimal, lazy-строки, QuerySet),
+    уходят в JSONEncoder DRF, поэтому DATETIME_FORMAT и
+    COERCE_DECIMAL_TO_STRING работают как раньше. Если orjson не может
+    закодировать данные (int больше 64 бит), рендерит JSONRenderer.
+    """
+    orjson_options = (
+        orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if orjson else 0
+    )
+
+    def __init__(self):
+        super().__init__()
+        self.encoder = encoders.JSONEncoder()
+
+    def use_orjson(self, indent):
+        return (
+            orjson is not None and
+            indent is None and
+            self.compact and
+            not self.ensure_ascii
+        )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        indent = self.get_indent(accepted_media_type, renderer_context)
+        if not self.use_orjson(indent):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.encoder.default,
+                               option=self.orjson_options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Как и JSONRenderer, экранируем разделители строк для JS
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+            b'\xe2\x80\xa9', b'\\u2029')
+
+
+class CompactORJSONRenderer(ORJSONRenderer):
+    """
+    ORJSONRenderer с компактным выводом независимо от COMPACT_JSON:
+    для view, которым нужен быстрый путь без смены настройки для всего API
+    """
+    compact = True
+
+
+class ORJSONParser(JSONParser):
+    """
+    JSON парсер на orjson.
+
+    orjson строгий (NaN/Infinity запрещены) и принимает только UTF-8,
+    поэтому при STRICT_JSON=False или другой кодировке используется
+    стандартный JSONParser.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if (orjson is None or not api_settings.STRICT_JSON or
+                codecs.lookup(encoding).name != 'utf-8'):
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
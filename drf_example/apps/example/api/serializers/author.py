@@ -45,6 +45,10 @@ class AuthorSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at', 'posts',
         ]
         read_only_fields = ['created_at', 'updated_at']
+        # Подсказки для eager loading (см. api/eager_loading.py)
+        query_hints = {
+            'full_name': {'select_related': ['user']},
+        }
 
 class CreateAuthorSerializer(serializers.ModelSerializer):
     """
@@ -61,3 +65,6 @@ class CreateAuthorSerializer(serializers.ModelSerializer):
             'website',
             'birth_date',
         ]
+        query_hints = {
+            'full_name': {'select_related': ['user']},
+        }
@@ -1,13 +1,237 @@
+from collections import Counter
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.db.models import (
+    BooleanField, ExpressionWrapper, Q, prefetch_related_objects,
+)
+from django.utils.timezone import now
 from rest_framework import serializers
+from rest_framework.validators import UniqueValidator
+
+from drf_example.apps.example import counters
+from drf_example.apps.example.api.cache import invalidate
+from drf_example.apps.example.models import Author, Post, Tag
+
+
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PK поле, которое при пакетной валидации берет объекты из словаря,
+    заранее загруженного PostListSerializer одним запросом на модель
+    """
+
+    def to_internal_value(self, data):
+        prefetched = getattr(self.root, 'prefetched_relations', None)
+        model = self.get_queryset().model
+        if prefetched is None or model not in prefetched:
+            return super().to_internal_value(data)
+
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = model._meta.pk.to_python(data)
+        except DjangoValidationError:
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return prefetched[model][pk]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+
+
+class PostListSerializer(serializers.ListSerializer):
+    """
+    Пакетные создание и обновление постов.
+
+    Валидация всей пачки идет набором запросов, не зависящим от ее
+    размера: связи (author, tags) загружаются заранее, уникальность slug
+    проверяется одним запросом. Запись - bulk_create/bulk_update и одна
+    пакетная вставка в таблицу связей Post.tags.
+    """
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            return super().to_internal_value(data)
+
+        self.prefetch_relations(data)
+        # Уникальность slug проверяем для всей пачки в validate
+        slug_field = self.child.fields.get('slug')
+        if slug_field is not None:
+            slug_field.validators = [
+                validator for validator in slug_field.validators
+                if not isinstance(validator, UniqueValidator)
+            ]
 
-from drf_example.apps.example.models import Post
+        instances = self.instance or []
+        ret, errors = [], []
+        for index, item in enumerate(data):
+            self.child.instance = (
+                instances[index] if index < len(instances) else None
+            )
+            try:
+                validated = self.child.run_validation(item)
+            except serializers.ValidationError as exc:
+                errors.append(exc.detail)
+            else:
+                ret.append(validated)
+                errors.append({})
+        self.child.instance = None
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return ret
+
+    def prefetch_relations(self, data):
+        """Загружает author и tags всей пачки по одному запросу на модель"""
+        self.prefetched_relations = {}
+        for name in ('author', 'tags'):
+            field = self.child.fields.get(name)
+            if field is None or field.read_only:
+                continue
+            many = isinstance(field, serializers.ManyRelatedField)
+            relation = field.child_relation if many else field
+            pks = set()
+            for item in data:
+                if not isinstance(item, dict) or item.get(name) is None:
+                    continue
+                values = item[name] if many else [item[name]]
+                if isinstance(values, (list, tuple)):
+                    pks.update(value for value in values
+                               if isinstance(value, (int, str)))
+            queryset = relation.get_queryset()
+            self.prefetched_relations[queryset.model] = (
+                queryset.in_bulk(self.clean_pks(queryset.model, pks))
+            )
+
+    def clean_pks(self, model, pks):
+        """Отбрасывает значения, которые не являются PK (ошибку даст поле)"""
+        cleaned = []
+        for pk in pks:
+            try:
+                cleaned.append(model._meta.pk.to_python(pk))
+            except DjangoValidationError:
+                continue
+        return cleaned
+
+    def validate(self, attrs):
+        """Уникальность slug внутри пачки и в БД одним запросом"""
+        slugs = [item['slug'] for item in attrs if 'slug' in item]
+        duplicates = {slug for slug, count in Counter(slugs).items()
+                      if count > 1}
+
+        existing = Post.objects.filter(slug__in=slugs)
+        if self.instance:
+            existing = existing.exclude(
+                pk__in=[instance.pk for instance in self.instance]
+            )
+        taken = duplicates | set(existing.values_list('slug', flat=True))
+        if not taken:
+            return attrs
+
+        errors = [
+            {'slug': ['Пост с таким slug уже существует.']}
+            if item.get('slug') in taken else {}
+            for item in attrs
+        ]
+        raise serializers.ValidationError(errors)
+
+    def create(self, validated_data):
+        tags = [item.pop('tags', []) for item in validated_data]
+        with transaction.atomic():
+            posts = Post.objects.bulk_create(
+                [Post(**item) for item in validated_data]
+            )
+            self.set_tags(posts, tags)
+            # bulk_create не шлет сигналов - обновляем счетчики
+            # и поисковые имена сами
+            Post.objects.filter(
+                pk__in=[post.pk for post in posts]
+            ).update_search_names()
+            self.refresh_posts_counts(
+                author_ids={post.author_id for post in posts},
+                tag_ids={tag.pk for post_tags in tags for tag in post_tags},
+            )
+        invalidate('post', 'tag')
+        return posts
+
+    def update(self, instances, validated_data):
+        tags = [item.pop('tags', None) for item in validated_data]
+        # Авторы и теги до изменения - для пересчета счетчиков
+        author_ids = {instance.author_id for instance in instances}
+        tag_ids = set()
+        fields = set()
+        for instance, item in zip(instances, validated_data):
+            for attr, value in item.items():
+                setattr(instance, attr, value)
+            fields.update(item)
+            # bulk_update не обновляет auto_now поля
+            instance.updated_at = now()
+        fields.add('updated_at')
+
+        with transaction.atomic():
+            Post.objects.bulk_update(instances, sorted(fields))
+            changed = [
+                (instance, item_tags)
+                for instance, item_tags in zip(instances, tags)
+                if item_tags is not None
+            ]
+            if changed:
+                posts, post_tags = zip(*changed)
+                old_links = Post.tags.through.objects.filter(
+                    post_id__in=[post.pk for post in posts]
+                )
+                tag_ids.update(old_links.values_list('tag_id', flat=True))
+                old_links.delete()
+                self.set_tags(posts, post_tags)
+                tag_ids.update(tag.pk for item_tags in post_tags
+                               for tag in item_tags)
+            # Поисковые имена зависят от автора и тегов
+            renamed = instances if 'author' in fields else [
+                instance for instance, _ in changed
+            ]
+            if renamed:
+                Post.objects.filter(
+                    pk__in=[instance.pk for instance in renamed]
+                ).update_search_names()
+
+            author_ids.update(instance.author_id for instance in instances)
+            self.refresh_posts_counts(author_ids=author_ids, tag_ids=tag_ids)
+        invalidate('post', 'tag')
+        return instances
+
+    def refresh_posts_counts(self, author_ids, tag_ids):
+        """Пересчитывает posts_count затронутых пачкой авторов и тегов"""
+        counters.refresh_posts_count(Author, author_ids)
+        counters.refresh_posts_count(Tag, tag_ids)
+
+    def set_tags(self, posts, tags):
+        """
+        Одна пакетная вставка в таблицу связей Post.tags
+        и одна выборка новых тегов для data
+        """
+        through = Post.tags.through
+        through.objects.bulk_create(
+            [
+                through(post_id=post.pk, tag_id=tag.pk)
+                for post, post_tags in zip(posts, tags)
+                for tag in post_tags
+            ],
+            ignore_conflicts=True,
+        )
+        for post in posts:
+            # Старый кеш prefetch: иначе prefetch_related_objects
+            # пропустит пост
+            getattr(post, '_prefetched_objects_cache', {}).pop('tags', None)
+        prefetch_related_objects(posts, 'tags')
 
 
 class PostSerializer(serializers.ModelSerializer):
     """
     Базовый сериализатор для Post
     """
-    reading_time = serializers.ReadOnlyField()
+    serializer_related_field = PrefetchedPrimaryKeyRelatedField
+
+    # Подсвеченный фрагмент, есть только в ответе на ?search=
+    search_headline = serializers.CharField(read_only=True)
     is_published = serializers.ReadOnlyField()
     featured_image = serializers.ImageField(
         required=False,
@@ -33,11 +257,24 @@ class PostSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Post
+        list_serializer_class = PostListSerializer
         fields = [
             'id', 'title', 'slug', 'content', 'excerpt',
             'author', 'tags', 'featured_image', 'status',
             'views_count', 'is_featured', 'reading_time',
             'is_published', 'published_at', 'created_at', 'updated_at',
+            'search_headline',
             # 'author_name',
         ]
-        read_only_fields = ['created_at', 'updated_at', 'views_count']
+        read_only_fields = ['created_at', 'updated_at', 'views_count',
+                            'reading_time']
+        # Колонки для property-полей при проекции по ?fields=
+        query_hints = {
+            'is_published': {
+                'only': ['status'],
+                'expression': ExpressionWrapper(Q(status='published'),
+                                                output_field=BooleanField()),
+            },
+            # Аннотация PostgresSearchFilter, колонок не требует
+            'search_headline': {'only': []},
+        }
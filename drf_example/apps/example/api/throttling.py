@@ -0,0 +1,232 @@
+"""
+Throttling в Redis по алгоритму GCRA (generic cell rate algorithm).
+
+Вместо списка времен запросов в кеше для ключа хранится одно число -
+TAT (theoretical arrival time), момент, когда "ведро" снова станет пустым.
+Проверка и запись выполняются одним Lua-скриптом, поэтому они атомарны
+между воркерами, а состояние и стоимость проверки - O(1).
+
+Частоты берутся как обычно: из scope и DEFAULT_THROTTLE_RATES
+или атрибута rate. Для '100/hour' разрешается всплеск до 100 запросов,
+дальше - по одному каждые 36 секунд. wait() возвращает точное время
+до следующего разрешенного запроса (Retry-After).
+
+CostRateThrottle списывает с бюджета не запрос, а его стоимость -
+размер ответа, и только после ответа (см. CostThrottleMixin).
+
+Если Redis недоступен, запросы пропускаются.
+"""
+import logging
+import math
+
+import redis
+from django.conf import settings
+from rest_framework import throttling
+
+logger = logging.getLogger(__name__)
+
+THROTTLE_KEY = 'example:throttle:{key}'
+# Последняя стоимость действия для ключа CostRateThrottle
+COST_KEY = 'example:throttle:cost:{key}:{action}'
+
+# KEYS[1] - ключ; ARGV: интервал между запросами (мс), окно (мс), стоимость.
+# Время берется из Redis, чтобы не зависеть от часов воркеров.
+# Возвращает {1, 0} если запрос разрешен, иначе {0, ожидание в мс}.
+GCRA_SCRIPT = """
+redis.replicate_commands()
+local interval = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local tat = tonumber(redis.call('GET', KEYS[1])) or now
+if tat < now then
+    tat = now
+end
+local new_tat = tat + interval * cost
+local allow_at = new_tat - period
+if allow_at > now then
+    return {0, allow_at - now}
+end
+redis.call('SET', KEYS[1], string.format('%d', new_tat), 'PX', new_tat - now)
+return {1, 0}
+"""
+
+# KEYS: ключ бюджета, ключ стоимости; ARGV: интервал (мс), окно (мс),
+# бесплатная стоимость, размер бюджета. Ничего не списывает: проверяет,
+# хватит ли бюджета на прошлую стоимость действия. Дешевые действия
+# не проверяются, дороже всего бюджета - ждут полный бюджет.
+COST_CHECK_SCRIPT = """
+redis.replicate_commands()
+local interval = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local estimate = tonumber(redis.call('GET', KEYS[2])) or 0
+if estimate <= tonumber(ARGV[3]) then
+    return {1, 0}
+end
+estimate = math.min(estimate, tonumber(ARGV[4]))
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local tat = tonumber(redis.call('GET', KEYS[1])) or now
+if tat < now then
+    tat = now
+end
+local allow_at = tat + interval * estimate - period
+if allow_at > now then
+    return {0, allow_at - now}
+end
+return {1, 0}
+"""
+
+# KEYS как у COST_CHECK_SCRIPT; ARGV: интервал (мс), окно (мс), стоимость.
+# Списывает стоимость без проверки и запоминает ее для действия.
+COST_CHARGE_SCRIPT = """
+redis.replicate_commands()
+local interval = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local tat = tonumber(redis.call('GET', KEYS[1])) or now
+if tat < now then
+    tat = now
+end
+local new_tat = tat + interval * cost
+if new_tat > now then
+    redis.call('SET', KEYS[1], string.format('%d', new_tat),
+               'PX', new_tat - now)
+end
+redis.call('SET', KEYS[2], cost, 'PX', period)
+return 1
+"""
+
+_redis_client = None
+_scripts = {}
+
+
+def get_script(source):
+    """Скрипт регистрируется один раз, дальше вызывается через EVALSHA"""
+    global _redis_client
+    if source not in _scripts:
+        if _redis_client is None:
+            _redis_client = redis.Redis.from_url(settings.REDIS_URL)
+        _scripts[source] = _redis_client.register_script(source)
+    return _scripts[source]
+
+
+class GCRAThrottleMixin:
+    """
+    Подмешивается перед SimpleRateThrottle и его наследниками:
+    get_cache_key, scope и rate остаются прежними
+    """
+    # Стоимость одного запроса в единицах частоты
+    cost = 1
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.wait_seconds = None
+        try:
+            allowed, wait_ms = self.consume(
+                self.key, self.get_cost(request, view)
+            )
+        except redis.RedisError:
+            logger.warning('Redis недоступен, throttle %s пропускает запрос',
+                           self.scope, exc_info=True)
+            return True
+
+        if allowed:
+            return True
+        self.wait_seconds = wait_ms / 1000
+        return False
+
+    def get_cost(self, request, view):
+        return self.cost
+
+    def consume(self, key, cost):
+        """Списывает cost из ведра ключа: (разрешено, ожидание в мс)"""
+        interval, period = self.get_interval()
+        allowed, wait_ms = get_script(GCRA_SCRIPT)(
+            keys=[THROTTLE_KEY.format(key=key)],
+            args=[interval, period, cost],
+        )
+        return bool(allowed), wait_ms
+
+    def get_interval(self):
+        """Интервал между запросами и окно частоты, мс"""
+        period = self.duration * 1000
+        return max(round(period / self.num_requests), 1), period
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class AnonRateThrottle(GCRAThrottleMixin, throttling.AnonRateThrottle):
+    pass
+
+
+class UserRateThrottle(GCRAThrottleMixin, throttling.UserRateThrottle):
+    pass
+
+
+class ScopedRateThrottle(GCRAThrottleMixin, throttling.ScopedRateThrottle):
+
+    def allow_request(self, request, view):
+        # Scope и частота берутся из view, как в DRF
+        self.scope = getattr(view, self.scope_attr, None)
+        if not self.scope:
+            return True
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        return super().allow_request(request, view)
+
+
+class CostRateThrottle(GCRAThrottleMixin, throttling.UserRateThrottle):
+    """
+    Бюджет пользователя в единицах стоимости (cost_unit байт ответа)
+    на окно частоты, например 'cost': '10000/m' - 10000 КиБ в минуту.
+
+    Стоимость запроса известна только после ответа: view списывает ее
+    через charge (CostThrottleMixin). До ответа проверяется, хватит ли
+    бюджета на прошлую стоимость того же действия, поэтому тяжелые
+    выгрузки ждут, а дешевые запросы (не дороже free_cost) того же
+    пользователя проходят без проверки.
+    """
+    scope = 'cost'
+    cost_unit = 1024
+    free_cost = 64
+
+    def allow_request(self, request, view):
+        self.action = getattr(view, 'action', None) or request.method.lower()
+        return super().allow_request(request, view)
+
+    def get_keys(self, key):
+        return [THROTTLE_KEY.format(key=key),
+                COST_KEY.format(key=key, action=self.action)]
+
+    def consume(self, key, cost):
+        interval, period = self.get_interval()
+        allowed, wait_ms = get_script(COST_CHECK_SCRIPT)(
+            keys=self.get_keys(key),
+            args=[interval, period, self.free_cost, self.num_requests],
+        )
+        return bool(allowed), wait_ms
+
+    def charge(self, size):
+        """Списывает стоимость ответа размером size байт"""
+        if getattr(self, 'key', None) is None:
+            return
+        interval, period = self.get_interval()
+        try:
+            get_script(COST_CHARGE_SCRIPT)(
+                keys=self.get_keys(self.key),
+                args=[interval, period, math.ceil(size / self.cost_unit)],
+            )
+        except redis.RedisError:
+            logger.warning('Redis недоступен, стоимость запроса не списана',
+                           exc_info=True)
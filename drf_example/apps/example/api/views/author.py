@@ -3,20 +3,32 @@ from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
 from rest_framework.response import Response
 
+from drf_example.apps.example.api.cache import (
+    CachedResponseMixin, ConditionalGetMixin,
+)
+from drf_example.apps.example.api.pagination import AsyncPageNumberPagination
 from drf_example.apps.example.api.renderer import CSVRenderer
 from drf_example.apps.example.api.serializers import AuthorSerializer
 from drf_example.apps.example.api.serializers.author import \
     CreateAuthorSerializer
+from drf_example.apps.example.api.views.mixins import (
+    AsyncReadMixin, EagerLoadingMixin,
+)
 from drf_example.apps.example.models import Author
 
 
-class AuthorViewSet(viewsets.ModelViewSet):
+class AuthorViewSet(ConditionalGetMixin, CachedResponseMixin,
+                    EagerLoadingMixin, AsyncReadMixin,
+                    viewsets.ModelViewSet):
     """
     ViewSet для работы с авторами
     """
     queryset = Author.objects.all()
     serializer_class = AuthorSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = AsyncPageNumberPagination
+    # В ответе full_name пользователя и вложенные посты с тегами
+    cache_scopes = ('author', 'user', 'post', 'tag')
     ordering_fields = '__all__'
     # filterset_fields = (
     #     'birth_date',
@@ -27,6 +39,7 @@ class AuthorViewSet(viewsets.ModelViewSet):
     filterset_fields = {
         'bio': ['exact', 'icontains'],
         'birth_date': ['year', 'year__gte', 'year__lte'],
+        'posts_count': ['exact', 'gte', 'lte'],
     }
 
     def list(self, request, *args, **kwargs):
@@ -53,10 +66,9 @@ class AuthorViewSet(viewsets.ModelViewSet):
         Получить лучшего автора (по количеству постов)
         """
         author = self.get_object()
-        posts_count = author.posts.count()
         return Response({
             'author': author.full_name,
-            'posts_count': posts_count
+            'posts_count': author.posts_count
         }, status=status.HTTP_200_OK)
 
     @action(
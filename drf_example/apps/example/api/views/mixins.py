@@ -0,0 +1,275 @@
+import functools
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import Http404
+from rest_framework import status
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from drf_example.apps.example.api.compiled import compile_serializer
+from drf_example.apps.example.api.eager_loading import optimize_queryset
+
+
+class EagerLoadingMixin:
+    """
+    Миксин для ViewSet'ов: подгружает связи, нужные сериализатору,
+    одним набором запросов вместо запроса на каждую строку
+    """
+    # False - queryset отдается без оптимизации (например для COUNT)
+    eager_loading = True
+
+    def optimize_queryset(self, queryset):
+        """
+        Применяет к queryset select/prefetch/annotate по полям сериализатора.
+        На чтение дополнительно выбираются только нужные полям колонки.
+        """
+        if not self.eager_loading:
+            return queryset
+        project = self.request is not None and self.request.method in SAFE_METHODS
+        return optimize_queryset(queryset, self.get_serializer(), project=project)
+
+    def get_queryset(self):
+        return self.optimize_queryset(super().get_queryset())
+
+
+class CompiledSerializationMixin:
+    """
+    Миксин для ViewSet'ов: списки на чтение сериализуются
+    скомпилированным сериализатором (api/compiled.py), запись и
+    неподдерживаемые наборы полей идут обычным путем DRF
+    """
+    compiled_serialization = True
+
+    def get_compiled_serializer(self, serializer):
+        """CompiledSerializer для дочернего сериализатора или None"""
+        if not self.compiled_serialization:
+            return None
+        if self.request is None or self.request.method not in SAFE_METHODS:
+            return None
+        return compile_serializer(serializer.child)
+
+    def get_serialized_data(self, objects):
+        """
+        То же, что get_serializer(objects, many=True).data
+        для queryset или списка объектов
+        """
+        serializer = self.get_serializer(objects, many=True)
+        compiled = self.get_compiled_serializer(serializer)
+        if compiled is None:
+            return serializer.data
+        return compiled.serialize(objects, serializer)
+
+    def iter_serialized_data(self, queryset, chunk_size):
+        """Сериализованные строки queryset списками по chunk_size"""
+        serializer = self.get_serializer(queryset, many=True)
+        compiled = self.get_compiled_serializer(serializer)
+        if compiled is not None:
+            yield from compiled.iter_queryset(queryset, serializer.context,
+                                              chunk_size)
+            return
+
+        chunk = []
+        for instance in queryset.iterator(chunk_size=chunk_size):
+            chunk.append(instance)
+            if len(chunk) >= chunk_size:
+                yield self.get_serializer(chunk, many=True).data
+                chunk = []
+        if chunk:
+            yield self.get_serializer(chunk, many=True).data
+
+
+# Размер чанка aiterator для списков без пагинации
+ASYNC_CHUNK_SIZE = 2000
+
+
+class AsyncReadMixin:
+    """
+    Асинхронные list/retrieve для ViewSet'ов под ASGI (ASYNC_VIEWS).
+
+    View маршрута с list или retrieve становится корутиной:
+    аутентификация, права и throttle (initial) выполняются
+    в sync_to_async, а list и retrieve - методами alist/aretrieve
+    на async ORM (aget, acount, async for), так что ожидание БД
+    и медленного клиента не занимает поток. Остальные методы того же
+    маршрута (POST, PUT, DELETE) целиком идут обычным dispatch в потоке.
+    Маршруты без list/retrieve и все view под WSGI остаются синхронными.
+
+    Кеш и условные GET подключаются через alist/aretrieve
+    CachedResponseMixin и ConditionalGetMixin (миксин должен идти
+    после них).
+    """
+    async_actions = ('list', 'retrieve')
+    # Включается в as_view для маршрутов с async_actions под ASGI
+    use_async_dispatch = False
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        if not (settings.ASYNC_VIEWS and actions and
+                set(actions.values()) & set(cls.async_actions)):
+            return super().as_view(actions, **initkwargs)
+
+        view = super().as_view(actions, use_async_dispatch=True,
+                               **initkwargs)
+
+        @functools.wraps(view)
+        async def async_view(request, *args, **kwargs):
+            return await view(request, *args, **kwargs)
+
+        return async_view
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.use_async_dispatch:
+            return super().dispatch(request, *args, **kwargs)
+        return self.async_dispatch(request, *args, **kwargs)
+
+    async def async_dispatch(self, request, *args, **kwargs):
+        """dispatch APIView, в котором list/retrieve - корутины"""
+        action = self.action_map.get(request.method.lower())
+        if action not in self.async_actions:
+            return await sync_to_async(super().dispatch)(request, *args,
+                                                         **kwargs)
+
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            handler = getattr(self, f'a{self.action}')
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = await sync_to_async(self.handle_exception)(exc)
+
+        # Списание стоимости и запись в кеш ходят в Redis синхронно
+        self.response = await sync_to_async(self.finalize_response)(
+            request, response, *args, **kwargs
+        )
+        return self.response
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+
+        page = await self.apaginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        objects = [obj async for obj in
+                   queryset.aiterator(chunk_size=ASYNC_CHUNK_SIZE)]
+        serializer = self.get_serializer(objects, many=True)
+        return Response(serializer.data)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data)
+
+    async def apaginate_queryset(self, queryset):
+        """Страница queryset или None, если пагинация не используется"""
+        paginator = self.paginator
+        if paginator is None:
+            return None
+        if hasattr(paginator, 'apaginate_queryset'):
+            return await paginator.apaginate_queryset(queryset, self.request,
+                                                      view=self)
+        return await sync_to_async(paginator.paginate_queryset)(
+            queryset, self.request, view=self
+        )
+
+    async def aget_object(self):
+        """Асинхронный вариант get_object"""
+        queryset = self.filter_queryset(self.get_queryset())
+
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        assert lookup_url_kwarg in self.kwargs, (
+            'Expected view %s to be called with a URL keyword argument '
+            'named "%s". Fix your URL conf, or set the `.lookup_field` '
+            'attribute on the view correctly.' %
+            (self.__class__.__name__, lookup_url_kwarg)
+        )
+
+        filter_kwargs = {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        try:
+            obj = await queryset.aget(**filter_kwargs)
+        except (queryset.model.DoesNotExist, TypeError, ValueError,
+                DjangoValidationError):
+            raise Http404
+
+        await sync_to_async(self.check_object_permissions)(self.request, obj)
+        return obj
+
+
+class CostThrottleMixin:
+    """
+    Списывает стоимость ответа (размер в байтах) с throttle, у которых
+    есть charge (CostRateThrottle). Размер известен после рендера,
+    у потоковых ответов - после отдачи последнего чанка.
+    """
+
+    def get_throttles(self):
+        if not hasattr(self, '_throttles'):
+            self._throttles = super().get_throttles()
+        return self._throttles
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args,
+                                             **kwargs)
+        if response.status_code == status.HTTP_429_TOO_MANY_REQUESTS:
+            return response
+        throttles = [
+            throttle for throttle in getattr(self, '_throttles', ())
+            if hasattr(throttle, 'charge')
+        ]
+        if throttles:
+            charge_response(response, throttles)
+        return response
+
+
+def charge_response(response, throttles):
+    """Вызывает charge(size) у throttles, когда размер ответа известен"""
+    def charge(size):
+        for throttle in throttles:
+            throttle.charge(size)
+
+    if not response.streaming:
+        if getattr(response, 'is_rendered', True):
+            charge(len(response.content))
+        else:
+            response.add_post_render_callback(
+                lambda rendered: charge(len(rendered.content))
+            )
+    elif response.has_header('Content-Length'):
+        # FileResponse: размер известен, sendfile не ломаем
+        charge(int(response['Content-Length']))
+    elif response.is_async:
+        response.streaming_content = acount_bytes(
+            response.streaming_content, charge
+        )
+    else:
+        response.streaming_content = count_bytes(
+            response.streaming_content, charge
+        )
+
+
+def count_bytes(content, charge):
+    size = 0
+    try:
+        for chunk in content:
+            size += len(chunk)
+            yield chunk
+    finally:
+        charge(size)
+
+
+async def acount_bytes(content, charge):
+    size = 0
+    try:
+        async for chunk in content:
+            size += len(chunk)
+            yield chunk
+    finally:
+        charge(size)
@@ -1,16 +1,40 @@
+import functools
+
+from asgiref.sync import sync_to_async
 from django.db import transaction
-from django.db.models import Q, QuerySet
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db.models import FloatField, QuerySet
+from django.db.models.functions import Cast
+from celery.result import AsyncResult
+from django.http import FileResponse, StreamingHttpResponse
+from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
-from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.filters import OrderingFilter
+from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
-from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
-from rest_framework.throttling import UserRateThrottle
 
-from drf_example.apps.example.api.renderer import CSVRenderer
+from drf_example.apps.example import counters, exports
+from drf_example.apps.example.api.cache import (
+    CachedResponseMixin, ConditionalGetMixin,
+)
+from drf_example.apps.example.api.filters import PostgresSearchFilter
+from drf_example.apps.example.api.pagination import KeysetPagination
+from drf_example.apps.example.api.renderer import (
+    CompactORJSONRenderer, CSVRenderer, ORJSONParser,
+)
 from drf_example.apps.example.api.serializers import PostSerializer
-from drf_example.apps.example.models import Post
+from drf_example.apps.example.api.throttling import (
+    CostRateThrottle, UserRateThrottle,
+)
+from drf_example.apps.example.api.views.mixins import (
+    AsyncReadMixin, CompiledSerializationMixin, CostThrottleMixin,
+    EagerLoadingMixin,
+)
+from drf_example.apps.example.models import Author, Post
 
 import django_filters
 
@@ -22,6 +46,10 @@ class CustomThrottle(UserRateThrottle):
     rate = '1/m'  # Ограничение 100 запросов в час
 
 
+# Размер чанка серверного курсора при потоковом экспорте
+EXPORT_CHUNK_SIZE = 2000
+
+
 class PostFilter(django_filters.FilterSet):
     """
     Кастомные фильтры для постов
@@ -57,15 +85,27 @@ class PostFilter(django_filters.FilterSet):
             'is_featured': ['exact'],
             'published_at': ['year', 'year__gte', 'year__lte'],
             'views_count': ['gte', 'lte'],
+            'reading_time': ['exact', 'gte', 'lte'],
         }
 
     def filter_by_author_name(self, queryset, name, value):
-        """Поиск по имени автора"""
-        return queryset.filter(
-            Q(author__user__first_name__icontains=value) |
-            Q(author__user__last_name__icontains=value) |
-            Q(author__user__username__icontains=value)
+        """
+        Поиск по имени автора.
+
+        Ищем подстроку в Author.search_name (trigram GIN индекс) и
+        сортируем по похожести имени, если не задана явная сортировка
+        """
+        value = value.lower()
+        authors = Author.objects.filter(search_name__contains=value)
+        queryset = queryset.filter(author__in=authors).annotate(
+            # double precision, чтобы значение точно восстанавливалось
+            # из курсора keyset пагинации
+            author_similarity=Cast(
+                TrigramSimilarity('author__search_name', value), FloatField()
+            ),
         )
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        return queryset.order_by('-author_similarity', *ordering)
 
     def filter_popular(self, queryset, name, value):
         """Фильтр популярных постов"""
@@ -74,15 +114,33 @@ class PostFilter(django_filters.FilterSet):
         return queryset
 
 
-class PostViewSet(viewsets.ModelViewSet):
+class PostViewSet(ConditionalGetMixin, CachedResponseMixin,
+                  EagerLoadingMixin, CompiledSerializationMixin,
+                  CostThrottleMixin, AsyncReadMixin, viewsets.ModelViewSet):
     """
     ViewSet для работы с постами
     """
     queryset = Post.objects.all()
     serializer_class = PostSerializer
-    renderer_classes = [BrowsableAPIRenderer, JSONRenderer, CSVRenderer]
+    renderer_classes = [BrowsableAPIRenderer, CompactORJSONRenderer,
+                        CSVRenderer]
+    parser_classes = [ORJSONParser, FormParser, MultiPartParser]
+    filter_backends = [DjangoFilterBackend, PostgresSearchFilter,
+                       OrderingFilter]
     filterset_class = PostFilter
-    throttle_classes = [CustomThrottle]
+    # Keyset пагинация по (published_at, created_at, id),
+    # использует индексы post_keyset_idx и post_author_keyset_idx
+    pagination_class = KeysetPagination
+    # CostRateThrottle - бюджет по размеру ответов (export_csv, поиск)
+    throttle_classes = [CustomThrottle, CostRateThrottle]
+    # В ответе id тегов: удаление тега не шлет m2m_changed
+    cache_scopes = ('post', 'tag')
+    # Просмотры переносятся в БД каждые 10 секунд: от них зависит только
+    # detail, в списке views_count обновится со следующим изменением
+    # постов (свежие значения - live_views=true)
+    detail_cache_scopes = ('post_views',)
+    # Прирост просмотров из Redis не кешируем
+    cache_bypass_params = ('live_views',)
     ordering_fields = [
         'created_at',
         'published_at',
@@ -90,6 +148,9 @@ class PostViewSet(viewsets.ModelViewSet):
         'title',
         'author__user__username'
     ]
+    # Полнотекстовый поиск идет по Post.search_vector (title, excerpt,
+    # content, username автора и теги через search_names), список нужен
+    # для поля поиска в browsable API
     search_fields = [
         'title',
         'content',
@@ -137,7 +198,7 @@ class PostViewSet(viewsets.ModelViewSet):
         if author_pk := self.kwargs.get('author_pk'):
             # Фильтруем по автору, если указан author_pk
             queryset = queryset.filter(author__pk=author_pk)
-        return queryset
+        return self.optimize_queryset(queryset)
 
 
     def list(self, request, *args, **kwargs):
@@ -145,39 +206,187 @@ class PostViewSet(viewsets.ModelViewSet):
         GET /posts/ - список объектов
         Переопределяем для добавления кастомной логики
         """
-        raise ValidationError()
-        # Получаем queryset через get_queryset()
-        queryset = self.filter_queryset(self.get_queryset())
+        handler = functools.partial(self.get_cached_response, self.list_response)
+        return self.get_conditional_response(handler, request, *args,
+                                             **kwargs)
 
-        # Добавляем кастомную фильтрацию
-        featured_only = request.query_params.get('featured', None)
-        if featured_only == 'true':
-            queryset = queryset.filter(is_featured=True)
+    def list_response(self, request, *args, **kwargs):
+        """Собирает ответ списка постов без кеша"""
+        queryset = self.get_list_queryset(request)
 
-        # Пагинация
         page = self.paginate_queryset(queryset)
         if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            return self.get_page_response(request, page)
 
-        # Сериализация
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return Response(self.get_serialized_data(queryset))
+
+    def get_list_queryset(self, request):
+        """Queryset списка: фильтры и кастомный featured=true"""
+        queryset = self.filter_queryset(self.get_queryset())
+        if request.query_params.get('featured') == 'true':
+            queryset = queryset.filter(is_featured=True)
+        return queryset
+
+    def get_page_response(self, request, page):
+        """Ответ со страницей списка"""
+        if request.query_params.get('live_views') == 'true':
+            # Добавляем просмотры, еще не перенесенные из Redis
+            counters.merge_pending_views(page)
+        return self.get_paginated_response(self.get_serialized_data(page))
+
+    async def alist(self, request, *args, **kwargs):
+        """Асинхронный list (ASGI), см. AsyncReadMixin"""
+        handler = functools.partial(self.aget_cached_response,
+                                    self.alist_response)
+        return await self.aget_conditional_response(handler, request, *args,
+                                                    **kwargs)
+
+    async def alist_response(self, request, *args, **kwargs):
+        """Асинхронный вариант list_response"""
+        queryset = self.get_list_queryset(request)
+
+        page = await self.apaginate_queryset(queryset)
+        if page is not None:
+            # live_views ходит в Redis синхронно
+            return await sync_to_async(self.get_page_response)(request, page)
+
+        # Без пагинации объекты читаются чанками, сериализация - без запросов
+        objects = [obj async for obj in
+                   queryset.aiterator(chunk_size=EXPORT_CHUNK_SIZE)]
+        return Response(self.get_serialized_data(objects))
 
 
     def retrieve(self, request, *args, **kwargs):
         """
         GET /posts/{id}/ - получение конкретного объекта
+        Ответ может быть взят из кеша, просмотр учитывается всегда
         """
+        handler = functools.partial(self.get_cached_response, self.retrieve_response)
+        response = self.get_conditional_response(handler, request, *args,
+                                                 **kwargs)
+        if response.status_code in (status.HTTP_200_OK,
+                                    status.HTTP_304_NOT_MODIFIED):
+            # Увеличиваем счетчик просмотров в буфере Redis,
+            # в БД он переносится задачей flush_post_views
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            counters.increment_post_views(self.kwargs[lookup_url_kwarg])
+        return response
+
+    def retrieve_response(self, request, *args, **kwargs):
+        """Собирает ответ с постом без кеша"""
         instance = self.get_object()
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data)
 
-        # Увеличиваем счетчик просмотров
-        instance.views_count += 1
-        instance.save(update_fields=['views_count'])
+    async def aretrieve(self, request, *args, **kwargs):
+        """Асинхронный retrieve (ASGI), см. AsyncReadMixin"""
+        handler = functools.partial(self.aget_cached_response,
+                                    self.aretrieve_response)
+        response = await self.aget_conditional_response(handler, request,
+                                                        *args, **kwargs)
+        if response.status_code in (status.HTTP_200_OK,
+                                    status.HTTP_304_NOT_MODIFIED):
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            await sync_to_async(counters.increment_post_views)(
+                self.kwargs[lookup_url_kwarg]
+            )
+        return response
 
+    async def aretrieve_response(self, request, *args, **kwargs):
+        """Асинхронный вариант retrieve_response"""
+        instance = await self.aget_object()
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
 
+    def create(self, request, *args, **kwargs):
+        """
+        POST /posts/ - создание объекта
+        Список объектов в теле - пакетное создание (bulk_create)
+        """
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
+
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['patch'], url_path='bulk')
+    def bulk_update(self, request):
+        """
+        PATCH /posts/bulk/ - пакетное частичное обновление
+        Тело: список объектов, в каждом обязателен id
+        """
+        if not isinstance(request.data, list):
+            raise ValidationError({'non_field_errors': ['Ожидается список объектов']})
+        ids = self.get_bulk_ids(
+            [item.get('id') if isinstance(item, dict) else None
+             for item in request.data]
+        )
+        instances = self.get_bulk_instances(ids)
+
+        if not self.can_modify_all(instances, request.user.is_staff):
+            return Response(
+                {'error': 'Вы можете редактировать только свои посты'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        serializer = self.get_serializer(instances, data=request.data,
+                                         many=True, partial=True)
+        serializer.is_valid(raise_exception=True)
+        self.perform_update(serializer)
+        return Response(serializer.data)
+
+    @bulk_update.mapping.delete
+    def bulk_destroy(self, request):
+        """
+        DELETE /posts/bulk/ - пакетное удаление
+        Тело: список id
+        """
+        if not isinstance(request.data, list):
+            raise ValidationError({'non_field_errors': ['Ожидается список id']})
+        instances = self.get_bulk_instances(self.get_bulk_ids(request.data))
+
+        if not self.can_modify_all(instances, request.user.is_superuser):
+            return Response(
+                {'error': 'Вы можете удалять только свои посты'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        Post.objects.filter(pk__in=[instance.pk for instance in instances]).delete()
+        return Response(
+            {'message': f'Удалено постов: {len(instances)}'},
+            status=status.HTTP_204_NO_CONTENT
+        )
+
+    def get_bulk_ids(self, values):
+        """Проверяет список id из тела пакетного запроса"""
+        if not values:
+            raise ValidationError({'non_field_errors': ['Пустой список']})
+        ids = []
+        for value in values:
+            if isinstance(value, bool) or not isinstance(value, int):
+                raise ValidationError({'id': [f'Некорректный id: {value!r}']})
+            ids.append(value)
+        if len(set(ids)) != len(ids):
+            raise ValidationError({'id': ['id в пачке повторяются']})
+        return ids
+
+    def get_bulk_instances(self, ids):
+        """Загружает посты пачки одним запросом в порядке ids"""
+        found = self.get_queryset().select_related('author').in_bulk(ids)
+        missing = [pk for pk in ids if pk not in found]
+        if missing:
+            raise NotFound(f'Посты не найдены: {missing}')
+        return [found[pk] for pk in ids]
+
+    def can_modify_all(self, instances, privileged):
+        """Все ли посты пачки принадлежат текущему пользователю"""
+        return privileged or all(
+            instance.author.user_id == self.request.user.pk
+            for instance in instances
+        )
+
     def update(self, request, *args, **kwargs):
         """
         PUT /posts/{id}/ - полное обновление объекта
@@ -238,13 +447,96 @@ class PostViewSet(viewsets.ModelViewSet):
         """
         GET /posts/export_csv/
         Экспорт всех постов в CSV
+
+        ?stream=true - потоковый экспорт: строки читаются серверным
+        курсором чанками и сразу пишутся в ответ
         """
         queryset = self.filter_queryset(self.get_queryset())
-        serializer = self.get_serializer(queryset, many=True)
+
+        if request.query_params.get('stream') in ('1', 'true'):
+            return self.stream_csv(queryset)
 
         return Response(
-            serializer.data,
+            self.get_serialized_data(queryset),
             headers={
                 'Content-Disposition': 'attachment; filename="posts.csv"'
             }
         )
+
+    @action(detail=False, methods=['post'], url_path='export-jobs')
+    def export_jobs(self, request, *args, **kwargs):
+        """
+        POST /posts/export-jobs/ - фоновый экспорт в CSV
+        Тело: фильтры как query-параметры списка, например
+        {"status": "published", "search": "django"}.
+        Возвращает id задачи Celery, статус -
+        GET /posts/export-jobs/{task_id}/
+        """
+        spec = exports.normalize_spec(request.data, request,
+                                      self.kwargs.get('author_pk'))
+        # Ошибки фильтров отдаем сразу, а не из задачи
+        exports.get_export_queryset(spec)
+
+        task_id, created = exports.start_export(spec)
+        return Response(
+            {
+                'task_id': task_id,
+                'created': created,
+                'status_url': self.reverse_action(
+                    'export-job', kwargs={**self.kwargs, 'task_id': task_id}
+                ),
+            },
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+    @action(detail=False, methods=['get'], url_name='export-job',
+            url_path=r'export-jobs/(?P<task_id>[0-9a-f-]{36})')
+    def export_job(self, request, task_id, *args, **kwargs):
+        """
+        GET /posts/export-jobs/{task_id}/ - статус фонового экспорта
+        и ссылка на файл, когда он готов
+        """
+        result = AsyncResult(task_id)
+        data = {'task_id': task_id, 'state': result.state}
+        if result.state == 'PROGRESS' and isinstance(result.info, dict):
+            data.update(result.info)
+        elif result.successful():
+            data.update(result.result)
+            data['file_url'] = self.reverse_action(
+                'export-job-file', kwargs={**self.kwargs, 'task_id': task_id}
+            )
+        elif result.failed():
+            data['error'] = str(result.result)
+        return Response(data)
+
+    @action(detail=False, methods=['get'], url_name='export-job-file',
+            url_path=r'export-jobs/(?P<task_id>[0-9a-f-]{36})/file')
+    def export_job_file(self, request, task_id, *args, **kwargs):
+        """
+        GET /posts/export-jobs/{task_id}/file/ - готовый CSV файл
+        """
+        name = exports.get_file_name(task_id)
+        if not AsyncResult(task_id).successful() or \
+                not exports.storage.exists(name):
+            raise NotFound('Файл экспорта не найден')
+        return FileResponse(
+            exports.storage.open(name, 'rb'),
+            as_attachment=True,
+            filename='posts.csv',
+            content_type='text/csv',
+        )
+
+    def stream_csv(self, queryset, chunk_size=EXPORT_CHUNK_SIZE):
+        """
+        Отдает queryset потоковым CSV. Фильтры, поиск и сортировка
+        должны быть уже применены к queryset.
+        """
+        renderer = CSVRenderer()
+        response = StreamingHttpResponse(
+            renderer.render_stream(
+                self.iter_serialized_data(queryset, chunk_size)
+            ),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}',
+        )
+        response['Content-Disposition'] = 'attachment; filename="posts.csv"'
+        return response
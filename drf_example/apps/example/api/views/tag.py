@@ -1,14 +1,31 @@
 from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
 
+from drf_example.apps.example.api.cache import (
+    CachedResponseMixin, ConditionalGetMixin,
+)
+from drf_example.apps.example.api.pagination import AsyncPageNumberPagination
 from drf_example.apps.example.api.serializers import TagSerializer
+from drf_example.apps.example.api.views.mixins import (
+    AsyncReadMixin, EagerLoadingMixin,
+)
 from drf_example.apps.example.models import Tag
 
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(ConditionalGetMixin, CachedResponseMixin,
+                 EagerLoadingMixin, AsyncReadMixin, viewsets.ModelViewSet):
     """
     ViewSet для работы с тегами
     """
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = AsyncPageNumberPagination
+    # posts_count зависит от постов
+    cache_scopes = ('tag', 'post')
+    # У тега нет updated_at, изменения ловятся поколениями
+    last_modified_field = None
+    ordering_fields = ['name', 'created_at', 'posts_count']
+    filterset_fields = {
+        'posts_count': ['exact', 'gte', 'lte'],
+    }
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ExampleConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'drf_example.apps.example'
+
+    def ready(self):
+        # Подключаем обработчики сигналов
+        from drf_example.apps.example import signals  # noqa: F401
@@ -0,0 +1,203 @@
+import functools
+import logging
+
+import redis
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from drf_example.apps.example.api.cache import invalidate
+from drf_example.apps.example.models import Author, Post
+
+logger = logging.getLogger(__name__)
+
+# Hash post_id -> накопленный прирост просмотров
+PENDING_VIEWS_KEY = 'example:post_views:pending'
+# Снимок pending, который сейчас переносится в БД
+FLUSHING_VIEWS_KEY = 'example:post_views:flushing'
+# Блокировка переноса: один перенос на все воркеры
+FLUSH_LOCK_KEY = 'example:post_views:flush_lock'
+# Срок блокировки, с, продлевается после каждой пачки
+FLUSH_LOCK_TIMEOUT = 5 * 60
+
+FLUSH_BATCH_SIZE = 1000
+
+_redis_client = None
+
+
+def get_redis():
+    """Ленивое подключение к Redis (тот же инстанс, что и брокер Celery)"""
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(settings.REDIS_URL)
+    return _redis_client
+
+
+def increment_post_views(post_id, amount=1):
+    """
+    Буферизует просмотр поста в Redis вместо UPDATE строки.
+    Возвращает прирост, еще не перенесенный в БД.
+    Если Redis недоступен - пишем в БД атомарным UPDATE.
+    """
+    try:
+        return get_redis().hincrby(PENDING_VIEWS_KEY, post_id, amount)
+    except redis.RedisError:
+        logger.warning('Redis недоступен, пишем просмотры поста %s в БД',
+                       post_id)
+        Post.objects.filter(pk=post_id).update(
+            views_count=F('views_count') + amount
+        )
+        return 0
+
+
+def get_pending_views(post_ids):
+    """Прирост просмотров, еще не перенесенный в БД: {post_id: delta}"""
+    post_ids = list(post_ids)
+    if not post_ids:
+        return {}
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.hmget(PENDING_VIEWS_KEY, post_ids)
+        pipe.hmget(FLUSHING_VIEWS_KEY, post_ids)
+        pending, flushing = pipe.execute()
+    except redis.RedisError:
+        return {}
+    return {
+        post_id: int(first or 0) + int(second or 0)
+        for post_id, first, second in zip(post_ids, pending, flushing)
+        if first or second
+    }
+
+
+def merge_pending_views(posts):
+    """Добавляет к views_count объектов еще не перенесенный прирост"""
+    pending = get_pending_views(post.pk for post in posts)
+    for post in posts:
+        post.views_count += pending.get(post.pk, 0)
+    return posts
+
+
+def flush_post_views(batch_size=FLUSH_BATCH_SIZE):
+    """
+    Переносит накопленные просмотры в БД.
+
+    pending атомарно переименовывается в flushing, так что новые просмотры
+    копятся в новом hash. Если предыдущий перенос упал, сначала
+    дописывается оставшийся flushing. Возвращает число обновленных постов.
+
+    Перенос выполняется под блокировкой в Redis (SET NX PX), пока она
+    занята другим воркером - сразу возвращает 0. Посты пачки удаляются
+    из flushing после коммита ее UPDATE, поэтому повтор после сбоя
+    не прибавит их второй раз.
+    """
+    client = get_redis()
+    lock = client.lock(FLUSH_LOCK_KEY, timeout=FLUSH_LOCK_TIMEOUT)
+    if not lock.acquire(blocking=False):
+        return 0
+    try:
+        return flush_locked(client, lock, batch_size)
+    finally:
+        try:
+            lock.release()
+        except redis.exceptions.LockError:
+            # Блокировка истекла - ее мог взять другой воркер
+            logger.warning('Блокировка переноса просмотров истекла')
+
+
+def flush_locked(client, lock, batch_size):
+    """Перенос просмотров, вызывающий держит блокировку lock"""
+    if not client.exists(FLUSHING_VIEWS_KEY):
+        try:
+            client.rename(PENDING_VIEWS_KEY, FLUSHING_VIEWS_KEY)
+        except redis.ResponseError:
+            # pending пуст - переносить нечего
+            return 0
+
+    deltas = [
+        (int(post_id), int(delta))
+        for post_id, delta in client.hgetall(FLUSHING_VIEWS_KEY).items()
+        if int(delta)
+    ]
+    for start in range(0, len(deltas), batch_size):
+        batch = deltas[start:start + batch_size]
+        apply_views_batch(batch)
+        transaction.on_commit(functools.partial(
+            client.hdel, FLUSHING_VIEWS_KEY,
+            *[post_id for post_id, _ in batch]
+        ))
+        lock.reacquire()
+
+    # Остались только нулевые приросты
+    transaction.on_commit(functools.partial(client.delete,
+                                            FLUSHING_VIEWS_KEY))
+    if deltas:
+        # Сырой UPDATE не шлет сигналов - сбрасываем кеш и ETag detail постов.
+        # Списки, теги, авторы и выгрузки от просмотров не зависят
+        invalidate('post_views')
+    return len(deltas)
+
+
+def apply_views_batch(deltas):
+    """
+    Один UPDATE ... FROM (VALUES ...) на пачку (post_id, delta)
+    """
+    if not deltas:
+        return
+    table = connection.ops.quote_name(Post._meta.db_table)
+    values = ', '.join(['(%s, %s)'] * len(deltas))
+    params = [value for pair in deltas for value in pair]
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {table} AS p '
+            f'SET views_count = p.views_count + v.delta '
+            f'FROM (VALUES {values}) AS v(id, delta) '
+            f'WHERE p.id = v.id',
+            params,
+        )
+
+
+def change_posts_count(model, pks, delta):
+    """
+    Атомарно меняет posts_count у объектов model на delta.
+    Разошедшийся счетчик не уходит ниже 0 (PositiveIntegerField),
+    его исправит reconcile_posts_counts
+    """
+    if not pks:
+        return
+    posts_count = F('posts_count') + delta
+    if delta < 0:
+        posts_count = Greatest(posts_count, 0)
+    model.objects.filter(pk__in=pks).update(posts_count=posts_count)
+
+
+def actual_posts_count(model):
+    """Подзапрос с реальным количеством постов автора/тега"""
+    if model is Author:
+        posts = Post.objects.filter(author=OuterRef('pk'))
+        group_by = 'author'
+    else:
+        posts = Post.tags.through.objects.filter(tag=OuterRef('pk'))
+        group_by = 'tag'
+    count = posts.order_by().values(group_by).annotate(
+        count=Count('pk')
+    ).values('count')
+    return Coalesce(Subquery(count), 0)
+
+
+def refresh_posts_count(model, pks):
+    """
+    Пересчитывает posts_count у объектов model с заданными pk.
+    Возвращает pk, у которых значение разошлось с реальным
+    """
+    drifted = list(
+        model.objects.filter(pk__in=pks)
+        .annotate(actual_posts_count=actual_posts_count(model))
+        .exclude(posts_count=F('actual_posts_count'))
+        .values_list('pk', flat=True)
+    )
+    if drifted:
+        model.objects.filter(pk__in=drifted).update(
+            posts_count=actual_posts_count(model)
+        )
+    return drifted
@@ -0,0 +1,214 @@
+"""
+Фоновый экспорт постов в CSV.
+
+Задача export_posts_csv делит диапазон id отфильтрованных постов на
+партиции, которые параллельно выгружают задачи export_posts_partition
+(очередь default), а merge_export_parts склеивает части в один файл.
+Строки в файле идут по id, параметр ordering не учитывается.
+
+Спецификация экспорта - фильтры в виде query-параметров списка
+постов. Повторный запрос с той же спецификацией, пока данные не
+менялись, получает id уже запущенной или завершенной задачи.
+"""
+import hashlib
+import json
+import math
+import os
+import shutil
+import time
+import uuid
+
+from celery.result import AsyncResult
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.db.models import Max, Min
+from django.test import RequestFactory
+from rest_framework.exceptions import ValidationError
+from rest_framework.request import Request
+
+from drf_example.apps.example.api.cache import get_generations
+from drf_example.apps.example.progress import clear_progress
+
+# Максимальное количество партиций одного экспорта
+EXPORT_PARTITIONS = 8
+# Минимальная ширина диапазона id одной партиции
+EXPORT_PARTITION_MIN_SIZE = 10000
+# Сколько живут файл экспорта и ссылка спецификации на задачу
+EXPORT_TIMEOUT = 60 * 60
+# Параметры списка, не влияющие на содержимое файла
+EXPORT_IGNORED_PARAMS = ('cursor', 'page_size', 'format', 'stream',
+                         'live_views')
+
+JOB_KEY = 'example:export:job:{digest}'
+
+storage = FileSystemStorage(location=settings.EXPORTS_ROOT)
+
+
+def normalize_spec(filters, request, author_pk=None):
+    """
+    Приводит фильтры из тела запроса к спецификации экспорта:
+    {'filters': {параметр: [значения]}, 'author_pk': ..., 'host': ...}.
+    Хост и схема нужны для абсолютных ссылок на изображения.
+    """
+    if not isinstance(filters, dict):
+        raise ValidationError(
+            {'non_field_errors': ['Ожидается объект с фильтрами']}
+        )
+
+    normalized = {}
+    for name, value in filters.items():
+        if name in EXPORT_IGNORED_PARAMS:
+            continue
+        values = value if isinstance(value, list) else [value]
+        if not all(isinstance(item, (str, int, float, bool))
+                   for item in values):
+            raise ValidationError({name: ['Некорректное значение фильтра']})
+        normalized[name] = [
+            str(item).lower() if isinstance(item, bool) else str(item)
+            for item in values
+        ]
+    return {
+        'filters': dict(sorted(normalized.items())),
+        'author_pk': str(author_pk) if author_pk else None,
+        'host': request.get_host(),
+        'secure': request.is_secure(),
+    }
+
+
+def get_export_view(spec):
+    """PostViewSet, настроенный на фильтры спецификации (без HTTP запроса)"""
+    from drf_example.apps.example.api.views.post import PostViewSet
+
+    request = Request(RequestFactory().get(
+        '/', spec['filters'], HTTP_HOST=spec['host'], secure=spec['secure'],
+    ))
+    request.user = AnonymousUser()
+    kwargs = {'author_pk': spec['author_pk']} if spec['author_pk'] else {}
+    view = PostViewSet(request=request, args=(), kwargs=kwargs,
+                       action='export_csv', format_kwarg=None)
+    return view
+
+
+def get_export_queryset(spec):
+    """Отфильтрованные посты спецификации"""
+    view = get_export_view(spec)
+    return view.filter_queryset(view.get_queryset())
+
+
+def start_export(spec):
+    """
+    Запускает экспорт или возвращает id задачи с той же спецификацией.
+    Возвращает (task_id, created).
+    """
+    from drf_example.apps.example.tasks import export_posts_csv
+
+    parts = [json.dumps(spec, sort_keys=True),
+             *get_generations(('post', 'tag'))]
+    digest = hashlib.sha1('|'.join(parts).encode()).hexdigest()
+    key = JOB_KEY.format(digest=digest)
+
+    task_id = cache.get(key)
+    if task_id is not None and is_reusable(task_id):
+        return task_id, False
+
+    task_id = str(uuid.uuid4())
+    cache.set(key, task_id, EXPORT_TIMEOUT)
+    export_posts_csv.apply_async(args=(spec,), task_id=task_id)
+    return task_id, True
+
+
+def is_reusable(task_id):
+    """Можно ли отдать результат задачи повторному запросу"""
+    result = AsyncResult(task_id)
+    if result.failed():
+        return False
+    if result.successful():
+        return storage.exists(get_file_name(task_id))
+    return True
+
+
+def get_file_name(job_id):
+    return f'posts-{job_id}.csv'
+
+
+def split_id_range(queryset, partitions=EXPORT_PARTITIONS,
+                   min_size=EXPORT_PARTITION_MIN_SIZE):
+    """Делит диапазон id queryset на полуинтервалы [low, high)"""
+    bounds = queryset.order_by().aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return []
+    low, high = bounds['low'], bounds['high'] + 1
+    count = max(1, min(partitions, math.ceil((high - low) / min_size)))
+    step = math.ceil((high - low) / count)
+    return [(start, min(start + step, high))
+            for start in range(low, high, step)]
+
+
+def write_partition(spec, job_id, index, low, high):
+    """Выгружает посты с id из [low, high) в файл части, возвращает
+    имя файла и количество строк"""
+    from drf_example.apps.example.api.renderer import CSVRenderer
+    from drf_example.apps.example.api.views.post import EXPORT_CHUNK_SIZE
+
+    view = get_export_view(spec)
+    queryset = view.filter_queryset(view.get_queryset()).filter(
+        pk__gte=low, pk__lt=high,
+    ).order_by('pk')
+
+    name = f'{job_id}/part-{index:04d}.csv'
+    path = storage.path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    lines = 0
+    with open(path, 'w', newline='', encoding='utf-8') as target:
+        for line in CSVRenderer().render_stream(
+            view.iter_serialized_data(queryset, EXPORT_CHUNK_SIZE)
+        ):
+            target.write(line)
+            lines += 1
+    return {'name': name, 'rows': max(lines - 1, 0)}
+
+
+def merge_parts(job_id, parts):
+    """
+    Склеивает части в один файл: заголовок берется из первой
+    непустой части, части удаляются
+    """
+    name = get_file_name(job_id)
+    os.makedirs(storage.location, exist_ok=True)
+    has_header = False
+    with open(storage.path(name), 'w', newline='', encoding='utf-8') as target:
+        for part in parts:
+            with open(storage.path(part['name']), newline='',
+                      encoding='utf-8') as source:
+                header = source.readline()
+                if header and not has_header:
+                    target.write(header)
+                    has_header = True
+                shutil.copyfileobj(source, target)
+            storage.delete(part['name'])
+    shutil.rmtree(storage.path(job_id), ignore_errors=True)
+    clear_progress(job_id)
+    return {'file': name, 'rows': sum(part['rows'] for part in parts)}
+
+
+def cleanup_exports(max_age=EXPORT_TIMEOUT):
+    """
+    Удаляет файлы экспорта и каталоги частей (от упавших задач)
+    старше max_age секунд
+    """
+    if not os.path.isdir(storage.location):
+        return 0
+    deadline = time.time() - max_age
+    directories, files = storage.listdir('')
+    removed = 0
+    for name in files:
+        if storage.get_modified_time(name).timestamp() < deadline:
+            storage.delete(name)
+            removed += 1
+    for name in directories:
+        if os.path.getmtime(storage.path(name)) < deadline:
+            shutil.rmtree(storage.path(name), ignore_errors=True)
+            removed += 1
+    return removed
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from drf_example.apps.example.models import Post
+
+
+class Command(BaseCommand):
+    """
+    Пересчитывает words_count и reading_time у существующих постов
+    """
+    help = 'Заполняет words_count и reading_time постов пачками'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество постов в одной пачке',
+        )
+
+    def handle(self, *args, batch_size, **options):
+        last_pk = 0
+        total = 0
+        while True:
+            # Идем по первичному ключу, без OFFSET
+            batch = list(
+                Post.objects.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .only('pk', 'content')[:batch_size]
+            )
+            if not batch:
+                break
+
+            for post in batch:
+                post.update_reading_stats()
+            Post.objects.bulk_update(batch, Post.READING_STATS_FIELDS)
+
+            last_pk = batch[-1].pk
+            total += len(batch)
+            self.stdout.write(f'Обработано постов: {total}')
+
+        self.stdout.write(self.style.SUCCESS(f'Готово, всего: {total}'))
@@ -0,0 +1,103 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from drf_example.apps.example.api.compiled import compile_serializer
+from drf_example.apps.example.api.eager_loading import optimize_queryset
+from drf_example.apps.example.api.serializers import PostSerializer
+from drf_example.apps.example.models import Author, Post, Tag
+
+
+class Command(BaseCommand):
+    """
+    Сравнивает PostSerializer(many=True).data со скомпилированной
+    сериализацией на странице из --rows постов
+    """
+    help = 'Бенчмарк скомпилированной сериализации постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=10000,
+            help='Количество постов на странице',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Количество прогонов (берется лучший)',
+        )
+
+    def handle(self, *args, rows, repeat, **options):
+        # Недостающие посты создаются во временной транзакции
+        with transaction.atomic():
+            self.ensure_posts(rows)
+            self.run(rows, repeat)
+            transaction.set_rollback(True)
+
+    def run(self, rows, repeat):
+        serializer = PostSerializer(many=True)
+        compiled = compile_serializer(serializer.child)
+        if compiled is None:
+            raise CommandError('PostSerializer не компилируется')
+
+        def queryset():
+            qs = Post.objects.order_by('pk')
+            return optimize_queryset(qs, serializer.child, project=True)[:rows]
+
+        def drf():
+            return PostSerializer(queryset(), many=True).data
+
+        def fast():
+            return compiled.serialize(queryset(), serializer)
+
+        def instances():
+            return compiled.serialize(list(queryset()), serializer)
+
+        expected = drf()
+        for name, func in (('values_list', fast), ('объекты', instances)):
+            if func() != expected:
+                raise CommandError(f'Результат ({name}) отличается от DRF')
+
+        drf_time = self.best(drf, repeat)
+        self.stdout.write(f'DRF: {drf_time:.3f}s')
+        for name, func in (('values_list', fast), ('объекты', instances)):
+            elapsed = self.best(func, repeat)
+            self.stdout.write(self.style.SUCCESS(
+                f'Скомпилированный ({name}): {elapsed:.3f}s, '
+                f'x{drf_time / elapsed:.1f}'
+            ))
+
+    def best(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    def ensure_posts(self, rows):
+        missing = rows - Post.objects.count()
+        if missing <= 0:
+            return
+        author = Author.objects.first()
+        if author is None:
+            raise CommandError('Нужен хотя бы один автор')
+        tags = list(Tag.objects.all()[:3])
+        posts = Post.objects.bulk_create(
+            Post(
+                title=f'Бенчмарк {i}',
+                slug=f'bench-compiled-{i}',
+                content='Текст поста для бенчмарка ' * 50,
+                author=author,
+                status='published' if i % 2 else 'draft',
+            )
+            for i in range(missing)
+        )
+        Post.tags.through.objects.bulk_create(
+            Post.tags.through(post_id=post.pk, tag_id=tag.pk)
+            for post in posts for tag in tags
+        )
+        self.stdout.write(f'Создано временных постов: {missing}')
@@ -0,0 +1,79 @@
+import timeit
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from drf_example.apps.example.api.renderer import ORJSONRenderer, orjson
+
+
+class Command(BaseCommand):
+    """
+    Сравнивает скорость JSONRenderer и ORJSONRenderer на данных
+    в формате PostSerializer
+    """
+    help = 'Бенчмарк ORJSONRenderer против стандартного JSONRenderer'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=1000,
+            help='Количество постов в одном ответе',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=50,
+            help='Количество прогонов',
+        )
+
+    def handle(self, *args, rows, repeat, **options):
+        if orjson is None:
+            raise CommandError('orjson не установлен')
+
+        data = {'next': None, 'previous': None,
+                'results': [self.make_post(i) for i in range(rows)]}
+
+        for compact in (True, False):
+            # Настройку COMPACT_JSON подменяем на уровне класса
+            json_renderer = type('JSONRenderer', (JSONRenderer,),
+                                 {'compact': compact})()
+            fast_renderer = type('ORJSONRenderer', (ORJSONRenderer,),
+                                 {'compact': compact})()
+
+            same = json_renderer.render(data) == fast_renderer.render(data)
+            json_time = timeit.timeit(
+                lambda: json_renderer.render(data), number=repeat)
+            fast_time = timeit.timeit(
+                lambda: fast_renderer.render(data), number=repeat)
+
+            self.stdout.write(
+                f'COMPACT_JSON={compact}: json {json_time:.3f}s, '
+                f'orjson {fast_time:.3f}s, '
+                f'x{json_time / fast_time:.1f}, '
+                f'байты совпадают: {"да" if same else "нет"}'
+            )
+
+    def make_post(self, i):
+        """Синтетический пост, как его отдает PostSerializer"""
+        now = timezone.now()
+        return {
+            'id': i,
+            'title': f'Пост номер {i}',
+            'slug': f'post-{i}',
+            'content': 'Текст поста «с кавычками» и   разделителем ' * 20,
+            'excerpt': 'Краткое описание',
+            'status': 'published',
+            'author': i % 50,
+            'tags': [1, 2, 3],
+            'views_count': i * 7,
+            'words_count': 160,
+            'reading_time': 1,
+            'rating': Decimal('4.50'),
+            'published_at': now,
+            'created_at': now.isoformat(),
+            'updated_at': now.isoformat(),
+            'is_published': True,
+        }
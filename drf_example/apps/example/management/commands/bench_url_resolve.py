@@ -0,0 +1,119 @@
+import timeit
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.urls import NoReverseMatch, URLResolver, reverse
+from django.urls.resolvers import RegexPattern, RoutePattern
+from django.utils.module_loading import import_module
+
+from drf_example.custom_router import TrieURLResolver
+
+# Значения аргументов для reverse, остальные - '1'
+SAMPLE_KWARGS = {
+    'format': 'json',
+    'task_id': str(uuid.UUID(int=0)),
+}
+
+
+class Command(BaseCommand):
+    """
+    Измеряет время resolve для каждого именованного маршрута проекта
+    (включая nested /authors/{author_pk}/posts/):
+    обычный URLResolver против TrieURLResolver
+    """
+    help = 'Бенчмарк разбора URL: URLResolver против TrieURLResolver'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=2000,
+            help='Количество resolve на маршрут',
+        )
+        parser.add_argument(
+            '--prefix',
+            default='',
+            help='Только маршруты, путь которых начинается с префикса',
+        )
+
+    def handle(self, *args, repeat, prefix, **options):
+        urlpatterns = import_module(settings.ROOT_URLCONF).urlpatterns
+        plain = URLResolver(RegexPattern(r'^/'),
+                            [self.decompile(p) for p in urlpatterns])
+        trie = TrieURLResolver(RegexPattern(r'^/'), urlpatterns)
+
+        plain_total = trie_total = 0
+        routes = 0
+        for viewname, kwarg_names in self.iter_endpoints(plain.url_patterns):
+            kwargs = {name: SAMPLE_KWARGS.get(name, '1')
+                      for name in kwarg_names}
+            try:
+                path = reverse(viewname, kwargs=kwargs)
+            except NoReverseMatch:
+                self.stderr.write(f'Пропущен {viewname}: нет reverse '
+                                  f'для {kwargs}')
+                continue
+            if not path.startswith(prefix):
+                continue
+
+            plain_match = plain.resolve(path)
+            trie_match = trie.resolve(path)
+            same = (plain_match.func == trie_match.func and
+                    plain_match.kwargs == trie_match.kwargs and
+                    plain_match.view_name == trie_match.view_name)
+
+            plain_time = timeit.timeit(lambda: plain.resolve(path),
+                                       number=repeat) / repeat
+            trie_time = timeit.timeit(lambda: trie.resolve(path),
+                                      number=repeat) / repeat
+            plain_total += plain_time
+            trie_total += trie_time
+            routes += 1
+            self.stdout.write(
+                f'{path:<72} {plain_time * 1e6:8.2f}us '
+                f'{trie_time * 1e6:8.2f}us'
+                f'{"" if same else "  РАЗНЫЕ РЕЗУЛЬТАТЫ"}'
+            )
+
+        if routes:
+            self.stdout.write(
+                f'Маршрутов: {routes}, в среднем URLResolver '
+                f'{plain_total / routes * 1e6:.2f}us, TrieURLResolver '
+                f'{trie_total / routes * 1e6:.2f}us'
+            )
+
+    def decompile(self, pattern):
+        """TrieURLResolver из urls.py обратно в обычный URLResolver"""
+        if isinstance(pattern, TrieURLResolver):
+            return URLResolver(pattern.pattern, pattern.urlconf_name,
+                               pattern.default_kwargs, pattern.app_name,
+                               pattern.namespace)
+        return pattern
+
+    def iter_endpoints(self, patterns, namespaces=(), kwarg_names=()):
+        """(полное имя маршрута, имена аргументов) без повторов"""
+        seen = set()
+        for pattern in patterns:
+            names = kwarg_names + self.get_kwarg_names(pattern.pattern)
+            if isinstance(pattern, URLResolver):
+                nested = namespaces
+                if pattern.namespace:
+                    nested += (pattern.namespace,)
+                endpoints = self.iter_endpoints(pattern.url_patterns, nested,
+                                                names)
+            elif pattern.name:
+                endpoints = [(':'.join(namespaces + (pattern.name,)), names)]
+            else:
+                continue
+            for endpoint in endpoints:
+                if endpoint not in seen:
+                    seen.add(endpoint)
+                    yield endpoint
+
+    def get_kwarg_names(self, pattern):
+        if isinstance(pattern, RoutePattern):
+            return tuple(pattern.converters)
+        if isinstance(pattern, RegexPattern):
+            return tuple(pattern.regex.groupindex)
+        return ()
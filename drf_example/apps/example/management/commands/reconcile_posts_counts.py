@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from drf_example.apps.example.counters import refresh_posts_count
+from drf_example.apps.example.models import Author, Tag
+
+
+class Command(BaseCommand):
+    """
+    Исправляет расхождения posts_count у авторов и тегов
+    """
+    help = 'Пересчитывает posts_count авторов и тегов пачками'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество объектов в одной пачке',
+        )
+
+    def handle(self, *args, batch_size, **options):
+        for model in (Author, Tag):
+            last_pk = 0
+            fixed = 0
+            while True:
+                # Идем по первичному ключу короткими транзакциями
+                pks = list(
+                    model.objects.filter(pk__gt=last_pk)
+                    .order_by('pk')
+                    .values_list('pk', flat=True)[:batch_size]
+                )
+                if not pks:
+                    break
+                fixed += len(refresh_posts_count(model, pks))
+                last_pk = pks[-1]
+
+            self.stdout.write(self.style.SUCCESS(
+                f'{model._meta.verbose_name_plural}: исправлено {fixed}'
+            ))
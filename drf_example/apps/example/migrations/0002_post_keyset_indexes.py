@@ -0,0 +1,20 @@
+import django.db.models.expressions
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('example', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(django.db.models.expressions.OrderBy(django.db.models.expressions.F('published_at'), descending=True, nulls_last=True), django.db.models.expressions.OrderBy(django.db.models.expressions.F('created_at'), descending=True), django.db.models.expressions.OrderBy(django.db.models.expressions.F('id'), descending=True), name='post_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(django.db.models.expressions.F('author'), django.db.models.expressions.OrderBy(django.db.models.expressions.F('published_at'), descending=True, nulls_last=True), django.db.models.expressions.OrderBy(django.db.models.expressions.F('created_at'), descending=True), django.db.models.expressions.OrderBy(django.db.models.expressions.F('id'), descending=True), name='post_author_keyset_idx'),
+        ),
+    ]
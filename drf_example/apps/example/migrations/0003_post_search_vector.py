@@ -0,0 +1,49 @@
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_VECTOR_SQL = """
+    setweight(to_tsvector('russian', coalesce({row}title, '')), 'A') ||
+    setweight(to_tsvector('russian', coalesce({row}excerpt, '')), 'B') ||
+    setweight(to_tsvector('russian', coalesce({row}content, '')), 'C')
+"""
+
+CREATE_TRIGGER_SQL = f"""
+CREATE FUNCTION example_post_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := {SEARCH_VECTOR_SQL.format(row='NEW.')};
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER example_post_search_vector_trigger
+BEFORE INSERT OR UPDATE OF title, excerpt, content ON example_post
+FOR EACH ROW EXECUTE FUNCTION example_post_search_vector_update();
+
+UPDATE example_post SET search_vector = {SEARCH_VECTOR_SQL.format(row='')};
+"""
+
+DROP_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS example_post_search_vector_trigger ON example_post;
+DROP FUNCTION IF EXISTS example_post_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('example', '0002_post_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunSQL(CREATE_TRIGGER_SQL, DROP_TRIGGER_SQL),
+        migrations.AddIndex(
+            model_name='post',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='post_search_vector_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+BACKFILL_SQL = """
+UPDATE example_author AS a
+SET search_name = lower(concat_ws(
+    ' ',
+    nullif(u.first_name, ''),
+    nullif(u.last_name, ''),
+    nullif(u.username, '')
+))
+FROM auth_user AS u
+WHERE u.id = a.user_id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('example', '0003_post_search_vector'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='author',
+            name='search_name',
+            field=models.CharField(blank=True, default='', editable=False, max_length=500, verbose_name='Поисковое имя'),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='author',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_name'], name='author_search_name_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
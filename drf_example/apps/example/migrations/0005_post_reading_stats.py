@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('example', '0004_author_search_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='words_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество слов'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='reading_time',
+            field=models.PositiveIntegerField(db_index=True, default=1, editable=False, help_text='Примерное время чтения в минутах', verbose_name='Время чтения'),
+        ),
+    ]
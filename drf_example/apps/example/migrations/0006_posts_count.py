@@ -0,0 +1,33 @@
+from django.db import migrations, models
+
+BACKFILL_SQL = """
+UPDATE example_author AS a
+SET posts_count = (
+    SELECT COUNT(*) FROM example_post AS p WHERE p.author_id = a.id
+);
+UPDATE example_tag AS t
+SET posts_count = (
+    SELECT COUNT(*) FROM example_post_tags AS pt WHERE pt.tag_id = t.id
+);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('example', '0005_post_reading_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='author',
+            name='posts_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, verbose_name='Количество постов'),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='posts_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, verbose_name='Количество постов'),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,75 @@
+from django.db import migrations, models
+
+SEARCH_VECTOR_SQL = """
+    setweight(to_tsvector('russian', coalesce({row}title, '')), 'A') ||
+    setweight(to_tsvector('russian', coalesce({row}excerpt, '')), 'B') ||
+    setweight(to_tsvector('russian', coalesce({row}content, '')), 'C') ||
+    setweight(to_tsvector('russian', coalesce({row}search_names, '')), 'D')
+"""
+
+OLD_SEARCH_VECTOR_SQL = """
+    setweight(to_tsvector('russian', coalesce({row}title, '')), 'A') ||
+    setweight(to_tsvector('russian', coalesce({row}excerpt, '')), 'B') ||
+    setweight(to_tsvector('russian', coalesce({row}content, '')), 'C')
+"""
+
+TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION example_post_search_vector_update()
+RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := {vector};
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS example_post_search_vector_trigger ON example_post;
+CREATE TRIGGER example_post_search_vector_trigger
+BEFORE INSERT OR UPDATE OF {columns} ON example_post
+FOR EACH ROW EXECUTE FUNCTION example_post_search_vector_update();
+"""
+
+CREATE_TRIGGER_SQL = TRIGGER_SQL.format(
+    vector=SEARCH_VECTOR_SQL.format(row='NEW.'),
+    columns='title, excerpt, content, search_names',
+)
+
+DROP_TRIGGER_SQL = TRIGGER_SQL.format(
+    vector=OLD_SEARCH_VECTOR_SQL.format(row='NEW.'),
+    columns='title, excerpt, content',
+) + f"""
+UPDATE example_post SET search_vector = {OLD_SEARCH_VECTOR_SQL.format(row='')};
+"""
+
+# Формат совпадает с PostQuerySet.update_search_names. UPDATE колонки
+# search_names пересчитывает search_vector триггером
+BACKFILL_SQL = """
+UPDATE example_post AS p
+SET search_names = concat_ws(
+    ' ',
+    (SELECT u.username
+     FROM example_author AS a
+     JOIN auth_user AS u ON u.id = a.user_id
+     WHERE a.id = p.author_id),
+    (SELECT string_agg(t.name, ' ' ORDER BY t.name)
+     FROM example_post_tags AS pt
+     JOIN example_tag AS t ON t.id = pt.tag_id
+     WHERE pt.post_id = p.id)
+);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('example', '0006_posts_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='search_names',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='Автор и теги для поиска'),
+        ),
+        migrations.RunSQL(CREATE_TRIGGER_SQL, DROP_TRIGGER_SQL),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+    ]
@@ -1,4 +1,5 @@
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 
 User = get_user_model()
@@ -42,10 +43,52 @@ class Author(models.Model):
         verbose_name='Дата обновления'
     )
 
+    # Денормализованный счетчик постов, поддерживается сигналами
+    # (signals.py) и командой reconcile_posts_counts
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        db_index=True,
+        verbose_name='Количество постов'
+    )
+
+    # Денормализованное "имя фамилия username" в нижнем регистре для
+    # поиска по автору. Синхронизируется с User в signals.py
+    search_name = models.CharField(
+        max_length=500,
+        blank=True,
+        default='',
+        editable=False,
+        verbose_name='Поисковое имя'
+    )
+
     class Meta:
         verbose_name = 'Автор'
         verbose_name_plural = 'Авторы'
         ordering = ['-created_at']
+        indexes = [
+            GinIndex(
+                fields=['search_name'],
+                opclasses=['gin_trgm_ops'],
+                name='author_search_name_trgm_idx',
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.search_name = self.build_search_name(self.user)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'search_name'}
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def build_search_name(user):
+        """
+        Поисковое имя автора. Формат совпадает с бэкфиллом
+        в миграции 0004_author_search_name
+        """
+        parts = [user.first_name, user.last_name, user.username]
+        return ' '.join(part for part in parts if part).lower()
 
     def __str__(self):
         return f"{self.user.first_name} {self.user.last_name}" or self.user.username
@@ -53,7 +96,3 @@ class Author(models.Model):
     @property
     def full_name(self):
         return f"{self.user.first_name} {self.user.last_name}".strip() or self.user.username
-
-    @property
-    def posts_count(self):
-        return self.posts.count()
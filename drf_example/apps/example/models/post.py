@@ -1,7 +1,81 @@
 
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models import F, Func, OuterRef, Subquery, TextField, Value
+from django.db.models.functions import Coalesce
 from django.utils.timezone import now
 
+# Конфигурация полнотекстового поиска (должна совпадать с триггером
+# в миграциях 0003_post_search_vector и 0007_post_search_names)
+SEARCH_CONFIG = 'russian'
+
+# Скорость чтения для reading_time (слов в минуту)
+WORDS_PER_MINUTE = 200
+
+
+class PostQuerySet(models.QuerySet):
+    """
+    QuerySet постов: массовые операции тоже заполняют published_at
+    и пересчитывают words_count и reading_time, как Post.save
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.update_published_at()
+            obj.update_reading_stats()
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        fields = list(fields)
+        objs = list(objs)
+        if 'status' in fields:
+            for obj in objs:
+                obj.update_published_at()
+            if 'published_at' not in fields:
+                fields.append('published_at')
+        if 'content' in fields:
+            for obj in objs:
+                obj.update_reading_stats()
+            fields += [field for field in Post.READING_STATS_FIELDS
+                       if field not in fields]
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+    def set_status(self, status):
+        """
+        Меняет статус одним UPDATE. published_at заполняется по правилу
+        Post.update_published_at: при публикации, если еще не задан.
+        Сигналы не отправляются.
+        """
+        timestamp = now()
+        fields = {'status': status, 'updated_at': timestamp}
+        if status == 'published':
+            fields['published_at'] = Coalesce('published_at', Value(timestamp))
+        return self.update(**fields)
+
+    def update_search_names(self):
+        """
+        Пересчитывает search_names одним UPDATE (формат совпадает
+        с бэкфиллом в миграции 0007_post_search_names). Сигналы
+        не отправляются, search_vector обновляет триггер БД
+        """
+        author_model = self.model._meta.get_field('author').related_model
+        tag_model = self.model._meta.get_field('tags').related_model
+        username = author_model.objects.filter(
+            pk=OuterRef('author_id')
+        ).values('user__username')
+        tag_names = tag_model.objects.filter(
+            posts=OuterRef('pk')
+        ).order_by().values('posts').annotate(
+            names=StringAgg('name', ' ', ordering='name')
+        ).values('names')
+        return self.update(search_names=Func(
+            Value(' '), Subquery(username), Subquery(tag_names),
+            function='CONCAT_WS', output_field=TextField(),
+        ))
+
 
 class Post(models.Model):
     """
@@ -11,6 +85,8 @@ class Post(models.Model):
     - Many-to-Many с Tag (много постов - много тегов)
     """
 
+    READING_STATS_FIELDS = ('words_count', 'reading_time')
+
     STATUS_CHOICES = [
         ('draft', 'Черновик'),
         ('published', 'Опубликован'),
@@ -75,6 +151,20 @@ class Post(models.Model):
         verbose_name='Рекомендуемый'
     )
 
+    # Считаются при сохранении из content (см. update_reading_stats)
+    words_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество слов'
+    )
+    reading_time = models.PositiveIntegerField(
+        default=1,
+        editable=False,
+        db_index=True,
+        help_text='Примерное время чтения в минутах',
+        verbose_name='Время чтения'
+    )
+
     published_at = models.DateTimeField(
         blank=True,
         null=True,
@@ -89,6 +179,26 @@ class Post(models.Model):
         verbose_name='Дата обновления'
     )
 
+    # Денормализованные username автора и названия тегов для поиска.
+    # Поддерживается сигналами (signals.py) через update_search_names
+    search_names = models.TextField(
+        blank=True,
+        default='',
+        editable=False,
+        verbose_name='Автор и теги для поиска'
+    )
+
+    # Поисковый вектор: title (A) > excerpt (B) > content (C) >
+    # search_names (D). Заполняется триггером БД при INSERT/UPDATE
+    # этих колонок
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name='Поисковый вектор'
+    )
+
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
@@ -96,23 +206,48 @@ class Post(models.Model):
         indexes = [
             models.Index(fields=['status', 'published_at']),
             models.Index(fields=['author', 'status']),
+            # Индексы под keyset пагинацию (api/pagination.py):
+            # порядок и NULLS LAST совпадают с ORDER BY пагинатора
+            models.Index(
+                F('published_at').desc(nulls_last=True),
+                F('created_at').desc(),
+                F('id').desc(),
+                name='post_keyset_idx',
+            ),
+            models.Index(
+                F('author'),
+                F('published_at').desc(nulls_last=True),
+                F('created_at').desc(),
+                F('id').desc(),
+                name='post_author_keyset_idx',
+            ),
+            GinIndex(fields=['search_vector'], name='post_search_vector_idx'),
         ]
 
     def __str__(self):
         return self.title
 
     def save(self, *args, **kwargs):
-        # Автоматически устанавливаем дату публикации при смене статуса
+        self.update_published_at()
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'content' in update_fields:
+            self.update_reading_stats()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields,
+                                           *self.READING_STATS_FIELDS}
+        super().save(*args, **kwargs)
+
+    def update_published_at(self):
+        """Автоматически устанавливаем дату публикации при смене статуса"""
         if self.status == 'published' and not self.published_at:
             self.published_at = now()
-        super().save(*args, **kwargs)
+
+    def update_reading_stats(self):
+        """Пересчитывает количество слов и время чтения по content"""
+        self.words_count = len(self.content.split())
+        self.reading_time = max(1, self.words_count // WORDS_PER_MINUTE)
 
     @property
     def is_published(self):
         return self.status == 'published'
-
-    @property
-    def reading_time(self):
-        """Примерное время чтения (слов в минуту)"""
-        words_count = len(self.content.split())
-        return max(1, words_count // 200)  # 200 слов в минуту
@@ -31,6 +31,15 @@ class Tag(models.Model):
         verbose_name='Дата создания'
     )
 
+    # Денормализованный счетчик постов, поддерживается сигналами
+    # (signals.py) и командой reconcile_posts_counts
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        db_index=True,
+        verbose_name='Количество постов'
+    )
+
     class Meta:
         verbose_name = 'Тег'
         verbose_name_plural = 'Теги'
@@ -38,7 +47,3 @@ class Tag(models.Model):
 
     def __str__(self):
         return self.name
-
-    @property
-    def posts_count(self):
-        return self.posts.count()
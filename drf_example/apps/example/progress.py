@@ -0,0 +1,42 @@
+"""
+Прогресс составных задач Celery (chord из частей).
+
+Части выполняются параллельно, поэтому количество готовых считается
+атомарным incr в кеше, а meta для update_state имеет тот же формат,
+что и у debug_task: progress, finished, total.
+"""
+from django.core.cache import cache
+
+PROGRESS_KEY = 'example:progress:{job_id}'
+# Сколько хранится счетчик незавершенной задачи
+PROGRESS_TIMEOUT = 60 * 60
+
+
+def progress_meta(finished, total, **extra):
+    """Прогресс в формате update_state"""
+    return {
+        'progress': f'{finished * 100 // total}%',
+        'finished': finished,
+        'total': total,
+        **extra,
+    }
+
+
+def start_progress(job_id):
+    cache.set(PROGRESS_KEY.format(job_id=job_id), 0, PROGRESS_TIMEOUT)
+
+
+def step_done(job_id, total, **extra):
+    """Отмечает готовую часть задачи job_id, возвращает meta прогресса"""
+    key = PROGRESS_KEY.format(job_id=job_id)
+    try:
+        finished = cache.incr(key)
+    except ValueError:
+        # Ключ вытеснен - прогресс считаем приблизительно
+        finished = 1
+        cache.set(key, finished, PROGRESS_TIMEOUT)
+    return progress_meta(min(finished, total), total, **extra)
+
+
+def clear_progress(job_id):
+    cache.delete(PROGRESS_KEY.format(job_id=job_id))
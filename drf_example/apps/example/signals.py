@@ -0,0 +1,177 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_init, post_save, pre_delete,
+)
+from django.dispatch import receiver
+
+from drf_example.apps.example.api.cache import invalidate
+from drf_example.apps.example.counters import change_posts_count
+from drf_example.apps.example.models import Author, Post, Tag
+
+User = get_user_model()
+
+# scope кеша ответов, которые задевает изменение модели
+CACHE_SCOPES = {
+    Post: ('post',),
+    Tag: ('tag',),
+    Author: ('author',),
+    User: ('user',),
+}
+
+
+@receiver(post_save, sender=User)
+def sync_author_search_name(sender, instance, **kwargs):
+    """Обновляет поисковое имя автора при изменении пользователя"""
+    Author.objects.filter(user=instance).update(
+        search_name=Author.build_search_name(instance)
+    )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+@receiver(post_save, sender=User)
+def invalidate_response_cache(sender, **kwargs):
+    """Сбрасывает кеш ответов после коммита изменения"""
+    invalidate(*CACHE_SCOPES[sender])
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def invalidate_post_tags_cache(sender, action, **kwargs):
+    """Изменение связей пост-тег влияет и на посты, и на теги"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate('post', 'tag')
+
+
+# Поисковые имена постов (Post.search_names: username автора и теги)
+
+
+@receiver(post_save, sender=Post)
+def sync_post_search_names_author(sender, instance, created, **kwargs):
+    """
+    Создание поста или смена автора. Регистрируется раньше
+    update_author_posts_count, который сбрасывает _original_author_id
+    """
+    if created or instance._original_author_id not in (None,
+                                                        instance.author_id):
+        Post.objects.filter(pk=instance.pk).update_search_names()
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def sync_post_search_names_tags(sender, instance, action, reverse, pk_set,
+                                **kwargs):
+    """Добавление/удаление связей пост-тег с обеих сторон"""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        post_pks = [instance.pk]
+    elif action == 'post_clear':
+        # Запомнены в pre_clear (update_tags_posts_count)
+        post_pks = getattr(instance, '_cleared_pks', set())
+    else:
+        post_pks = pk_set
+    if post_pks:
+        Post.objects.filter(pk__in=post_pks).update_search_names()
+
+
+@receiver(post_save, sender=Tag)
+def sync_post_search_names_tag(sender, instance, created, update_fields,
+                               **kwargs):
+    """Переименование тега"""
+    if created or (update_fields is not None and 'name' not in update_fields):
+        return
+    Post.objects.filter(tags=instance).update_search_names()
+
+
+@receiver(pre_delete, sender=Tag)
+def remember_tag_posts(sender, instance, **kwargs):
+    """Связи с постами удаляются каскадом без m2m_changed"""
+    instance._post_pks = list(instance.posts.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+def sync_post_search_names_tag_delete(sender, instance, **kwargs):
+    if instance._post_pks:
+        Post.objects.filter(pk__in=instance._post_pks).update_search_names()
+
+
+@receiver(post_save, sender=User)
+def sync_post_search_names_user(sender, instance, created, update_fields,
+                                **kwargs):
+    """Смена username автора (например, не при обновлении last_login)"""
+    if created or (update_fields is not None and
+                   'username' not in update_fields):
+        return
+    if Post.objects.filter(author__user=instance).update_search_names():
+        # Кеш постов не зависит от scope 'user'
+        invalidate('post')
+
+
+# Счетчики posts_count у Author и Tag
+
+
+@receiver(post_init, sender=Post)
+def remember_post_author(sender, instance, **kwargs):
+    """Запоминаем исходного автора, чтобы поймать переназначение"""
+    # Через __dict__, чтобы не грузить отложенное (only/defer) поле
+    instance._original_author_id = instance.__dict__.get('author_id')
+
+
+@receiver(post_save, sender=Post)
+def update_author_posts_count(sender, instance, created, **kwargs):
+    """Создание поста или смена автора"""
+    if created:
+        change_posts_count(Author, [instance.author_id], 1)
+    elif instance._original_author_id not in (None, instance.author_id):
+        change_posts_count(Author, [instance._original_author_id], -1)
+        change_posts_count(Author, [instance.author_id], 1)
+    instance._original_author_id = instance.author_id
+
+
+@receiver(pre_delete, sender=Post)
+def decrement_tags_posts_count(sender, instance, **kwargs):
+    """
+    Связи с тегами удаляются каскадом без m2m_changed,
+    поэтому уменьшаем счетчики тегов до удаления
+    """
+    change_posts_count(
+        Tag, list(instance.tags.values_list('pk', flat=True)), -1
+    )
+
+
+@receiver(post_delete, sender=Post)
+def decrement_author_posts_count(sender, instance, **kwargs):
+    change_posts_count(Author, [instance.author_id], -1)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def update_tags_posts_count(sender, instance, action, reverse, pk_set,
+                            **kwargs):
+    """
+    Добавление/удаление связей пост-тег с обеих сторон.
+    В post_add/post_remove pk_set содержит только реально измененные связи
+    """
+    if action == 'pre_clear':
+        # Запоминаем связи до очистки
+        related = instance.posts if reverse else instance.tags
+        instance._cleared_pks = set(related.values_list('pk', flat=True))
+        return
+    if action == 'post_clear':
+        pk_set, delta = getattr(instance, '_cleared_pks', set()), -1
+    elif action == 'post_add':
+        delta = 1
+    elif action == 'post_remove':
+        delta = -1
+    else:
+        return
+
+    if not pk_set:
+        return
+    if reverse:
+        # tag.posts.add(...): у одного тега меняется len(pk_set) постов
+        change_posts_count(Tag, [instance.pk], delta * len(pk_set))
+    else:
+        change_posts_count(Tag, list(pk_set), delta)
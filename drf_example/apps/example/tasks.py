@@ -0,0 +1,110 @@
+from celery import chord, shared_task
+
+from drf_example.apps.example import counters, exports, progress
+from drf_example.apps.example.api.cache import invalidate
+from drf_example.apps.example.models import Post
+
+# Количество постов в одном UPDATE при смене статуса
+STATUS_CHUNK_SIZE = 1000
+
+
+@shared_task
+def flush_post_views():
+    """Периодический перенос буфера просмотров из Redis в БД"""
+    return counters.flush_post_views()
+
+
+@shared_task(bind=True)
+def export_posts_csv(self, spec):
+    """
+    Фоновый экспорт постов в CSV (см. exports.py): партиции по id
+    выгружаются параллельно, результат задачи - имя файла и число строк
+    """
+    partitions = exports.split_id_range(exports.get_export_queryset(spec))
+    if not partitions:
+        return exports.merge_parts(self.request.id, [])
+
+    total = len(partitions)
+    progress.start_progress(self.request.id)
+    self.update_state(state='PROGRESS', meta=progress.progress_meta(0, total))
+    # Склейка получит id этой задачи, по нему клиент и следит за экспортом
+    return self.replace(chord(
+        [
+            export_posts_partition.s(spec, self.request.id, index, low, high,
+                                     total)
+            for index, (low, high) in enumerate(partitions)
+        ],
+        merge_export_parts.s(self.request.id),
+    ))
+
+
+@shared_task(bind=True)
+def export_posts_partition(self, spec, job_id, index, low, high, total):
+    """Выгрузка одной партиции экспорта"""
+    part = exports.write_partition(spec, job_id, index, low, high)
+    self.update_state(task_id=job_id, state='PROGRESS',
+                      meta=progress.step_done(job_id, total))
+    return part
+
+
+@shared_task
+def merge_export_parts(parts, job_id):
+    """Склейка частей экспорта в один файл"""
+    return exports.merge_parts(job_id, parts)
+
+
+@shared_task
+def cleanup_exports():
+    """Периодическое удаление устаревших файлов экспорта"""
+    return exports.cleanup_exports()
+
+
+@shared_task(bind=True)
+def change_posts_status(self, post_ids, status):
+    """
+    Смена статуса набора постов: id делятся на чанки, каждый чанк -
+    один UPDATE (задачи выполняются параллельно через chord).
+    Результат - количество измененных постов.
+    """
+    statuses = {value for value, _ in Post.STATUS_CHOICES}
+    if status not in statuses:
+        raise ValueError(f'Неизвестный статус: {status}')
+
+    ids = sorted(set(post_ids))
+    chunks = [ids[start:start + STATUS_CHUNK_SIZE]
+              for start in range(0, len(ids), STATUS_CHUNK_SIZE)]
+    if not chunks:
+        return {'status': status, 'updated': 0}
+
+    total = len(chunks)
+    progress.start_progress(self.request.id)
+    self.update_state(state='PROGRESS', meta=progress.progress_meta(0, total))
+    return self.replace(chord(
+        [
+            change_posts_status_chunk.s(chunk, status, self.request.id, total)
+            for chunk in chunks
+        ],
+        finish_posts_status.s(status, self.request.id),
+    ))
+
+
+@shared_task(bind=True)
+def change_posts_status_chunk(self, post_ids, status, job_id, total):
+    """Один чанк смены статуса (правила published_at как в Post.save)"""
+    updated = (
+        Post.objects.filter(pk__in=post_ids)
+        .exclude(status=status)
+        .set_status(status)
+    )
+    # UPDATE не шлет сигналов - сбрасываем кеш ответов сами
+    invalidate('post')
+    self.update_state(task_id=job_id, state='PROGRESS',
+                      meta=progress.step_done(job_id, total))
+    return updated
+
+
+@shared_task
+def finish_posts_status(updated, status, job_id):
+    """Итог смены статуса по всем чанкам"""
+    progress.clear_progress(job_id)
+    return {'status': status, 'updated': sum(updated)}
@@ -1,3 +1,572 @@
-from django.test import TestCase
+import base64
+import copy
+import functools
+import json
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+import redis
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import URLResolver, include, path, reverse
+from django.urls.exceptions import Resolver404
+from django.urls.resolvers import RegexPattern
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from drf_example.apps.example.api.compiled import compile_serializer
+from drf_example.apps.example.api.eager_loading import optimize_queryset
+from drf_example.apps.example.api.filters import PostgresSearchFilter
+from drf_example.apps.example.api.pagination import KeysetPagination
+from drf_example.apps.example.api.router import router as example_router
+from drf_example.apps.example.api.serializers import PostSerializer
+from drf_example.apps.example.api.throttling import (
+    COST_KEY, THROTTLE_KEY, CostRateThrottle, UserRateThrottle,
+)
+from drf_example.apps.example.api.views.post import PostFilter, PostViewSet
+from drf_example.apps.example.management.commands import bench_url_resolve
+from drf_example.apps.example.models import Author, Post, Tag
+from drf_example.custom_router import EnhancedAPIRouter, compile_resolver
+
+User = get_user_model()
+
+BASE_TIME = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def make_author(username, first_name='', last_name=''):
+    user = User.objects.create(username=username, first_name=first_name,
+                               last_name=last_name)
+    return Author.objects.create(user=user)
+
+
+def compare_rows(ordering, a, b):
+    """Порядок строк как в KeysetPagination: NULL меньше любого значения"""
+    for name, descending in ordering:
+        x, y = a[name], b[name]
+        if x == y:
+            continue
+        if x is None:
+            result = -1
+        elif y is None:
+            result = 1
+        else:
+            result = -1 if x < y else 1
+        return -result if descending else result
+    return 0
+
+
+class KeysetPaginationTests(TestCase):
+    """
+    Keyset пагинация: страницы вперед и назад покрывают весь queryset
+    ровно один раз в порядке сортировки, в том числе через NULL
+    published_at, повторы created_at и сортировку по аннотациям
+    """
+    factory = APIRequestFactory()
+    default_ordering = [('published_at', True), ('created_at', True),
+                        ('id', True)]
+
+    @classmethod
+    def setUpTestData(cls):
+        ivan = make_author('ivan', 'Ivan', 'Petrov')
+        ivana = make_author('ivana', 'Ivana', 'Ivanova')
+        maria = make_author('maria', 'Maria', 'Sidorova')
+        authors = [ivan, ivana, maria]
+        cls.user = ivan.user
+        for i in range(14):
+            post = Post.objects.create(
+                title='python' if i % 2 else 'django',
+                slug=f'post-{i}',
+                content='python ' * (i % 3 + 1) + 'text',
+                author=authors[i % 3],
+            )
+            # Повторы created_at и published_at, каждый третий без даты
+            Post.objects.filter(pk=post.pk).update(
+                created_at=BASE_TIME + timedelta(hours=i // 3),
+                published_at=(None if i % 3 == 0 else
+                              BASE_TIME + timedelta(days=i // 4)),
+            )
+
+    def get_request(self, params):
+        return Request(self.factory.get('/posts/', params))
+
+    def paginate(self, queryset, params):
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(queryset,
+                                           self.get_request(params))
+        return [obj.pk for obj in page], paginator
+
+    def get_cursor(self, link):
+        return parse_qs(urlparse(link).query).get('cursor', [None])[0]
+
+    def walk(self, queryset, page_size):
+        """id всех страниц: вперед по next, затем назад по previous"""
+        forward, params = [], {'page_size': page_size}
+        while True:
+            page, paginator = self.paginate(queryset, params)
+            forward += page
+            link = paginator.get_next_link()
+            if link is None:
+                break
+            params = {'page_size': page_size,
+                      'cursor': self.get_cursor(link)}
+
+        backward = page
+        while (link := paginator.get_previous_link()) is not None:
+            page, paginator = self.paginate(
+                queryset,
+                {'page_size': page_size, 'cursor': self.get_cursor(link)},
+            )
+            backward = page + backward
+        return forward, backward
+
+    def get_expected(self, queryset, ordering):
+        rows = list(queryset.values(*[name for name, _ in ordering]))
+        rows.sort(key=functools.cmp_to_key(
+            functools.partial(compare_rows, ordering)
+        ))
+        return [row['id'] for row in rows]
+
+    def assertPagesCover(self, queryset, ordering):
+        expected = self.get_expected(queryset, ordering)
+        self.assertGreater(len(expected), 3)
+        for page_size in (1, 2, 3, 5, 100):
+            with self.subTest(page_size=page_size):
+                forward, backward = self.walk(queryset, page_size)
+                self.assertEqual(forward, expected)
+                self.assertEqual(backward, expected)
+
+    def test_cursor_round_trip(self):
+        page, paginator = self.paginate(Post.objects.all(), {'page_size': 2})
+        last = Post.objects.get(pk=page[-1])
+
+        cursor = self.get_cursor(paginator.get_next_link())
+        data = json.loads(base64.urlsafe_b64decode(cursor))
+        self.assertEqual(data['v'], [
+            last.published_at and last.published_at.isoformat(),
+            last.created_at.isoformat(),
+            last.pk,
+        ])
+        self.assertFalse(data['r'])
+
+        paginator = KeysetPagination()
+        paginator.ordering = self.default_ordering
+        decoded = paginator.decode_cursor(
+            self.get_request({'cursor': cursor})
+        )
+        self.assertEqual(decoded, {'values': data['v'], 'reverse': False})
+
+    def test_default_ordering_nulls_last_and_ties(self):
+        self.assertPagesCover(Post.objects.all(), self.default_ordering)
+
+    def test_ascending_ordering_nulls_first(self):
+        self.assertPagesCover(
+            Post.objects.order_by('published_at'),
+            [('published_at', False), ('id', False)],
+        )
+
+    def test_created_at_ties(self):
+        self.assertPagesCover(
+            Post.objects.order_by('created_at'),
+            [('created_at', False), ('id', False)],
+        )
+        self.assertPagesCover(
+            Post.objects.order_by('-created_at', 'id'),
+            [('created_at', True), ('id', False)],
+        )
+
+    def test_search_rank_ordering(self):
+        queryset = PostgresSearchFilter().filter_queryset(
+            self.get_request({'search': 'python'}), Post.objects.all(), None
+        )
+        self.assertPagesCover(
+            queryset, [('search_rank', True), *self.default_ordering]
+        )
+
+    def test_author_similarity_ordering(self):
+        queryset = PostFilter({'author_name': 'Ivan'},
+                              queryset=Post.objects.all()).qs
+        self.assertEqual(
+            set(queryset.values_list('author__user__username', flat=True)),
+            {'ivan', 'ivana'},
+        )
+        self.assertPagesCover(
+            queryset, [('author_similarity', True), *self.default_ordering]
+        )
+
+    def test_async_page_matches_sync(self):
+        queryset = Post.objects.all()
+        page, paginator = self.paginate(queryset, {'page_size': 4})
+        cursor = self.get_cursor(paginator.get_next_link())
+        params = {'page_size': 4, 'cursor': cursor}
+
+        paginator = KeysetPagination()
+        async_page = async_to_sync(paginator.apaginate_queryset)(
+            queryset, self.get_request(params)
+        )
+        self.assertEqual([obj.pk for obj in async_page],
+                         self.paginate(queryset, params)[0])
+
+    def test_invalid_cursor(self):
+        def encode(data):
+            return base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+
+        ordering = [list(item) for item in self.default_ordering]
+        cursors = {
+            'не base64': '!!!',
+            'не JSON': base64.urlsafe_b64encode(b'not json').decode(),
+            'без полей': encode({'v': []}),
+            'другая сортировка': encode({'v': [1, 1], 'r': False,
+                                         'o': [['created_at', True],
+                                               ['id', True]]}),
+            'не то число значений': encode({'v': [1], 'r': False,
+                                            'o': ordering}),
+            'не дата': encode({'v': ['вчера', '2026-01-01T00:00:00', 1],
+                               'r': False, 'o': ordering}),
+        }
+        for name, cursor in cursors.items():
+            with self.subTest(name), self.assertRaises(NotFound):
+                self.paginate(Post.objects.all(), {'cursor': cursor})
+
+    @mock.patch.object(PostViewSet, 'throttle_classes', [])
+    def test_invalid_cursor_response(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get('/api/examples/posts/',
+                              {'cursor': 'garbage', 'format': 'json'})
+        self.assertEqual(response.status_code, 404)
+
+
+class CompiledSerializerTests(TestCase):
+    """
+    CompiledSerializer отдает те же данные, что PostSerializer(many=True)
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        author = make_author('ivan')
+        # Теги создаются не по алфавиту: порядок задает Tag.Meta.ordering
+        tags = [Tag.objects.create(name=name, slug=name)
+                for name in ('zeta', 'alpha', 'mu')]
+        statuses = [status for status, _ in Post.STATUS_CHOICES]
+        for i in range(6):
+            post = Post.objects.create(
+                title=f'python {i}',
+                slug=f'compiled-{i}',
+                content='python text ' * (i + 1),
+                excerpt='' if i % 2 else f'excerpt {i}',
+                author=author,
+                status=statuses[i % len(statuses)],
+                is_featured=bool(i % 2),
+            )
+            post.tags.set(tags[:i % 4])
+        # Изображение только у части постов
+        Post.objects.filter(slug__in=['compiled-0', 'compiled-3']).update(
+            featured_image='posts/cover.jpg'
+        )
+
+    def get_context(self, fields=None):
+        request = Request(APIRequestFactory().get('/posts/'))
+        context = {'request': request}
+        if fields is not None:
+            context['fields'] = fields
+        return context
+
+    def assertSameData(self, objects, context):
+        serializer = PostSerializer(objects, many=True, context=context)
+        compiled = compile_serializer(serializer.child)
+        self.assertIsNotNone(compiled)
+        self.assertEqual(compiled.serialize(objects, serializer),
+                         PostSerializer(objects, many=True,
+                                        context=context).data)
+
+    def test_queryset(self):
+        data = PostSerializer(Post.objects.all(), many=True,
+                              context=self.get_context()).data
+        # В данных есть все проверяемые случаи
+        self.assertEqual({item['featured_image'] is None for item in data},
+                         {True, False})
+        self.assertEqual({item['status'] for item in data},
+                         {status for status, _ in Post.STATUS_CHOICES})
+        self.assertEqual({item['is_published'] for item in data},
+                         {True, False})
+        self.assertSameData(Post.objects.all(), self.get_context())
+
+    def test_instances(self):
+        context = self.get_context()
+        serializer = PostSerializer(many=True, context=context)
+        instances = list(optimize_queryset(Post.objects.all(),
+                                           serializer.child, project=True))
+        self.assertSameData(instances, context)
+
+    def test_tags_order(self):
+        alpha, mu, zeta = (Tag.objects.get(name=name)
+                           for name in ('alpha', 'mu', 'zeta'))
+        queryset = Post.objects.filter(slug='compiled-3')
+        serializer = PostSerializer(queryset, many=True,
+                                    context=self.get_context())
+        data = compile_serializer(serializer.child).serialize(queryset,
+                                                              serializer)
+        self.assertEqual(data[0]['tags'], [alpha.pk, mu.pk, zeta.pk])
+        self.assertSameData(queryset, self.get_context())
+
+    def test_only_projections(self):
+        for fields in (['id', 'title'],
+                       ['id', 'status', 'is_published'],
+                       ['featured_image', 'tags', 'author'],
+                       ['published_at', 'created_at', 'reading_time']):
+            with self.subTest(fields=fields):
+                context = self.get_context(fields)
+                serializer = PostSerializer(many=True, context=context)
+                queryset = optimize_queryset(
+                    Post.objects.all(), serializer.child, project=True
+                )
+                self.assertTrue(queryset.query.deferred_loading[0])
+                self.assertSameData(queryset, context)
+                self.assertSameData(list(queryset), context)
+
+    def test_search_headline_annotation(self):
+        queryset = PostgresSearchFilter().filter_queryset(
+            Request(APIRequestFactory().get('/posts/', {'search': 'python'})),
+            Post.objects.all(), None,
+        )
+        context = self.get_context()
+        data = PostSerializer(queryset, many=True, context=context).data
+        self.assertIn('<mark>', data[0]['search_headline'])
+        self.assertSameData(queryset, context)
+        # Без аннотации поле пропускается, как у DRF
+        self.assertSameData(Post.objects.all(), context)
+
+
+class RedisThrottleTestCase(SimpleTestCase):
+    """Throttle с уникальным ключом в Redis (REDIS_URL) на каждый тест"""
+
+    def setUp(self):
+        self.key = f'test-{uuid.uuid4().hex}'
+        self.redis = redis.Redis.from_url(settings.REDIS_URL)
+        self.addCleanup(self.redis.close)
+        self.addCleanup(self.redis.delete, THROTTLE_KEY.format(key=self.key))
+
+    def make_throttle(self, throttle_class, rate):
+        throttle = type(throttle_class.__name__, (throttle_class,),
+                        {'rate': rate})()
+        throttle.get_cache_key = lambda request, view: self.key
+        return throttle
+
+    def allow(self, throttle, action='list'):
+        request = SimpleNamespace(method='GET')
+        return throttle.allow_request(request, SimpleNamespace(action=action))
+
+
+class GCRAThrottleTests(RedisThrottleTestCase):
+
+    def test_rate_per_window(self):
+        throttle = self.make_throttle(UserRateThrottle, '5/m')
+        self.assertEqual([self.allow(throttle) for _ in range(6)],
+                         [True] * 5 + [False])
+        # Следующий запрос разрешен через интервал 60 / 5 секунд
+        self.assertAlmostEqual(throttle.wait(), 12, delta=1)
+        self.assertFalse(self.allow(throttle))
+
+    def test_allows_after_interval(self):
+        throttle = self.make_throttle(UserRateThrottle, '5/s')
+        self.assertEqual([self.allow(throttle) for _ in range(6)],
+                         [True] * 5 + [False])
+        self.assertLessEqual(throttle.wait(), 0.2)
+        time.sleep(throttle.wait() + 0.05)
+        self.assertTrue(self.allow(throttle))
+        self.assertFalse(self.allow(throttle))
+
+    def test_key_expires_with_bucket(self):
+        throttle = self.make_throttle(UserRateThrottle, '5/m')
+        self.allow(throttle)
+        ttl = self.redis.pttl(THROTTLE_KEY.format(key=self.key))
+        self.assertAlmostEqual(ttl, 12000, delta=1000)
+
+    def test_redis_error_allows_request(self):
+        throttle = self.make_throttle(UserRateThrottle, '1/m')
+        with mock.patch(
+            'drf_example.apps.example.api.throttling.get_script',
+            side_effect=redis.ConnectionError,
+        ), self.assertLogs('drf_example.apps.example.api.throttling',
+                           'WARNING'):
+            self.assertEqual([self.allow(throttle) for _ in range(3)],
+                             [True] * 3)
+        self.assertIsNone(throttle.wait())
+
+
+class CostRateThrottleTests(RedisThrottleTestCase):
+    """Бюджет '100/m': 100 КиБ в минуту, интервал 600 мс на КиБ"""
+
+    def setUp(self):
+        super().setUp()
+        for action in ('list', 'retrieve'):
+            self.addCleanup(self.redis.delete,
+                            COST_KEY.format(key=self.key, action=action))
+        self.throttle = self.make_throttle(CostRateThrottle, '100/m')
+
+    def test_first_request_allowed(self):
+        self.assertTrue(self.allow(self.throttle))
+        self.assertIsNone(self.throttle.wait())
+
+    def test_checks_last_cost_of_action(self):
+        self.assertTrue(self.allow(self.throttle))
+        self.throttle.charge(80 * 1024)
+        # Повтор ждет, пока в бюджете освободятся 80 КиБ:
+        # 48 с списано + 48 с на повтор - 60 с окна
+        self.assertFalse(self.allow(self.throttle))
+        self.assertAlmostEqual(self.throttle.wait(), 36, delta=1)
+        # Для других действий прошлая стоимость не известна
+        self.assertTrue(self.allow(self.throttle, 'retrieve'))
+
+    def test_cheap_action_not_checked(self):
+        self.assertTrue(self.allow(self.throttle))
+        self.throttle.charge(80 * 1024)
+        self.assertTrue(self.allow(self.throttle, 'retrieve'))
+        self.throttle.charge(10 * 1024)
+        self.assertTrue(self.allow(self.throttle, 'retrieve'))
+        self.assertFalse(self.allow(self.throttle))
+
+    def test_cost_capped_by_budget(self):
+        self.assertTrue(self.allow(self.throttle))
+        self.throttle.charge(500 * 1024)
+        self.assertEqual(
+            int(self.redis.get(COST_KEY.format(key=self.key, action='list'))),
+            500,
+        )
+        # Ждет полный бюджет, а не 500 КиБ: 300 с списано + 60 - 60
+        self.assertFalse(self.allow(self.throttle))
+        self.assertAlmostEqual(self.throttle.wait(), 300, delta=1)
+
+    def test_charge_without_request(self):
+        self.throttle.charge(500 * 1024)
+        self.assertFalse(self.redis.exists(
+            THROTTLE_KEY.format(key=self.key),
+            COST_KEY.format(key=self.key, action='list'),
+        ))
+
+    def test_redis_error_on_charge(self):
+        self.assertTrue(self.allow(self.throttle))
+        with mock.patch(
+            'drf_example.apps.example.api.throttling.get_script',
+            side_effect=redis.ConnectionError,
+        ), self.assertLogs('drf_example.apps.example.api.throttling',
+                           'WARNING'):
+            self.throttle.charge(80 * 1024)
+        self.assertTrue(self.allow(self.throttle))
+
+
+def build_api_resolver(flat_urls):
+    """
+    /api/ как в urls.py: роутеры из api/router.py в режиме flat_urls
+    (path()) или в старом (вложенные re_path)
+    """
+    examples = copy.copy(example_router)
+    examples.flat_urls = flat_urls
+    examples.__dict__.pop('_urls', None)
+    api_router = EnhancedAPIRouter(flat_urls=flat_urls)
+    api_router.register('examples', examples, basename='examples')
+    return URLResolver(RegexPattern(r'^/'),
+                       [path('api/', include(api_router.urls))])
+
+
+def describe_match(match):
+    """ResolverMatch без идентичности view: as_view у каждого роутера свой"""
+    func = match.func
+    return {
+        'view': (func.cls, getattr(func, 'actions', None), func.initkwargs),
+        'kwargs': match.kwargs,
+        'url_name': match.url_name,
+        'view_name': match.view_name,
+    }
+
+
+class RouterResolveTests(SimpleTestCase):
+    """
+    Каждый маршрут /api/ разбирается одинаково старыми re_path,
+    плоскими path() и TrieURLResolver
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.regex = build_api_resolver(flat_urls=False)
+        cls.flat = build_api_resolver(flat_urls=True)
+        # Как URL_TRIE_DISPATCH в urls.py: те же паттерны path()
+        cls.trie = compile_resolver(cls.flat)
+        cls.paths = cls.get_paths()
+
+    @classmethod
+    def get_paths(cls):
+        """Пути всех именованных маршрутов /api/ (как bench_url_resolve)"""
+        command = bench_url_resolve.Command()
+        paths = []
+        for viewname, kwarg_names in command.iter_endpoints(
+                cls.flat.url_patterns):
+            kwargs = {name: bench_url_resolve.SAMPLE_KWARGS.get(name, '1')
+                      for name in kwarg_names}
+            paths.append(reverse(viewname, kwargs=kwargs))
+        return paths
+
+    def resolve_all(self, url):
+        """
+        Результат resolve старыми re_path, path() и trie
+        (None для 404). Trie строится из тех же паттернов, что и path(),
+        поэтому view у них должен совпадать
+        """
+        matches = []
+        for resolver in (self.regex, self.flat, self.trie):
+            try:
+                matches.append(resolver.resolve(url))
+            except Resolver404:
+                matches.append(None)
+        regex_match, flat_match, trie_match = matches
+        if flat_match is not None and trie_match is not None:
+            self.assertIs(trie_match.func, flat_match.func)
+        return [match and describe_match(match) for match in matches]
+
+    def test_routes(self):
+        for expected in ('/api/',
+                         '/api/examples/',
+                         '/api/examples/posts/1/',
+                         '/api/examples/authors/1/posts/',
+                         '/api/examples/authors/1/posts/1/',
+                         '/api/examples/authors/1/posts/bulk/'):
+            self.assertIn(expected, self.paths)
+
+        for url in self.paths:
+            with self.subTest(url=url):
+                regex_match, flat_match, trie_match = self.resolve_all(url)
+                self.assertIsNotNone(regex_match)
+                self.assertEqual(flat_match, regex_match)
+                self.assertEqual(trie_match, regex_match)
+
+    def test_format_suffix(self):
+        # EnhancedAPIRouter не добавляет format_suffix_patterns (формат
+        # выбирается через ?format=), важно одинаковое поведение режимов
+        for url in self.paths:
+            url = f'{url.rstrip("/")}.json'
+            with self.subTest(url=url):
+                regex_match, flat_match, trie_match = self.resolve_all(url)
+                self.assertEqual(flat_match, regex_match)
+                self.assertEqual(trie_match, regex_match)
+
+    def test_not_found(self):
+        for url in ('/api/examples/unknown/',
+                    '/api/examples/posts',
+                    '/api/examples/posts/1/unknown/',
+                    '/api/examples/posts/1/2/',
+                    '/api/examples/posts/1.2/',
+                    '/api/examples/authors//posts/',
+                    '/api/examples/authors/1/posts/1/unknown/',
+                    '/api/examples/authors/1/tags/',
+                    '/api/unknown/',
+                    '/unknown/'):
+            with self.subTest(url=url):
+                self.assertEqual(self.resolve_all(url), [None] * 3)
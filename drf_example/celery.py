@@ -8,6 +8,7 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'drf_example.settings')
 
 from celery import Celery, shared_task
 
+from drf_example import celery_metrics  # noqa: F401 (сигналы метрик)
 from drf_example.settings.celery import CELERY
 
 # Set the default Django settings module for the 'celery' program.
@@ -23,6 +24,12 @@ app.config_from_object(CELERY)
 # Load task modules from all registered Django apps.
 app.autodiscover_tasks()
 
+@app.on_after_finalize.connect
+def setup_result_policies(sender, **kwargs):
+    """Политики хранения результатов задач (CELERY_RESULT_POLICIES)"""
+    from drf_example.celery_backends import apply_result_policies
+    apply_result_policies(sender)
+
 # Настройка очередей с разными приоритетами
 app.conf.task_queues = {
     'high': {'exchange': 'high', 'routing_key': 'high'},
@@ -31,9 +38,17 @@ app.conf.task_queues = {
 
 # Установка маршрутизации задач по очередям
 app.conf.task_routes = {
-    'drf_example.celery.update_example_name': {'queue': 'high'},
     'drf_example.celery.very_long_task': {'queue': 'default'},
     'drf_example.celery.debug_task': {'queue': 'default'},
+    'drf_example.celery.cleanup_task_results': {'queue': 'default'},
+    'drf_example.apps.example.tasks.flush_post_views': {'queue': 'default'},
+    'drf_example.apps.example.tasks.export_posts_csv': {'queue': 'default'},
+    'drf_example.apps.example.tasks.export_posts_partition': {'queue': 'default'},
+    'drf_example.apps.example.tasks.merge_export_parts': {'queue': 'default'},
+    'drf_example.apps.example.tasks.cleanup_exports': {'queue': 'default'},
+    'drf_example.apps.example.tasks.change_posts_status': {'queue': 'high'},
+    'drf_example.apps.example.tasks.change_posts_status_chunk': {'queue': 'high'},
+    'drf_example.apps.example.tasks.finish_posts_status': {'queue': 'high'},
 }
 
 @app.task(
@@ -69,9 +84,7 @@ def very_long_task(self):
     return 1
 
 @app.task
-def update_example_name(example_id, new_name):
-    from drf_example.apps.example.models import ExampleModel
-    example = ExampleModel.objects.get(id=example_id)
-    example.name = new_name
-    example.save()
-    return example.name
+def cleanup_task_results():
+    """Удаление просроченных результатов задач из БД пачками"""
+    from drf_example.celery_backends import delete_expired_results
+    return delete_expired_results(app.conf.result_expires)
@@ -0,0 +1,125 @@
+"""
+Хранилища результатов Celery.
+
+Политика хранения задается для каждой задачи в CELERY_RESULT_POLICIES:
+
+- 'none' - результат не сохраняется (ignore_result)
+- 'redis' - Redis с TTL CELERY_RESULT_REDIS_TTL
+- 'db' - основной backend (django_celery_results), по умолчанию
+
+Результаты (и аргументы при result_extended) больше
+CELERY_RESULT_COMPRESS_THRESHOLD байт сжимаются zlib.
+Просроченные строки в БД удаляются пачками (см. cleanup).
+
+Задачи chord (части и callback) должны оставаться в основном backend:
+Celery собирает результаты chord через app.backend.
+"""
+import base64
+import time
+import zlib
+from datetime import timedelta
+
+from celery.backends.redis import RedisBackend
+from django.conf import settings
+from django.utils.timezone import now
+from django_celery_results.backends import DatabaseBackend
+from django_celery_results.models import GroupResult, TaskResult
+
+RESULT_NONE = 'none'
+RESULT_REDIS = 'redis'
+RESULT_DB = 'db'
+
+# Префикс сжатого значения (не может начинать JSON)
+COMPRESSED_PREFIX = 'zlib:'
+
+
+class CompressionMixin:
+    """Сжимает сериализованные значения больше порога"""
+
+    def _encode(self, data):
+        content_type, content_encoding, payload = super()._encode(data)
+        threshold = settings.CELERY_RESULT_COMPRESS_THRESHOLD
+        if threshold is None or len(payload) < threshold:
+            return content_type, content_encoding, payload
+
+        if isinstance(payload, str):
+            payload = payload.encode(content_encoding or 'utf-8')
+        compressed = base64.b64encode(zlib.compress(payload)).decode()
+        return content_type, content_encoding, COMPRESSED_PREFIX + compressed
+
+    def decode(self, payload):
+        if isinstance(payload, bytes) and \
+                payload.startswith(COMPRESSED_PREFIX.encode()):
+            payload = payload.decode()
+        if isinstance(payload, str) and payload.startswith(COMPRESSED_PREFIX):
+            payload = zlib.decompress(
+                base64.b64decode(payload[len(COMPRESSED_PREFIX):])
+            )
+        return super().decode(payload)
+
+
+class CompressedRedisBackend(CompressionMixin, RedisBackend):
+    """Redis backend со сжатием больших результатов"""
+
+
+class CompressedDatabaseBackend(CompressionMixin, DatabaseBackend):
+    """
+    django-db backend со сжатием больших результатов и удалением
+    просроченных строк пачками (встроенный cleanup удаляет все одним
+    DELETE и надолго блокирует таблицу)
+    """
+
+    def cleanup(self):
+        delete_expired_results(self.expires)
+
+
+def delete_expired_results(expires, batch_size=None, pause=0.1):
+    """
+    Удаляет результаты старше expires пачками по batch_size строк,
+    каждая пачка - отдельная короткая транзакция
+    """
+    if not isinstance(expires, timedelta):
+        expires = timedelta(seconds=expires)
+    batch_size = batch_size or settings.CELERY_RESULT_CLEANUP_BATCH_SIZE
+    cutoff = now() - expires
+    deleted = 0
+    for model in (TaskResult, GroupResult):
+        while True:
+            pks = list(
+                model.objects.filter(date_done__lt=cutoff)
+                .order_by('date_done')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not pks:
+                break
+            deleted += model.objects.filter(pk__in=pks).delete()[0]
+            if len(pks) < batch_size:
+                break
+            # Даем место запросам API между пачками
+            time.sleep(pause)
+    return deleted
+
+
+def apply_result_policies(app):
+    """Настраивает хранение результатов зарегистрированных задач"""
+    policies = settings.CELERY_RESULT_POLICIES
+    redis_backend = None
+    for name, policy in policies.items():
+        task = app.tasks.get(name)
+        if task is None:
+            continue
+        if policy == RESULT_NONE:
+            task.ignore_result = True
+        elif policy == RESULT_REDIS:
+            if redis_backend is None:
+                redis_backend = CompressedRedisBackend(
+                    app=app,
+                    url=settings.CELERY_RESULT_REDIS_URL,
+                    expires=settings.CELERY_RESULT_REDIS_TTL,
+                )
+            task.backend = redis_backend
+        elif policy != RESULT_DB:
+            raise ValueError(
+                f'Неизвестная политика хранения результата {policy!r} '
+                f'для задачи {name}'
+            )
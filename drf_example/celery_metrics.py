@@ -0,0 +1,238 @@
+"""
+Метрики задач и очередей Celery в формате Prometheus.
+
+Обработчики сигналов Celery пишут метрики в Redis (общий для всех
+воркеров), а metrics_view в Django отдает их вместе с текущей длиной
+очередей брокера:
+
+- celery_task_queue_wait_seconds - время от публикации до старта задачи
+- celery_task_runtime_seconds - время выполнения
+- celery_tasks_total - завершенные задачи по состоянию
+- celery_task_retries_total, celery_task_failures_total
+- celery_queue_length - длина очередей из app.conf.task_queues
+
+Метки: task и queue. Ошибки Redis не влияют на выполнение задач.
+"""
+import json
+import logging
+import time
+from datetime import datetime
+
+import redis
+from celery import current_app
+from celery.signals import (
+    before_task_publish, task_failure, task_postrun, task_prerun, task_retry,
+)
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+logger = logging.getLogger(__name__)
+
+METRICS_KEY = 'celery:metrics:{name}'
+# Границы бакетов гистограмм, секунды
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30,
+           60, 300)
+
+HISTOGRAMS = {
+    'celery_task_queue_wait_seconds': 'Время ожидания задачи в очереди',
+    'celery_task_runtime_seconds': 'Время выполнения задачи',
+}
+COUNTERS = {
+    'celery_tasks_total': 'Завершенные задачи по состоянию',
+    'celery_task_retries_total': 'Повторные попытки задач',
+    'celery_task_failures_total': 'Упавшие задачи',
+}
+
+# task_id -> время старта в текущем процессе воркера
+_started = {}
+_redis_client = None
+_broker_client = None
+
+
+def get_redis():
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(settings.REDIS_URL)
+    return _redis_client
+
+
+def get_queue(task):
+    delivery_info = getattr(task.request, 'delivery_info', None) or {}
+    return delivery_info.get('routing_key') or 'celery'
+
+
+def labels_field(**labels):
+    return json.dumps(labels, sort_keys=True)
+
+
+def observe(name, value, **labels):
+    """Добавляет значение в гистограмму name"""
+    field = labels_field(**labels)
+    bucket = next((str(le) for le in BUCKETS if value <= le), '+Inf')
+    pipe = get_redis().pipeline(transaction=False)
+    pipe.hincrby(METRICS_KEY.format(name=f'{name}:bucket:{bucket}'), field, 1)
+    pipe.hincrbyfloat(METRICS_KEY.format(name=f'{name}:sum'), field, value)
+    pipe.hincrby(METRICS_KEY.format(name=f'{name}:count'), field, 1)
+    pipe.execute()
+
+
+def increment(name, **labels):
+    get_redis().hincrby(METRICS_KEY.format(name=name),
+                        labels_field(**labels), 1)
+
+
+def safe(handler):
+    """Метрики не должны ронять задачу"""
+    def wrapper(*args, **kwargs):
+        try:
+            handler(*args, **kwargs)
+        except redis.RedisError:
+            logger.warning('Не удалось записать метрики Celery',
+                           exc_info=True)
+
+    wrapper.__name__ = handler.__name__
+    return wrapper
+
+
+@before_task_publish.connect(weak=False)
+def stamp_published_at(headers=None, **kwargs):
+    """Время публикации в заголовке сообщения - для времени ожидания"""
+    if headers is not None:
+        headers.setdefault('published_at', time.time())
+
+
+def get_ready_at(request):
+    """
+    Момент, с которого задача могла начаться: публикация или eta
+    (отложенные задачи не должны завышать время ожидания)
+    """
+    published_at = getattr(request, 'published_at', None)
+    if published_at is None:
+        published_at = (getattr(request, 'headers', None) or {}).get(
+            'published_at'
+        )
+    if published_at is None:
+        return None
+    ready_at = float(published_at)
+    if request.eta:
+        ready_at = max(ready_at, datetime.fromisoformat(request.eta).timestamp())
+    return ready_at
+
+
+@task_prerun.connect(weak=False)
+@safe
+def on_task_prerun(task_id=None, task=None, **kwargs):
+    now = time.time()
+    _started[task_id] = time.monotonic()
+    ready_at = get_ready_at(task.request)
+    if ready_at is not None:
+        observe('celery_task_queue_wait_seconds', max(now - ready_at, 0),
+                task=task.name, queue=get_queue(task))
+
+
+@task_postrun.connect(weak=False)
+@safe
+def on_task_postrun(task_id=None, task=None, state=None, **kwargs):
+    started = _started.pop(task_id, None)
+    queue = get_queue(task)
+    if started is not None:
+        observe('celery_task_runtime_seconds', time.monotonic() - started,
+                task=task.name, queue=queue)
+    increment('celery_tasks_total', task=task.name, queue=queue,
+              state=state or 'UNKNOWN')
+
+
+@task_retry.connect(weak=False)
+@safe
+def on_task_retry(sender=None, request=None, **kwargs):
+    delivery_info = getattr(request, 'delivery_info', None) or {}
+    increment('celery_task_retries_total', task=sender.name,
+              queue=delivery_info.get('routing_key') or 'celery')
+
+
+@task_failure.connect(weak=False)
+@safe
+def on_task_failure(sender=None, **kwargs):
+    increment('celery_task_failures_total', task=sender.name,
+              queue=get_queue(sender))
+
+
+def format_labels(field, **extra):
+    """Метки Prometheus из поля hash (JSON) и дополнительных меток"""
+    labels = {**json.loads(field), **extra}
+    return ','.join(
+        '{}="{}"'.format(key, str(value).replace('\\', '\\\\')
+                         .replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels.items()
+    )
+
+
+def read_hash(client, name):
+    values = client.hgetall(METRICS_KEY.format(name=name))
+    return {field.decode(): float(value) for field, value in values.items()}
+
+
+def render_histogram(client, name, help_text):
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+    buckets = [str(le) for le in BUCKETS] + ['+Inf']
+    values = {le: read_hash(client, f'{name}:bucket:{le}') for le in buckets}
+    sums = read_hash(client, f'{name}:sum')
+    counts = read_hash(client, f'{name}:count')
+    for field in sorted(counts):
+        cumulative = 0
+        for le in buckets:
+            cumulative += values[le].get(field, 0)
+            labels = format_labels(field, le=le)
+            lines.append(f'{name}_bucket{{{labels}}} {int(cumulative)}')
+        labels = format_labels(field)
+        lines.append(f'{name}_sum{{{labels}}} {sums.get(field, 0.0)!r}')
+        lines.append(f'{name}_count{{{labels}}} {int(counts[field])}')
+    return lines
+
+
+def render_counter(client, name, help_text):
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+    values = read_hash(client, name)
+    for field in sorted(values):
+        lines.append(f'{name}{{{format_labels(field)}}} {int(values[field])}')
+    return lines
+
+
+def render_queue_lengths():
+    """Длина очередей брокера (Redis transport: список с именем очереди)"""
+    global _broker_client
+    name = 'celery_queue_length'
+    lines = [f'# HELP {name} Сообщений в очереди брокера',
+             f'# TYPE {name} gauge']
+    if _broker_client is None:
+        _broker_client = redis.Redis.from_url(current_app.conf.broker_url)
+    queues = current_app.conf.task_queues or {}
+    for queue in sorted(queues):
+        lines.append(f'{name}{{queue="{queue}"}} {_broker_client.llen(queue)}')
+    return lines
+
+
+def render_metrics():
+    client = get_redis()
+    lines = []
+    for name, help_text in HISTOGRAMS.items():
+        lines += render_histogram(client, name, help_text)
+    for name, help_text in COUNTERS.items():
+        lines += render_counter(client, name, help_text)
+    lines += render_queue_lengths()
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """GET /metrics/ - метрики Celery для Prometheus"""
+    allowed = getattr(settings, 'METRICS_ALLOWED_IPS', None)
+    if allowed is not None and request.META.get('REMOTE_ADDR') not in allowed:
+        return HttpResponseForbidden()
+    try:
+        content = render_metrics()
+    except redis.RedisError:
+        logger.warning('Redis недоступен, метрики Celery не отданы',
+                       exc_info=True)
+        return HttpResponse(status=503)
+    return HttpResponse(content,
+                        content_type='text/plain; version=0.0.4; charset=utf-8')
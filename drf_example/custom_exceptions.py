@@ -1,4 +1,8 @@
+import functools
 import logging
+import os
+import threading
+import time
 from datetime import datetime
 from django.core.exceptions import ValidationError as DjangoValidationError
 from django.http import Http404
@@ -12,7 +16,6 @@ from rest_framework.exceptions import (
     AuthenticationFailed, NotAuthenticated,
     Throttled, UnsupportedMediaType
 )
-import uuid
 
 
 class BlogAPIException(APIException):
@@ -31,6 +34,12 @@ class BlogAPIException(APIException):
 
 logger = logging.getLogger(__name__)
 
+# Одинаковые ошибки (тип, view, action, статус) пишутся в лог не чаще
+# раза в ERROR_LOG_INTERVAL секунд, пропущенные считаются в suppressed
+ERROR_LOG_INTERVAL = 10
+# Сколько различных ошибок отслеживать (при переполнении счетчики сбрасываются)
+ERROR_LOG_MAX_KEYS = 1000
+
 
 def custom_exception_handler(exc, context):
     """
@@ -39,12 +48,10 @@ def custom_exception_handler(exc, context):
     # Сначала вызываем стандартный обработчик DRF
     response = drf_exception_handler(exc, context)
 
-    # Получаем дополнительную информацию о контексте
-    view = context.get('view')
     request = context.get('request')
 
     # Генерируем уникальный ID ошибки для трекинга
-    error_id = str(uuid.uuid4())[:8]
+    error_id = os.urandom(4).hex()
 
     # Логируем ошибку
     log_exception(exc, context, error_id)
@@ -61,18 +68,30 @@ def custom_exception_handler(exc, context):
 
     else:
         # Обрабатываем исключения, которые DRF не обработал
-        if isinstance(exc, DjangoValidationError):
-            response = handle_django_validation_error(exc, request, error_id)
-        elif isinstance(exc, IntegrityError):
-            response = handle_integrity_error(exc, request, error_id)
-        elif isinstance(exc, Http404):
-            response = handle_http_404(exc, request, error_id)
-        else:
-            response = handle_unexpected_error(exc, request, error_id)
+        handler = get_fallback_handler(type(exc))
+        response = handler(exc, request, error_id)
 
     return response
 
 
+def find_in_mro(table, exc_class, default=None):
+    """Значение table для ближайшего класса в MRO исключения"""
+    for cls in exc_class.__mro__:
+        if cls in table:
+            return table[cls]
+    return default
+
+
+@functools.lru_cache(maxsize=256)
+def get_error_builder(exc_class):
+    return find_in_mro(ERROR_BUILDERS, exc_class, build_api_error)
+
+
+@functools.lru_cache(maxsize=256)
+def get_fallback_handler(exc_class):
+    return find_in_mro(FALLBACK_HANDLERS, exc_class, handle_unexpected_error)
+
+
 def build_error_response(exc, original_data, request, error_id):
     """
     Строит стандартизированный ответ об ошибке
@@ -86,104 +105,135 @@ def build_error_response(exc, original_data, request, error_id):
         'method': request.method if request else None,
     }
 
-    # Определяем тип ошибки и добавляем специфическую информацию
-    if isinstance(exc, ValidationError):
-        error_response.update({
-            'error_type': 'validation_error',
-            'message': 'Ошибка валидации данных',
-            'details': format_validation_errors(original_data),
-            'code': getattr(exc, 'default_code', 'validation_error')
-        })
-
-    elif isinstance(exc, PermissionDenied):
-        error_response.update({
-            'error_type': 'permission_denied',
-            'message': str(exc.detail) if hasattr(exc,
-                                                  'detail') else 'Доступ запрещен',
-            'code': getattr(exc, 'default_code', 'permission_denied'),
-            'help': 'Проверьте права доступа или войдите в систему'
-        })
-
-    elif isinstance(exc, NotAuthenticated):
-        error_response.update({
-            'error_type': 'authentication_required',
-            'message': 'Требуется аутентификация',
-            'code': 'not_authenticated',
-            'help': 'Передайте действительный токен аутентификации'
-        })
-
-    elif isinstance(exc, AuthenticationFailed):
-        error_response.update({
-            'error_type': 'authentication_failed',
-            'message': str(exc.detail) if hasattr(exc,
-                                                  'detail') else 'Ошибка аутентификации',
-            'code': getattr(exc, 'default_code', 'authentication_failed'),
-            'help': 'Проверьте корректность учетных данных'
-        })
-
-    elif isinstance(exc, NotFound):
-        error_response.update({
-            'error_type': 'not_found',
-            'message': str(exc.detail) if hasattr(exc,
-                                                  'detail') else 'Ресурс не найден',
-            'code': getattr(exc, 'default_code', 'not_found'),
-            'help': 'Проверьте правильность URL и параметров запроса'
-        })
-
-    elif isinstance(exc, MethodNotAllowed):
-        error_response.update({
-            'error_type': 'method_not_allowed',
-            'message': f'Метод {exc.detail} не разрешен',
-            'code': 'method_not_allowed',
-            'allowed_methods': getattr(exc, 'detail', [])
-        })
-
-    elif isinstance(exc, Throttled):
-        error_response.update({
-            'error_type': 'rate_limit_exceeded',
-            'message': 'Превышен лимит запросов',
-            'code': 'throttled',
-            'retry_after': exc.wait,
-            'help': f'Повторите запрос через {exc.wait} секунд'
-        })
-
-    elif isinstance(exc, ParseError):
-        error_response.update({
-            'error_type': 'parse_error',
-            'message': 'Ошибка парсинга данных',
-            'code': 'parse_error',
-            'details': str(exc.detail) if hasattr(exc, 'detail') else None,
-            'help': 'Проверьте формат передаваемых данных'
-        })
-
-    elif isinstance(exc, UnsupportedMediaType):
-        error_response.update({
-            'error_type': 'unsupported_media_type',
-            'message': 'Неподдерживаемый тип контента',
-            'code': 'unsupported_media_type',
-            'help': 'Проверьте заголовок Content-Type'
-        })
-
-    elif isinstance(exc, BlogAPIException):
-        # Наши кастомные исключения
-        error_response.update({
-            'error_type': 'business_error',
-            'message': str(exc.detail) if hasattr(exc, 'detail') else str(exc),
-            'code': getattr(exc, 'default_code', 'business_error'),
-        })
-
-        # Добавляем специфическую информацию для rate limit
-    else:
-        # Общая ошибка
-        error_response.update({
-            'error_type': 'api_error',
-            'message': str(original_data.get('detail', 'Произошла ошибка API')),
-            'code': getattr(exc, 'default_code', 'api_error')
-        })
-
+    # Тип ошибки и специфическая информация - по классу исключения
+    error_response.update(get_error_builder(type(exc))(exc, original_data))
     return error_response
 
 
+def get_detail(exc, default):
+    return str(exc.detail) if hasattr(exc, 'detail') else default
+
+
+def build_validation_error(exc, original_data):
+    return {
+        'error_type': 'validation_error',
+        'message': 'Ошибка валидации данных',
+        'details': format_validation_errors(original_data),
+        'code': getattr(exc, 'default_code', 'validation_error'),
+    }
+
+
+def build_permission_denied(exc, original_data):
+    return {
+        'error_type': 'permission_denied',
+        'message': get_detail(exc, 'Доступ запрещен'),
+        'code': getattr(exc, 'default_code', 'permission_denied'),
+        'help': 'Проверьте права доступа или войдите в систему',
+    }
+
+
+def build_not_authenticated(exc, original_data):
+    return {
+        'error_type': 'authentication_required',
+        'message': 'Требуется аутентификация',
+        'code': 'not_authenticated',
+        'help': 'Передайте действительный токен аутентификации',
+    }
+
+
+def build_authentication_failed(exc, original_data):
+    return {
+        'error_type': 'authentication_failed',
+        'message': get_detail(exc, 'Ошибка аутентификации'),
+        'code': getattr(exc, 'default_code', 'authentication_failed'),
+        'help': 'Проверьте корректность учетных данных',
+    }
+
+
+def build_not_found(exc, original_data):
+    return {
+        'error_type': 'not_found',
+        'message': get_detail(exc, 'Ресурс не найден'),
+        'code': getattr(exc, 'default_code', 'not_found'),
+        'help': 'Проверьте правильность URL и параметров запроса',
+    }
+
+
+def build_method_not_allowed(exc, original_data):
+    return {
+        'error_type': 'method_not_allowed',
+        'message': f'Метод {exc.detail} не разрешен',
+        'code': 'method_not_allowed',
+        'allowed_methods': getattr(exc, 'detail', []),
+    }
+
+
+def build_throttled(exc, original_data):
+    return {
+        'error_type': 'rate_limit_exceeded',
+        'message': 'Превышен лимит запросов',
+        'code': 'throttled',
+        'retry_after': exc.wait,
+        'help': f'Повторите запрос через {exc.wait} секунд',
+    }
+
+
+def build_parse_error(exc, original_data):
+    return {
+        'error_type': 'parse_error',
+        'message': 'Ошибка парсинга данных',
+        'code': 'parse_error',
+        'details': get_detail(exc, None),
+        'help': 'Проверьте формат передаваемых данных',
+    }
+
+
+def build_unsupported_media_type(exc, original_data):
+    return {
+        'error_type': 'unsupported_media_type',
+        'message': 'Неподдерживаемый тип контента',
+        'code': 'unsupported_media_type',
+        'help': 'Проверьте заголовок Content-Type',
+    }
+
+
+def build_business_error(exc, original_data):
+    # Наши кастомные исключения
+    return {
+        'error_type': 'business_error',
+        'message': get_detail(exc, str(exc)),
+        'code': getattr(exc, 'default_code', 'business_error'),
+    }
+
+
+def build_api_error(exc, original_data):
+    # Общая ошибка
+    detail = 'Произошла ошибка API'
+    if isinstance(original_data, dict):
+        detail = original_data.get('detail', detail)
+    return {
+        'error_type': 'api_error',
+        'message': str(detail),
+        'code': getattr(exc, 'default_code', 'api_error'),
+    }
+
+
+# Класс исключения -> функция (exc, data) -> поля ответа.
+# Ищется ближайший класс в MRO, остальные APIException - build_api_error.
+ERROR_BUILDERS = {
+    ValidationError: build_validation_error,
+    PermissionDenied: build_permission_denied,
+    NotAuthenticated: build_not_authenticated,
+    AuthenticationFailed: build_authentication_failed,
+    NotFound: build_not_found,
+    MethodNotAllowed: build_method_not_allowed,
+    Throttled: build_throttled,
+    ParseError: build_parse_error,
+    UnsupportedMediaType: build_unsupported_media_type,
+    BlogAPIException: build_business_error,
+}
+
+
 def format_validation_errors(validation_errors):
     """
     Форматирует ошибки валидации в понятный вид
@@ -217,8 +267,6 @@ def handle_django_validation_error(exc, request, error_id):
     """
     Обработка Django ValidationError
     """
-    logger.warning(f"Django validation error [{error_id}]: {str(exc)}")
-
     return Response({
         'error': True,
         'error_id': error_id,
@@ -236,8 +284,6 @@ def handle_integrity_error(exc, request, error_id):
     """
     Обработка ошибок целостности БД
     """
-    logger.error(f"Database integrity error [{error_id}]: {str(exc)}")
-
     # Определяем тип ошибки целостности
     error_message = str(exc).lower()
     if 'unique' in error_message or 'duplicate' in error_message:
@@ -269,9 +315,6 @@ def handle_http_404(exc, request, error_id):
     """
     Обработка 404 ошибок
     """
-    logger.warning(
-        f"HTTP 404 error [{error_id}]: {request.path if request else 'Unknown path'}")
-
     return Response({
         'error': True,
         'error_id': error_id,
@@ -288,8 +331,6 @@ def handle_unexpected_error(exc, request, error_id):
     """
     Обработка неожиданных ошибок
     """
-    logger.error(f"Unexpected error [{error_id}]: {str(exc)}", exc_info=True)
-
     return Response({
         'error': True,
         'error_id': error_id,
@@ -302,37 +343,94 @@ def handle_unexpected_error(exc, request, error_id):
     }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+# Исключения, которые DRF не обработал: класс -> обработчик
+FALLBACK_HANDLERS = {
+    DjangoValidationError: handle_django_validation_error,
+    IntegrityError: handle_integrity_error,
+    Http404: handle_http_404,
+}
+
+
+class LazyUser:
+    """
+    Пользователь для лога: строка вычисляется только при форматировании
+    записи и без повторной аутентификации запроса
+    """
+    __slots__ = ('request',)
+
+    def __init__(self, request):
+        self.request = request
+
+    def __str__(self):
+        # DRF Request хранит пользователя в _user после аутентификации
+        user = getattr(self.request, '_user', None)
+        return str(user) if user is not None else 'unknown'
+
+
+_log_lock = threading.Lock()
+# ключ ошибки -> [время последней записи, пропущено после нее]
+_log_state = {}
+
+
+def sample_log(key):
+    """
+    Сколько одинаковых ошибок пропущено с прошлой записи
+    или None, если эту ошибку сейчас писать не нужно
+    """
+    now = time.monotonic()
+    with _log_lock:
+        state = _log_state.get(key)
+        if state is not None and now - state[0] < ERROR_LOG_INTERVAL:
+            state[1] += 1
+            return None
+        if state is None and len(_log_state) >= ERROR_LOG_MAX_KEYS:
+            _log_state.clear()
+        _log_state[key] = [now, 0]
+        return state[1] if state is not None else 0
+
+
+def get_log_level(exc):
+    """Уровень, заголовок и нужен ли traceback для записи об ошибке"""
+    if isinstance(exc, BlogAPIException):
+        return logging.ERROR, 'Business logic error', False
+    if isinstance(exc, APIException) and exc.status_code < 500:
+        # Ошибки клиента (валидация, права, throttling и т.п.)
+        return logging.WARNING, 'API warning', False
+    return logging.ERROR, 'API error', True
+
+
 def log_exception(exc, context, error_id):
     """
-    Логирование исключений с контекстом
+    Логирование исключений с контекстом.
+    Повторы одной ошибки семплируются (см. sample_log).
     """
     view = context.get('view')
     request = context.get('request')
+    action = getattr(view, 'action', None) if view else None
+
+    key = (type(exc), type(view), action, getattr(exc, 'status_code', None))
+    suppressed = sample_log(key)
+    if suppressed is None:
+        return
+
+    level, title, exc_info = get_log_level(exc)
+    if not logger.isEnabledFor(level):
+        return
 
     # Собираем контекстную информацию
     log_context = {
         'error_id': error_id,
         'exception_type': type(exc).__name__,
         'view': f"{view.__class__.__module__}.{view.__class__.__name__}" if view else None,
-        'action': getattr(view, 'action', None) if view else None,
-        'user': str(request.user) if request and hasattr(request,
-                                                         'user') else None,
+        'action': action,
+        'user': LazyUser(request) if request else None,
         'path': request.path if request else None,
         'method': request.method if request else None,
         'ip': get_client_ip(request) if request else None,
+        'suppressed': suppressed,
     }
-
-    # Уровень логирования в зависимости от типа ошибки
-    if isinstance(exc, (ValidationError, PermissionDenied, NotFound,
-                        NotAuthenticated)):
-        logger.warning(f"API warning [{error_id}]: {str(exc)}",
-                       extra=log_context)
-    elif isinstance(exc, BlogAPIException):
-        logger.error(f"Business logic error [{error_id}]: {str(exc)}",
-                     extra=log_context)
-    else:
-        logger.error(f"API error [{error_id}]: {str(exc)}", extra=log_context,
-                     exc_info=True)
+    logger.log(level, '%s [%s]: %s', title, error_id, exc, extra=log_context,
+               exc_info=exc_info)
 
 
 def get_client_ip(request):
@@ -344,4 +442,4 @@ def get_client_ip(request):
         ip = x_forwarded_for.split(',')[0]
     else:
         ip = request.META.get('REMOTE_ADDR')
-    return ip
\ No newline at end of file
+    return ip
@@ -1,13 +1,40 @@
+import weakref
 from collections import OrderedDict
 from typing import Any
 
-from django.urls import NoReverseMatch, include, re_path
+from django.urls import (
+    NoReverseMatch, URLPattern, URLResolver, get_resolver, get_urlconf,
+    include, path, re_path, register_converter,
+)
 from django.urls import reverse as django_reverse
+from django.urls.converters import StringConverter
+from django.urls.exceptions import Resolver404
+from django.urls.resolvers import RegexPattern, ResolverMatch, RoutePattern
+from django.utils.functional import cached_property
 from rest_framework import reverse
 from rest_framework.routers import DefaultRouter, SimpleRouter, APIRootView
 from rest_framework.views import APIView
 from rest_framework.viewsets import ViewSetMixin
 
+# Символы, из-за которых маршрут нельзя записать через path()
+REGEX_CHARS = frozenset('.^$*+?{}[]\\|()')
+# Lookup DRF по умолчанию (SimpleRouter.get_lookup_regex)
+DEFAULT_LOOKUP_VALUE_REGEX = '[^/.]+'
+# Метки для подстановки в шаблон маршрута DRF
+PREFIX_MARK = '\x00prefix\x00'
+LOOKUP_MARK = '\x00lookup\x00'
+
+
+class LookupConverter(StringConverter):
+    """
+    Конвертер lookup для path(): как regex DRF по умолчанию,
+    без '/' и '.' (точка отделяет формат-суффикс)
+    """
+    regex = DEFAULT_LOOKUP_VALUE_REGEX
+
+
+register_converter(LookupConverter, 'drf_lookup')
+
 
 class EnhancedAPIRouter(DefaultRouter):
     """
@@ -31,6 +58,12 @@ class EnhancedAPIRouter(DefaultRouter):
         # Явные методы для ясности
         router.register_viewset('products', ProductViewSet)
         router.register_router('admin', admin_router, 'admin')
+
+    По умолчанию (flat_urls=True) маршруты строятся через path() с
+    конвертерами, маршруты nested router'ов разворачиваются в общий
+    список, а вложенные роутеры подключаются одним path(prefix, include)
+    только ради namespace. Маршруты, которые нельзя записать через
+    path() (regex в url_path, lookup_value_regex), остаются re_path.
     """
 
     def __init__(self, *args, **kwargs):
@@ -40,9 +73,11 @@ class EnhancedAPIRouter(DefaultRouter):
         Args:
             auto_basename: Автоматически генерировать basename для роутеров
             strict_checking: Использовать строгую проверку типов
+            flat_urls: Плоские маршруты path() вместо вложенных re_path
         """
         self.auto_basename = kwargs.pop('auto_basename', True)
         self.strict_checking = kwargs.pop('strict_checking', False)
+        self.flat_urls = kwargs.pop('flat_urls', True)
         super().__init__(*args, **kwargs)
 
     def register(
@@ -215,7 +250,10 @@ class EnhancedAPIRouter(DefaultRouter):
         # Добавляем корневое view если нужно
         if self.include_root_view:
             root_view = self.get_api_root_view(api_urls=ret)
-            root_url = re_path(r'^$', root_view, name=self.root_view_name)
+            if self.flat_urls:
+                root_url = path('', root_view, name=self.root_view_name)
+            else:
+                root_url = re_path(r'^$', root_view, name=self.root_view_name)
             ret.append(root_url)
 
         return ret
@@ -233,6 +271,9 @@ class EnhancedAPIRouter(DefaultRouter):
         Returns:
             Список URL паттернов
         """
+        if self.flat_urls:
+            return self._get_flat_router_urls(prefix, router, basename)
+
         if self._is_nested_router(router):
             # NestedSimpleRouter уже содержит полный путь
             if prefix:
@@ -269,8 +310,137 @@ class EnhancedAPIRouter(DefaultRouter):
                     )
                 ]
 
-    def _get_viewset_urls(self, prefix: str, viewset: Any, basename: str) -> \
-    list[Any]:
+    def _get_flat_router_urls(self, prefix: str, router: Any,
+                              basename: str) -> list[Any]:
+        """
+        URL паттерны роутера в режиме flat_urls.
+
+        Args:
+            prefix: URL префикс
+            router: Роутер
+            basename: Базовое имя (namespace)
+
+        Returns:
+            Список URL паттернов
+        """
+        if self._is_nested_router(router):
+            # Маршруты nested router'а разворачиваются без include
+            ret = []
+            parent_path = self._get_parent_path(router)
+            for nested_prefix, viewset, nested_basename in router.registry:
+                path_prefix = None
+                if parent_path is not None and not REGEX_CHARS & set(nested_prefix):
+                    path_prefix = f'{parent_path}{nested_prefix}'
+                ret.extend(self._get_viewset_urls(
+                    f'{router.parent_regex}{nested_prefix}', viewset,
+                    nested_basename, path_prefix=path_prefix,
+                ))
+            if prefix:
+                return [path(f'{prefix}/', include(ret))]
+            return ret
+
+        route = f'{prefix}/' if prefix else ''
+        return [path(route, include((router.urls, basename),
+                                    namespace=basename))]
+
+    def _get_parent_path(self, router: Any) -> str | None:
+        """
+        Префикс nested router'а для path(), например
+        authors/<drf_lookup:author_pk>/, или None, если его нельзя
+        записать без regex.
+
+        Args:
+            router: NestedSimpleRouter
+
+        Returns:
+            Префикс маршрутов или None
+        """
+        parent_router = getattr(router, 'parent_router', None)
+        parent_prefix = getattr(router, 'parent_prefix', None)
+        if parent_router is None or parent_prefix is None:
+            return None
+        if REGEX_CHARS & set(parent_prefix):
+            return None
+
+        parent_viewset = next(
+            (viewset for prefix, viewset, _ in parent_router.registry
+             if prefix == parent_prefix),
+            None,
+        )
+        if parent_viewset is None:
+            return None
+        lookup = self.get_lookup_path(parent_viewset, router.nest_prefix)
+        if lookup is None:
+            return None
+
+        parent_path = f'{parent_prefix}/{lookup}/' if parent_prefix \
+            else f'{lookup}/'
+        if hasattr(parent_router, 'parent_regex'):
+            grandparent_path = self._get_parent_path(parent_router)
+            if grandparent_path is None:
+                return None
+            parent_path = grandparent_path + parent_path
+        return parent_path
+
+    def get_lookup_path(self, viewset: Any, lookup_prefix: str = '') -> \
+    str | None:
+        """
+        Lookup для path(), аналог get_lookup_regex. None, если у ViewSet'а
+        свой lookup_value_regex.
+
+        Args:
+            viewset: ViewSet класс
+            lookup_prefix: Префикс имени аргумента (для nested)
+
+        Returns:
+            Строка вида <drf_lookup:pk> или None
+        """
+        lookup_value = getattr(viewset, 'lookup_value_regex',
+                               DEFAULT_LOOKUP_VALUE_REGEX)
+        if lookup_value != DEFAULT_LOOKUP_VALUE_REGEX:
+            return None
+        lookup_field = getattr(viewset, 'lookup_field', 'pk')
+        lookup_url_kwarg = getattr(viewset, 'lookup_url_kwarg',
+                                   None) or lookup_field
+        converter = getattr(viewset, 'lookup_value_converter', 'drf_lookup')
+        return f'<{converter}:{lookup_prefix}{lookup_url_kwarg}>'
+
+    def _get_route_path(self, route: Any, path_prefix: str | None,
+                        lookup_path: str | None) -> str | None:
+        """
+        Маршрут DRF в синтаксисе path() или None, если он требует regex.
+
+        Args:
+            route: Route роутера
+            path_prefix: Префикс в синтаксисе path()
+            lookup_path: Lookup в синтаксисе path()
+
+        Returns:
+            Строка маршрута для path() или None
+        """
+        if path_prefix is None:
+            return None
+        url = route.url.format(
+            prefix=PREFIX_MARK,
+            lookup=LOOKUP_MARK,
+            trailing_slash=self.trailing_slash,
+        )
+        if not (url.startswith('^') and url.endswith('$')):
+            return None
+        url = url[1:-1]
+        if REGEX_CHARS & set(url):
+            return None
+        if LOOKUP_MARK in url:
+            if lookup_path is None:
+                return None
+            url = url.replace(LOOKUP_MARK, lookup_path)
+        # Убираем лишний слэш в начале если нет prefix
+        if not path_prefix and url.startswith(f'{PREFIX_MARK}/'):
+            url = url[len(PREFIX_MARK) + 1:]
+        return url.replace(PREFIX_MARK, path_prefix)
+
+    def _get_viewset_urls(self, prefix: str, viewset: Any, basename: str,
+                          path_prefix: str | None = None) -> list[Any]:
         """
         Генерирует URL паттерны для ViewSet'а.
 
@@ -278,6 +448,8 @@ class EnhancedAPIRouter(DefaultRouter):
             prefix: URL префикс
             viewset: ViewSet класс
             basename: Базовое имя
+            path_prefix: Префикс для path(), если отличается от prefix
+                (у nested router'а prefix - regex)
 
         Returns:
             Список URL паттернов
@@ -285,6 +457,11 @@ class EnhancedAPIRouter(DefaultRouter):
         ret = []
         lookup = self.get_lookup_regex(viewset)
         routes = self.get_routes(viewset)
+        lookup_path = None
+        if self.flat_urls:
+            lookup_path = self.get_lookup_path(viewset)
+            if path_prefix is None and not REGEX_CHARS & set(prefix):
+                path_prefix = prefix
 
         if routes is None:
             return ret
@@ -316,7 +493,14 @@ class EnhancedAPIRouter(DefaultRouter):
             # Создаем view и URL паттерн
             view = viewset.as_view(mapping, **initkwargs)
             name = route.name.format(basename=basename)
-            ret.append(re_path(regex, view, name=name))
+            route_path = None
+            if self.flat_urls:
+                route_path = self._get_route_path(route, path_prefix,
+                                                  lookup_path)
+            if route_path is not None:
+                ret.append(path(route_path, view, name=name))
+            else:
+                ret.append(re_path(regex, view, name=name))
 
         return ret
 
@@ -400,6 +584,30 @@ class EnhancedAPIRouter(DefaultRouter):
             return r'(?P<pk>[^/.]+)'
 
 
+def get_request_namespace(request: Any) -> str | None:
+    """Namespace view, которое обрабатывает запрос DRF"""
+    if request and hasattr(request, '_request'):
+        resolver_match = getattr(request._request, 'resolver_match', None)
+        return getattr(resolver_match, 'namespace', None) or None
+    return None
+
+
+# URLResolver -> {(viewname, namespace, форма аргументов): имя для reverse}.
+# Кеш привязан к резолверу: после clear_url_caches() (перезагрузка
+# URLconf, override_settings(ROOT_URLCONF)) get_resolver возвращает новый
+# резолвер, и старые записи удаляются вместе со старым.
+_reverse_names = weakref.WeakKeyDictionary()
+
+
+def get_reverse_names(urlconf: Any = None) -> dict:
+    """Кеш имен для текущего URLconf"""
+    resolver = get_resolver(urlconf or get_urlconf())
+    try:
+        return _reverse_names[resolver]
+    except KeyError:
+        return _reverse_names.setdefault(resolver, {})
+
+
 def enhanced_reverse(
     viewname: str,
     args: list[Any] | None = None,
@@ -413,6 +621,9 @@ def enhanced_reverse(
 
     Аналогична django.urls.reverse, но автоматически пытается
     добавить namespace если обычный reverse не работает.
+    Имя, по которому reverse удался (с namespace или без), запоминается
+    по viewname, namespace запроса и форме аргументов, так что повторные
+    вызовы не начинают с заведомо неудачной попытки.
 
     Args:
         viewname: Имя view для reverse
@@ -432,31 +643,64 @@ def enhanced_reverse(
         kwargs = kwargs or {}
         kwargs['format'] = format
 
-    try:
-        url = django_reverse(viewname, args=args, kwargs=kwargs, **extra)
-    except NoReverseMatch as exception:
-        # Пытаемся добавить namespace из request
-        if request and hasattr(request, '_request'):
-            resolver_match = getattr(request._request, 'resolver_match', None)
-            if (resolver_match and
-                hasattr(resolver_match, 'namespace') and
-                resolver_match.namespace):
-                namespaced_viewname = f'{resolver_match.namespace}:{viewname}'
-                try:
-                    url = django_reverse(namespaced_viewname, args=args,
-                                         kwargs=kwargs, **extra)
-                except NoReverseMatch:
-                    raise exception
-            else:
-                raise exception
-        else:
-            raise exception
+    namespace = get_request_namespace(request)
+    key = (
+        viewname,
+        namespace,
+        len(args) if args else 0,
+        frozenset(kwargs) if kwargs else frozenset(),
+        extra.get('current_app'),
+    )
+    names = get_reverse_names(extra.get('urlconf'))
+
+    url = None
+    name = names.get(key)
+    if name is not None:
+        try:
+            url = django_reverse(name, args=args, kwargs=kwargs, **extra)
+        except NoReverseMatch:
+            # Например значения аргументов не подошли - полный путь
+            names.pop(key, None)
+
+    if url is None:
+        url, name = _reverse_with_namespace(viewname, namespace, args,
+                                            kwargs, extra)
+        names[key] = name
 
     if request:
         return request.build_absolute_uri(url)
     return url
 
 
+def _reverse_with_namespace(
+    viewname: str,
+    namespace: str | None,
+    args: list[Any] | None,
+    kwargs: dict[str, Any] | None,
+    extra: dict[str, Any],
+) -> tuple[str, str]:
+    """
+    reverse по имени, а при неудаче - с namespace запроса.
+
+    Returns:
+        URL и имя, по которому он получен
+    """
+    try:
+        return django_reverse(viewname, args=args, kwargs=kwargs,
+                              **extra), viewname
+    except NoReverseMatch as exception:
+        # Пытаемся добавить namespace из request
+        if not namespace:
+            raise exception
+        namespaced_viewname = f'{namespace}:{viewname}'
+        try:
+            url = django_reverse(namespaced_viewname, args=args,
+                                 kwargs=kwargs, **extra)
+        except NoReverseMatch:
+            raise exception
+        return url, namespaced_viewname
+
+
 reverse._reverse = enhanced_reverse
 
 
@@ -468,4 +712,159 @@ class CustomAPIRootView(APIRootView):
 
     def get_view_name(self) -> str:
         """Возвращает имя view."""
-        return str(self.name)
\ No newline at end of file
+        return str(self.name)
+
+
+def get_static_segments(pattern: Any) -> list[str]:
+    """
+    Полные сегменты статического начала паттерна: для
+    posts/<drf_lookup:pk>/ - ['posts'], для ^authors/(?P<...>)/ - ['authors'].
+    Для паттернов без статического начала - пустой список.
+
+    Args:
+        pattern: RoutePattern, RegexPattern или другой паттерн
+
+    Returns:
+        Список сегментов
+    """
+    if isinstance(pattern, RoutePattern):
+        prefix = str(pattern).split('<', 1)[0]
+    elif isinstance(pattern, RegexPattern):
+        regex = str(pattern)
+        # Без ^ regex ищется в любом месте пути, с | - несколько начал
+        if not regex.startswith('^') or '|' in regex:
+            return []
+        regex = regex[1:]
+        prefix = regex
+        for index, char in enumerate(regex):
+            if char in REGEX_CHARS:
+                # Квантификатор относится к предыдущему символу
+                if char in '*+?{':
+                    index -= 1
+                prefix = regex[:max(index, 0)]
+                break
+    else:
+        return []
+    # Последний сегмент не завершен '/' - он может совпасть частично
+    return prefix.split('/')[:-1]
+
+
+class TrieURLResolver(URLResolver):
+    """
+    URLResolver, который пробует не все дочерние паттерны, а только те,
+    чье статическое начало совпадает с началом пути.
+
+    Статические сегменты паттернов хранятся в префиксном дереве, поэтому
+    выбор кандидатов стоит O(глубины пути), а не O(числа маршрутов).
+    Кандидаты сопоставляются как в Django и в исходном порядке, так что
+    результат resolve тот же. Вложенные include тоже заменяются на
+    TrieURLResolver. В tried для страницы 404 попадают только кандидаты.
+    """
+
+    @cached_property
+    def url_patterns(self):
+        return [compile_resolver(pattern)
+                for pattern in URLResolver.url_patterns.func(self)]
+
+    @cached_property
+    def pattern_trie(self):
+        """
+        Узел: {сегмент: узел, None: кандидаты}. Кандидаты узла - паттерны,
+        статическое начало которых ведет в этот узел или в его предков,
+        в исходном порядке
+        """
+        root = {}
+        for index, pattern in enumerate(self.url_patterns):
+            node = root
+            for segment in get_static_segments(pattern.pattern):
+                node = node.setdefault(segment, {})
+            node.setdefault(None, []).append(index)
+
+        patterns = self.url_patterns
+
+        def merge(node, inherited):
+            indexes = sorted(inherited + node.get(None, []))
+            node[None] = [patterns[index] for index in indexes]
+            for segment, child in node.items():
+                if segment is not None:
+                    merge(child, indexes)
+
+        merge(root, [])
+        return root
+
+    def get_candidates(self, path: str) -> list[Any]:
+        """Паттерны, которые могут совпасть с path, в исходном порядке"""
+        node = self.pattern_trie
+        for segment in path.split('/'):
+            child = node.get(segment)
+            if child is None:
+                break
+            node = child
+        return node[None]
+
+    def resolve(self, path: Any) -> ResolverMatch:
+        # URLResolver.resolve, но по кандидатам вместо всех url_patterns
+        path = str(path)
+        tried = []
+        match = self.pattern.match(path)
+        if match:
+            new_path, args, kwargs = match
+            for pattern in self.get_candidates(new_path):
+                try:
+                    sub_match = pattern.resolve(new_path)
+                except Resolver404 as e:
+                    self._extend_tried(tried, pattern, e.args[0].get('tried'))
+                else:
+                    if sub_match:
+                        sub_match_dict = {**kwargs, **self.default_kwargs}
+                        sub_match_dict.update(sub_match.kwargs)
+                        sub_match_args = sub_match.args
+                        if not sub_match_dict:
+                            sub_match_args = args + sub_match.args
+                        current_route = (
+                            ''
+                            if isinstance(pattern, URLPattern)
+                            else str(pattern.pattern)
+                        )
+                        self._extend_tried(tried, pattern, sub_match.tried)
+                        return ResolverMatch(
+                            sub_match.func,
+                            sub_match_args,
+                            sub_match_dict,
+                            sub_match.url_name,
+                            [self.app_name] + sub_match.app_names,
+                            [self.namespace] + sub_match.namespaces,
+                            self._join_route(current_route, sub_match.route),
+                            tried,
+                            captured_kwargs=sub_match.captured_kwargs,
+                            extra_kwargs={
+                                **self.default_kwargs,
+                                **sub_match.extra_kwargs,
+                            },
+                        )
+                    tried.append([pattern])
+            raise Resolver404({'tried': tried, 'path': new_path})
+        raise Resolver404({'path': path})
+
+
+def compile_resolver(pattern: Any) -> Any:
+    """
+    Заменяет URLResolver (например path('api/', include(...)))
+    на TrieURLResolver, остальные паттерны возвращает как есть.
+
+    Args:
+        pattern: Элемент urlpatterns
+
+    Returns:
+        TrieURLResolver или исходный паттерн
+    """
+    if not isinstance(pattern, URLResolver) or \
+            isinstance(pattern, TrieURLResolver):
+        return pattern
+    return TrieURLResolver(
+        pattern.pattern,
+        pattern.urlconf_name,
+        pattern.default_kwargs,
+        pattern.app_name,
+        pattern.namespace,
+    )
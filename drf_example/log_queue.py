@@ -0,0 +1,253 @@
+"""
+Неблокирующее логирование.
+
+В потоке запроса запись только кладется в ограниченную очередь
+(DroppingQueueHandler), форматирование в JSON и запись в приемники
+выполняет фоновый поток (LogListener) пачками. Если очередь заполнена,
+запись отбрасывается, а число отброшенных записей периодически
+пишется в приемники отдельной записью.
+
+Настраивается через LOGGING в settings.py:
+
+    'handlers': {
+        'console': {
+            'class': 'drf_example.log_queue.BatchStreamHandler',
+            'formatter': 'json',
+        },
+        'queue': {
+            '()': 'drf_example.log_queue.DroppingQueueHandler',
+            'handlers': ['console'],
+            'maxsize': 10000,
+        },
+    }
+
+Приемники указываются по именам обработчиков LOGGING. dictConfig
+создает обработчики в алфавитном порядке имен, поэтому приемник должен
+идти раньше очереди ('console' < 'queue'). Поток слушателя запускается
+в каждом процессе отдельно (воркеры gunicorn/Celery после fork).
+"""
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import threading
+from datetime import datetime, timezone
+
+# Атрибуты LogRecord, которые не относятся к extra
+RECORD_ATTRS = frozenset(
+    logging.LogRecord('', 0, '', 0, '', (), None).__dict__
+) | {'message', 'asctime'}
+
+# Значения extra, которые передаются в поток слушателя как есть
+PRIMITIVE_TYPES = (str, int, float, bool, type(None))
+
+# Для exc_text записей до постановки в очередь
+exc_formatter = logging.Formatter()
+
+
+class JSONFormatter(logging.Formatter):
+    """Запись в одну строку JSON вместе с полями extra"""
+
+    def format(self, record):
+        data = {
+            'timestamp': datetime.fromtimestamp(
+                record.created, timezone.utc
+            ).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in RECORD_ATTRS and not key.startswith('_'):
+                data[key] = value
+        if record.exc_info:
+            data['exc_info'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data['exc_info'] = record.exc_text
+        if record.stack_info:
+            data['stack_info'] = self.formatStack(record.stack_info)
+        # Значения extra без JSON-представления (LazyUser и т.п.) - строкой
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class BatchStreamHandler(logging.StreamHandler):
+    """StreamHandler, который пишет пачку записей одним write и flush"""
+
+    def emit_batch(self, records):
+        lines = []
+        for record in records:
+            try:
+                lines.append(self.format(record) + self.terminator)
+            except Exception:
+                self.handleError(record)
+        if not lines:
+            return
+        with self.lock:
+            try:
+                self.stream.write(''.join(lines))
+                self.flush()
+            except Exception:
+                self.handleError(records[-1])
+
+
+class DroppingQueueHandler(logging.Handler):
+    """
+    Кладет запись в ограниченную очередь без блокировки.
+
+    В потоке запроса запись только "замораживается" (prepare): args,
+    exc_info и объекты в extra (LazyUser, request) живут в потоке запроса
+    и могут измениться до того, как слушатель до них дойдет.
+    Форматирование в JSON и запись выполняет слушатель.
+    """
+
+    def __init__(self, handlers=(), maxsize=10000, batch_size=500,
+                 level=logging.NOTSET):
+        super().__init__(level)
+        # Сильные ссылки: logging хранит обработчики по именам в
+        # WeakValueDictionary, без логгеров приемник собрал бы GC
+        self.handlers = self.get_handlers(handlers)
+        self.queue = queue.Queue(maxsize)
+        self.batch_size = batch_size
+        self.dropped = 0
+        self.listener = None
+        self.pid = None
+
+    def emit(self, record):
+        try:
+            if self.pid != os.getpid():
+                self.start_listener()
+            record = self.prepare(record)
+        except Exception:
+            self.handleError(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Без блокировки: счетчик читает слушатель
+            self.dropped += 1
+
+    def prepare(self, record):
+        """Копия записи без ссылок на объекты потока запроса"""
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = exc_formatter.formatException(
+                    record.exc_info
+                )
+            record.exc_info = None
+        for key, value in record.__dict__.items():
+            if key not in RECORD_ATTRS and \
+                    not isinstance(value, PRIMITIVE_TYPES):
+                record.__dict__[key] = str(value)
+        return record
+
+    def start_listener(self):
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            # После fork очередь и поток родителя недоступны
+            self.queue = queue.Queue(self.queue.maxsize)
+            self.dropped = 0
+            self.listener = LogListener(self, self.handlers,
+                                        self.batch_size)
+            self.listener.start()
+            self.pid = os.getpid()
+
+    def get_handlers(self, names):
+        """Приемники по именам из LOGGING"""
+        handlers = []
+        for name in names:
+            handler = logging._handlers.get(name)
+            if handler is None:
+                raise ValueError(
+                    f'Обработчик логов {name!r} не настроен: он должен '
+                    f'идти раньше очереди в алфавитном порядке имен'
+                )
+            handlers.append(handler)
+        return handlers
+
+    def take_dropped(self):
+        with self.lock:
+            dropped, self.dropped = self.dropped, 0
+        return dropped
+
+    def close(self):
+        if self.listener is not None and self.pid == os.getpid():
+            self.listener.stop()
+            self.listener = None
+            self.pid = None
+        super().close()
+
+
+class LogListener:
+    """Фоновый поток: забирает записи пачками и отдает приемникам"""
+    sentinel = None
+
+    def __init__(self, handler, handlers, batch_size):
+        self.handler = handler
+        self.queue = handler.queue
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name='log-listener',
+                                       daemon=True)
+        self.thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Дописывает очередь и останавливает поток"""
+        if self.thread is None:
+            return
+        # Ждем место в очереди: при остановке записи терять нельзя
+        self.queue.put(self.sentinel)
+        self.thread.join()
+        self.thread = None
+        atexit.unregister(self.stop)
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = self.sentinel in batch
+            records = [record for record in batch
+                       if record is not self.sentinel]
+            dropped = self.handler.take_dropped()
+            if dropped:
+                records.append(self.make_dropped_record(dropped))
+            self.handle(records)
+            if stop:
+                return
+
+    def make_dropped_record(self, dropped):
+        return logging.makeLogRecord({
+            'name': __name__,
+            'levelno': logging.WARNING,
+            'levelname': logging.getLevelName(logging.WARNING),
+            'msg': 'Очередь логов переполнена, отброшено записей: %d',
+            'args': (dropped,),
+            'dropped': dropped,
+        })
+
+    def handle(self, records):
+        for handler in self.handlers:
+            selected = [
+                record for record in records
+                if record.levelno >= handler.level and handler.filter(record)
+            ]
+            if not selected:
+                continue
+            if hasattr(handler, 'emit_batch'):
+                handler.emit_batch(selected)
+            else:
+                for record in selected:
+                    handler.handle(record)
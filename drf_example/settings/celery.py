@@ -1,4 +1,5 @@
 import sys
+from datetime import timedelta
 
 from django.conf import settings
 
@@ -10,7 +11,42 @@ CELERY = {  # в дев настройках немного переопреде
     'broker_url': 'redis://localhost:6379/0',  # URL брокера сообщений
     'task_always_eager': TESTING,  # Синхронное выполнение задач при тестировании
     'timezone': settings.TIME_ZONE,  # Временная зона для планировщика
-    'result_backend': 'django-db',
+    # django-db со сжатием и удалением пачками (drf_example/celery_backends.py)
+    'result_backend': 'drf_example.celery_backends:CompressedDatabaseBackend',
     'result_extended': True,
+    'result_expires': timedelta(days=1),  # Срок хранения результатов в БД
     'task_track_started': True,  # Статус "started" для задач
+    'beat_schedule': {
+        # Перенос буфера просмотров постов из Redis в БД
+        'flush-post-views': {
+            'task': 'drf_example.apps.example.tasks.flush_post_views',
+            'schedule': 10.0,
+        },
+        # Удаление устаревших файлов фонового экспорта постов
+        'cleanup-exports': {
+            'task': 'drf_example.apps.example.tasks.cleanup_exports',
+            'schedule': 60.0 * 60,
+        },
+        # Удаление просроченных результатов задач пачками
+        'cleanup-task-results': {
+            'task': 'drf_example.celery.cleanup_task_results',
+            'schedule': 60.0 * 15,
+        },
+    },
 }
+
+# Хранение результатов по задачам: 'none', 'redis' (с TTL) или 'db'.
+# Не указанные задачи пишутся в БД. Задачи chord оставляем в БД.
+CELERY_RESULT_POLICIES = {
+    'drf_example.apps.example.tasks.flush_post_views': 'none',
+    'drf_example.apps.example.tasks.cleanup_exports': 'none',
+    'drf_example.celery.cleanup_task_results': 'none',
+    'drf_example.celery.debug_task': 'redis',
+    'drf_example.celery.very_long_task': 'redis',
+}
+CELERY_RESULT_REDIS_URL = 'redis://localhost:6379/3'
+CELERY_RESULT_REDIS_TTL = 60 * 60  # секунды
+# Результаты больше порога (байт) сжимаются, None - не сжимать
+CELERY_RESULT_COMPRESS_THRESHOLD = 16 * 1024
+# Строк в одном DELETE при очистке результатов
+CELERY_RESULT_CLEANUP_BATCH_SIZE = 1000
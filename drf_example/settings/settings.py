@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -37,6 +38,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'django_celery_results',
     'django_celery_beat',
 ]
@@ -153,6 +155,64 @@ INTERNAL_IPS = [
     "127.0.0.1",
 ]
 
+# Redis для буферов и счетчиков приложения (тот же инстанс, что и брокер)
+REDIS_URL = 'redis://localhost:6379/1'
+
+# Адреса, с которых доступен /metrics/ (None - без ограничений)
+METRICS_ALLOWED_IPS = INTERNAL_IPS
+
+# Разбирать /api/ через TrieURLResolver (drf_example/custom_router.py)
+# вместо перебора всех маршрутов, см. manage.py bench_url_resolve
+URL_TRIE_DISPATCH = False
+
+# Асинхронные list/retrieve (AsyncReadMixin). Включается в asgi.py,
+# под WSGI (runserver, gunicorn) view остаются синхронными
+ASYNC_VIEWS = os.environ.get('DJANGO_ASYNC_VIEWS') == '1'
+
+# Каталог файлов фонового экспорта постов (общий для воркеров Celery)
+EXPORTS_ROOT = BASE_DIR.parent / 'exports'
+
+# Логирование: в потоке запроса запись только кладется в очередь,
+# JSON-форматирование и вывод - в фоновом потоке (drf_example/log_queue.py)
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {'()': 'drf_example.log_queue.JSONFormatter'},
+    },
+    'handlers': {
+        'console': {
+            'class': 'drf_example.log_queue.BatchStreamHandler',
+            'formatter': 'json',
+        },
+        'queue': {
+            '()': 'drf_example.log_queue.DroppingQueueHandler',
+            'handlers': ['console'],
+            'maxsize': 10000,  # При переполнении записи отбрасываются
+            'batch_size': 500,
+        },
+    },
+    'root': {
+        'handlers': ['queue'],
+        'level': 'INFO',
+    },
+    'loggers': {
+        'django': {
+            'handlers': ['queue'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+# Кеш (ответы API, поколения инвалидации, throttling)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://localhost:6379/2',
+    }
+}
+
 REST_FRAMEWORK = {
     # ===============================
     # РЕНДЕРЕРЫ (как возвращаются данные)
@@ -206,16 +266,18 @@ REST_FRAMEWORK = {
     # ===============================
 
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
+        # GCRA в Redis (drf_example/apps/example/api/throttling.py)
+        'drf_example.apps.example.api.throttling.AnonRateThrottle',
         # Для анонимных пользователей
-        'rest_framework.throttling.UserRateThrottle',
+        'drf_example.apps.example.api.throttling.UserRateThrottle',
         # Для авторизованных пользователей
-        # 'rest_framework.throttling.ScopedRateThrottle', # По scope'ам
+        # 'drf_example.apps.example.api.throttling.ScopedRateThrottle', # По scope'ам
     ],
 
     'DEFAULT_THROTTLE_RATES': {
         'anon': '100/day',  # Анонимы: 100 запросов в час
         'user': '1000/m',  # Пользователи: 1000 запросов в час
+        'cost': '10000/m',  # Бюджет по размеру ответов: 10000 КиБ в минуту
     },
 
     # ===============================
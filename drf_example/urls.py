@@ -21,18 +21,26 @@ from django.urls import path, include
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 
 from drf_example.apps.example.api.router import router as example_router
-from drf_example.custom_router import EnhancedAPIRouter
+from drf_example.celery_metrics import metrics_view
+from drf_example.custom_router import EnhancedAPIRouter, compile_resolver
 
 
 custom_router = EnhancedAPIRouter()
 #
 custom_router.register('examples', example_router, basename='examples')
 
+api_urls = path('api/', include(custom_router.urls))
+if settings.URL_TRIE_DISPATCH:
+    # Разбор /api/... через префиксное дерево вместо перебора маршрутов
+    api_urls = compile_resolver(api_urls)
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     path('swagger/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
-    path('api/', include(custom_router.urls)),
+    api_urls,
+    # Метрики задач и очередей Celery для Prometheus
+    path('metrics/', metrics_view, name='metrics'),
 ]
 
 